@@ -0,0 +1,107 @@
+"""
+Reading a ladder_data directory: the single-process ``json.load`` loop versus
+poe_ladder.analytics.
+
+A synthetic history of ``--files`` snapshots of ``--rows`` characters is
+written to a temporary directory, in the layout of save_ladder_data.py:
+characters gain experience, some die, some drop off and are replaced. Then:
+
+    json.load       json.load on every file, one process (the old backfill)
+    orjson          orjson.loads on every file, one process (if installed)
+    analytics -w N  analyze_directory() with N worker processes, decoding
+                    and aggregating (XP/hour, deaths, rank churn)
+
+The aggregates of every worker count are checked to be identical.
+
+    python -m benchmarks.bench_analytics --files 500 --rows 2000 --workers 1 2 4
+"""
+
+import os
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+from benchmarks.ladder_fixtures import make_ladder_rows
+from poe_ladder.analytics import analyze_directory, snapshot_files, TIMESTAMP_FORMAT
+from poe_ladder.models import LadderEntry
+
+
+def write_history(directory, files, rows, seed=0):
+    """Writes ``files`` snapshots of ``rows`` characters, one every 10 minutes."""
+    rng = random.Random(seed)
+    ladder = [LadderEntry.from_dict({
+        "rank": row["rank"], "account_name": row["account"], "character_name": row["character"],
+        "class": row["char_class"], "level": row["level"], "experience": row["experience"],
+        "is_dead": row["dead"],
+    }) for row in make_ladder_rows(rows, seed=seed)]
+    taken_at = datetime(2025, 1, 19, 12, 0, 0)
+    for index in range(files):
+        for entry in ladder:
+            if not entry.dead:
+                entry.experience += rng.randint(0, 2000000)
+                entry.dead = rng.random() < 0.001
+        for _ in range(rows // 100):
+            position = rng.randrange(len(ladder))
+            replaced = ladder[position]
+            ladder[position] = LadderEntry(0, f"Exile{rng.randint(1000, 99999)}", f"Char_{rng.randint(1, 10 ** 8)}",
+                                           replaced.char_class, replaced.level, replaced.experience)
+        ladder.sort(key=lambda entry: entry.experience, reverse=True)
+        for rank, entry in enumerate(ladder, start=1):
+            entry.rank = rank
+        name = f"ladder_data_{taken_at.strftime(TIMESTAMP_FORMAT)}.json"
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            json.dump([entry.to_ladder_dict() for entry in ladder], f, indent=4)
+        taken_at += timedelta(minutes=10)
+
+
+def time_decode(directory, loads):
+    start = time.perf_counter()
+    for _, path in snapshot_files(directory):
+        with open(path, "rb") as f:
+            loads(f.read())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="ladder-analytics-")
+    try:
+        write_history(directory, args.files, args.rows)
+        size = sum(os.path.getsize(path) for _, path in snapshot_files(directory))
+        print(f"{args.files} files of {args.rows} rows, {size / 2 ** 20:.0f} MiB, {os.cpu_count()} CPUs")
+
+        elapsed = time_decode(directory, json.loads)
+        print(f"{'json.load':<16}{elapsed:8.2f} s  {args.files / elapsed:8.0f} files/s")
+        try:
+            import orjson
+        except ImportError:
+            print(f"{'orjson':<16}not installed")
+        else:
+            elapsed = time_decode(directory, orjson.loads)
+            print(f"{'orjson':<16}{elapsed:8.2f} s  {args.files / elapsed:8.0f} files/s")
+
+        reports = set()
+        for workers in args.workers:
+            start = time.perf_counter()
+            stats = analyze_directory(directory, workers, args.chunk_size)
+            elapsed = time.perf_counter() - start
+            reports.add(json.dumps(stats.report(top=100), sort_keys=True))
+            print(f"{f'analytics -w {workers}':<16}{elapsed:8.2f} s  {args.files / elapsed:8.0f} files/s")
+        if len(reports) != 1:
+            raise SystemExit("The aggregates differ between worker counts.")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Compares the single round-trip extraction with the old per-element path.
+
+Parsing only (no browser needed):
+    python -m benchmarks.bench_extraction --rows 2000
+
+Both paths against the fixture loaded in Chrome (uses the same .env variables
+as the scripts):
+    python -m benchmarks.bench_extraction --browser
+"""
+
+import os
+import time
+import argparse
+import tempfile
+
+from benchmarks.ladder_fixtures import load_ladder_page, make_ladder_html
+from poe_ladder.extract import extract_ladder_rows, parse_ladder_html
+from poe_ladder.models import LadderEntry
+
+
+def legacy_scrape_rows(driver):
+    """The per-element extraction save_ladder_data.py used to do."""
+    from selenium.webdriver.common.by import By
+    from selenium.common.exceptions import NoSuchElementException
+
+    characters = []
+    tbody = driver.find_element(By.CSS_SELECTOR, "table.league-ladder__entries tbody")
+    rows = tbody.find_elements(By.CSS_SELECTOR, "tr.league-ladder__entry")
+    for row in rows:
+        cells = row.find_elements(By.TAG_NAME, "td")
+        if len(cells) < 6:
+            continue
+        try:
+            dead_element = cells[2].find_element(By.CLASS_NAME, "league-ladder__entry-state")
+            is_dead = "Dead" in dead_element.text.strip().strip("()")
+        except NoSuchElementException:
+            is_dead = False
+        characters.append({
+            "rank": cells[0].text.strip(),
+            "account_name": cells[1].find_element(By.TAG_NAME, "a").text.strip(),
+            "character_name": cells[2].text.strip().strip('"').strip(),
+            "class": cells[3].text.strip(),
+            "level": cells[4].text.strip(),
+            "experience": cells[5].text.strip(),
+            "is_dead": is_dead,
+        })
+    return characters
+
+
+def single_trip_scrape_rows(driver):
+    """The extraction the scripts use now."""
+    return [LadderEntry.from_row(row).to_ladder_dict() for row in extract_ladder_rows(driver)]
+
+
+def timed(func, *args, repeat=5):
+    """Runs ``func`` ``repeat`` times, returns (best seconds, last result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_parse(html, repeat):
+    seconds, rows = timed(parse_ladder_html, html, repeat=repeat)
+    print(f"parse_ladder_html: {len(rows)} rows in {seconds * 1000:.1f} ms "
+          f"({len(rows) / seconds:,.0f} rows/s)")
+
+
+def bench_browser(html, repeat):
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.chrome.options import Options
+
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    if os.getenv("CHROME_EXECUTABLE_PATH"):
+        chrome_options.binary_location = os.getenv("CHROME_EXECUTABLE_PATH")
+    service = Service(executable_path=os.getenv("CHROMEDRIVER_PATH"))
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".html", delete=False, encoding="utf-8") as f:
+        f.write(html)
+        page = f.name
+    try:
+        driver.get(f"file://{page}")
+        legacy_seconds, legacy = timed(legacy_scrape_rows, driver, repeat=repeat)
+        single_seconds, single = timed(single_trip_scrape_rows, driver, repeat=repeat)
+    finally:
+        driver.quit()
+        os.remove(page)
+
+    print(f"per-element path:  {len(legacy)} rows in {legacy_seconds * 1000:.1f} ms")
+    print(f"single round-trip: {len(single)} rows in {single_seconds * 1000:.1f} ms")
+    print(f"speedup: {legacy_seconds / single_seconds:.1f}x")
+    # The old path left "(Dead)" in character_name, so compare normalized entries
+    if [LadderEntry.from_dict(c) for c in legacy] != [LadderEntry.from_dict(c) for c in single]:
+        print("[WARNING] The two paths returned different data.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=0,
+                        help="use a synthetic page with this many rows instead of the fixture")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--browser", action="store_true",
+                        help="also compare both paths in headless Chrome")
+    args = parser.parse_args()
+
+    html = make_ladder_html(args.rows) if args.rows else load_ladder_page()
+    bench_parse(html, args.repeat)
+    if args.browser:
+        bench_browser(html, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
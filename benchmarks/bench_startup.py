@@ -0,0 +1,133 @@
+"""
+Startup time of the scripts.
+
+Each measurement runs in a fresh interpreter, ``--repeat`` times (median
+reported):
+
+    import      ``import <script>``: must stay cheap and side-effect free,
+                with none of the optional heavy modules loaded
+    once        ``python -m poe_ladder <command> --once`` against the local
+                stand-in server (HTTP backend): interpreter start to exit,
+                one full scrape included
+
+The interpreter's own start (``python -c pass``) is measured too, so the
+numbers can be read as "on top of Python".
+
+    python -m benchmarks.bench_startup --repeat 10 --save startup.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from poe_ladder.standin import LadderStandInServer
+from benchmarks.ladder_fixtures import load_ladder_page
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = {
+    "find_account_characters": "find-account",
+    "save_ladder_data": "save-ladder",
+    "save_new_characters": "save-new",
+}
+# Modules the scripts should only load when a cycle needs them
+HEAVY_MODULES = ("selenium", "dotenv", "requests", "lxml", "sqlite3", "http.server")
+
+_IMPORT_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _environment(extra=None):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPOSITORY + os.pathsep + env.get("PYTHONPATH", "")
+    env.update(extra or {})
+    return env
+
+
+def time_interpreter(repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def time_import(module, repeat):
+    """Median seconds of ``import module`` and the heavy modules it loaded."""
+    samples, loaded = [], []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            check=True, capture_output=True, text=True, env=_environment(), cwd=REPOSITORY,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        samples.append(result["seconds"])
+        loaded = result["loaded"]
+    return statistics.median(samples), loaded
+
+
+def time_once(command, url, repeat):
+    """Median wall time of one ``--once`` run, in a scratch directory."""
+    env = _environment({
+        "POE_LADDER_PAGE": url,
+        "LADDER_BACKEND": "http",
+        "ACCOUNT": "Exile78678#9916",
+        "METRICS_PORT": "0",
+    })
+    samples = []
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix="ladder-startup-")
+        try:
+            start = time.perf_counter()
+            completed = subprocess.run([sys.executable, "-m", "poe_ladder", command, "--once"],
+                                       env=env, cwd=workdir, capture_output=True, text=True)
+            samples.append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{command} --once failed:\n{completed.stdout}\n{completed.stderr}")
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = {"interpreter_ms": time_interpreter(args.repeat) * 1000, "scripts": []}
+    print(f"python -c pass: {results['interpreter_ms']:.0f}ms")
+    with LadderStandInServer() as server:
+        server.set_page("ladder_page.html", load_ladder_page())
+        url = server.url_for("ladder_page.html")
+        for module, command in SCRIPTS.items():
+            import_seconds, loaded = time_import(module, args.repeat)
+            once_seconds = time_once(command, url, args.repeat)
+            results["scripts"].append({
+                "script": module,
+                "import_ms": import_seconds * 1000,
+                "heavy_modules_on_import": loaded,
+                "once_ms": once_seconds * 1000,
+            })
+            print(f"{module:<24} import={import_seconds * 1000:7.1f}ms once={once_seconds * 1000:7.0f}ms "
+                  f"heavy modules on import: {', '.join(loaded) or 'none'}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+        print(f"Saved the results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+End-to-end benchmarks of the extraction and persistence paths.
+
+Synthetic ladders of every size in ``--sizes`` (plus the recorded 200-row
+fixture) are served by the local stand-in server, and each path runs
+``--repeat`` cycles over them:
+
+    fetch_http          HTTP fetch + parse of the ladder page (no change detection)
+    fetch_json          HTTP fetch + parse of the JSON ladder endpoint
+    parse_html          parsing an already fetched page
+    scrape_ladder       save_ladder_data.scrape_ladder(): rows -> LadderEntry -> dicts
+    parse_leaderboard   find_account_characters.parse_leaderboard(): account matching
+    persist_json        save_ladder_data.save_to_json(): one JSON file per scrape
+    persist_delta       keyframe + delta storage of a changing ladder
+    new_characters      save_new_characters.py's cycle: watchlist, archive, registry + journal
+
+The script paths call the scripts' own functions, so the numbers follow the
+code that actually runs. Their console output is discarded.
+
+For every path and size it reports throughput (rows/s), p50 and p99 cycle
+latency and peak traced memory (tracemalloc, measured in a separate run so it
+doesn't skew the timings).
+
+    python -m benchmarks.bench_suite --sizes 100,1000,15000 --save results.json
+    python -m benchmarks.bench_suite --compare results.json
+
+``--compare`` reruns the benchmarks and reports the change against a saved
+run; it exits with status 1 when a p50 got slower by more than
+``--threshold`` percent.
+"""
+
+import os
+import sys
+import json
+import time
+import contextlib
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+import find_account_characters
+import save_ladder_data
+import save_new_characters
+from benchmarks.ladder_fixtures import load_ladder_page, make_ladder_rows, render_ladder_html, render_ladder_json
+from poe_ladder.archive import NewCharacterArchive
+from poe_ladder.deltas import LadderDeltaStore
+from poe_ladder.extract import lxml_etree, parse_ladder_html
+from poe_ladder.fetch import HttpLadderFetcher, make_session
+from poe_ladder.journal import CharacterJournal
+from poe_ladder.models import LadderEntry
+from poe_ladder.registry import CharacterRegistry
+from poe_ladder.standin import LadderStandInServer
+from poe_ladder.watchlist import Watchlist
+
+DEFAULT_SIZES = (100, 1000, 5000, 15000)
+FIXTURE_SIZE = "fixture"
+VARIANTS = 8  # distinct ladders cycled through by the persistence paths
+
+
+class LadderCase:
+    """One ladder size: the page, its parsed rows and the URLs serving it."""
+
+    def __init__(self, name, html, json_text, server, workdir):
+        self.name = name
+        self.html = html
+        self.rows = parse_ladder_html(html)
+        self.url = server.url_for(f"ladder_{name}.html")
+        self.json_url = server.url_for(f"ladder_{name}.json")
+        server.set_page(f"ladder_{name}.html", html)
+        server.set_page(f"ladder_{name}.json", json_text)
+        self.workdir = workdir
+        self.account = self.rows[len(self.rows) // 2].account if self.rows else ""
+        # Ladders that keep changing, as they do between two real scrapes
+        base = [LadderEntry.from_row(row).to_ladder_dict() for row in self.rows]
+        self.ladders = [_moved_ladder(base, variant) for variant in range(VARIANTS)]
+        self.moved_rows = [_moved_rows(self.rows, variant) for variant in range(VARIANTS)]
+
+
+def _moved_ladder(ladder, variant):
+    """A copy of ``ladder`` where every 10th character gained some experience."""
+    moved = []
+    for index, character in enumerate(ladder):
+        if index % 10 == variant % 10:
+            character = dict(character, experience=str(int(character["experience"]) + 1000 * (variant + 1)))
+        moved.append(character)
+    return moved
+
+
+def _moved_rows(rows, variant):
+    """A copy of the LadderRow list ``rows`` where every 10th character gained some experience."""
+    return [
+        row._replace(experience=str(int(row.experience.replace(",", "")) + 1000 * (variant + 1)))
+        if index % 10 == variant % 10 else row
+        for index, row in enumerate(rows)
+    ]
+
+
+class _StaticFetcher:
+    """Hands the already parsed rows to save_ladder_data.scrape_ladder(), as a fetcher would."""
+
+    last_load_seconds = 0.0
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetch_rows(self):
+        return self.rows
+
+
+def _quiet(function):
+    """``function`` with the scripts' console output discarded."""
+    def run(cycle):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            return function(cycle)
+    return run
+
+
+def _scratch_dir(case, path_name):
+    directory = os.path.join(case.workdir, f"{path_name}_{case.name}")
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    return directory
+
+
+def path_fetch_http(case, session):
+    fetcher = HttpLadderFetcher(case.url, session=session)
+    return lambda cycle: fetcher.fetch_rows()
+
+
+def path_fetch_json(case, session):
+    fetcher = HttpLadderFetcher(case.json_url, session=session)
+    return lambda cycle: fetcher.fetch_rows()
+
+
+def path_parse_html(case, session):
+    return lambda cycle: parse_ladder_html(case.html)
+
+
+def path_scrape_ladder(case, session):
+    save_ladder_data.POE_LADDER_PAGE = case.url
+    fetcher = _StaticFetcher(case.rows)
+    return _quiet(lambda cycle: save_ladder_data.scrape_ladder(fetcher))
+
+
+def path_parse_leaderboard(case, session):
+    watchlist = Watchlist([case.account])
+    return _quiet(lambda cycle: find_account_characters.parse_leaderboard(case.rows, watchlist))
+
+
+def path_persist_json(case, session):
+    save_ladder_data.DATA_DIR = _scratch_dir(case, "persist_json")
+    return _quiet(lambda cycle: save_ladder_data.save_to_json(case.ladders[cycle % VARIANTS]))
+
+
+def path_persist_delta(case, session):
+    store = LadderDeltaStore(_scratch_dir(case, "persist_delta"))
+    start = datetime(2025, 1, 1)
+    return lambda cycle: store.save(case.ladders[cycle % VARIANTS], now=start + timedelta(minutes=cycle))
+
+
+def path_new_characters(case, session):
+    directory = _scratch_dir(case, "new_characters")
+    archive = NewCharacterArchive(os.path.join(directory, "new_characters"))
+    journal = CharacterJournal(os.path.join(directory, "characters.json"))
+    registry = CharacterRegistry()
+    # Every account on the ladder is watched, so every row goes through the registry
+    watchlist = Watchlist(sorted({row.account for row in case.rows}))
+
+    def run(cycle):
+        rows = case.moved_rows[cycle % VARIANTS]
+        new_characters, _ = save_new_characters.find_new_characters(rows, watchlist, registry, archive)
+        save_new_characters.archive_new_characters(archive, registry, new_characters)
+        save_new_characters.save_characters(journal, registry)
+    return run
+
+
+PATHS = {
+    "fetch_http": path_fetch_http,
+    "fetch_json": path_fetch_json,
+    "parse_html": path_parse_html,
+    "scrape_ladder": path_scrape_ladder,
+    "parse_leaderboard": path_parse_leaderboard,
+    "persist_json": path_persist_json,
+    "persist_delta": path_persist_delta,
+    "new_characters": path_new_characters,
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(path, case, session, repeat):
+    """Times ``repeat`` cycles of a path, then measures its peak memory over one more."""
+    run = PATHS[path](case, session)
+    run(0)  # warm-up: connections, caches, first keyframe
+    latencies = []
+    for cycle in range(1, repeat + 1):
+        start = time.perf_counter()
+        run(cycle)
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run(repeat + 1)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    p50 = percentile(latencies, 0.5)
+    return {
+        "path": path,
+        "size": case.name,
+        "rows": len(case.rows),
+        "cycles": repeat,
+        "p50_ms": p50 * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "rows_per_s": len(case.rows) / p50 if p50 else None,
+        "peak_kb": peak / 1024,
+    }
+
+
+def run_suite(sizes, paths, repeat):
+    results = []
+    workdir = tempfile.mkdtemp(prefix="ladder-bench-")
+    session = make_session(pool_size=1)
+    try:
+        with LadderStandInServer() as server:
+            cases = [LadderCase(FIXTURE_SIZE, load_ladder_page(), "{}", server, workdir)]
+            for size in sizes:
+                rows = make_ladder_rows(size, seed=size)
+                cases.append(LadderCase(str(size), render_ladder_html(rows), render_ladder_json(rows), server, workdir))
+            for case in cases:
+                for path in paths:
+                    if path == "fetch_json" and case.name == FIXTURE_SIZE:
+                        continue
+                    result = measure(path, case, session, repeat)
+                    print_result(result)
+                    results.append(result)
+    finally:
+        session.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def print_result(result, baseline=None):
+    line = (f"{result['path']:<18} {result['size']:>8} rows={result['rows']:<6} "
+            f"p50={result['p50_ms']:9.2f}ms p99={result['p99_ms']:9.2f}ms "
+            f"{result['rows_per_s'] or 0:>12,.0f} rows/s peak={result['peak_kb']:9.0f}KB")
+    if baseline is not None:
+        line += f"  p50 {change_percent(baseline['p50_ms'], result['p50_ms']):+.1f}%"
+    print(line)
+
+
+def change_percent(before, after):
+    return (after - before) / before * 100 if before else 0.0
+
+
+def environment():
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "lxml": lxml_etree() is not None,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Prints the change against ``baseline``; returns the regressions."""
+    previous = {(r["path"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with the run of {baseline['environment']['date']}:")
+    for result in results:
+        before = previous.get((result["path"], result["size"]))
+        if before is None:
+            continue
+        print_result(result, before)
+        if change_percent(before["p50_ms"], result["p50_ms"]) > threshold:
+            regressions.append((result, before))
+    for result, before in regressions:
+        print(f"[REGRESSION] {result['path']} at {result['size']}: p50 "
+              f"{before['p50_ms']:.2f}ms -> {result['p50_ms']:.2f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated ladder sizes in rows")
+    parser.add_argument("--paths", default=",".join(PATHS), help="comma-separated paths to run")
+    parser.add_argument("--repeat", type=int, default=20, help="timed cycles per path and size")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="p50 slowdown in percent reported as a regression")
+    args = parser.parse_args()
+
+    paths = [path.strip() for path in args.paths.split(",") if path.strip()]
+    unknown = [path for path in paths if path not in PATHS]
+    if unknown:
+        parser.error(f"unknown paths: {', '.join(unknown)}")
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    results = run_suite(sizes, paths, args.repeat)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=4)
+        print(f"Saved the results to {args.save}")
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Ladder page fixtures for the benchmarks.
+
+``fixtures/ladder_page.html`` is a 200-row page in the ladder's markup and
+``fixtures/ladder_api.json`` the same ladder as the JSON endpoint returns it. Pages
+of any other size are produced by ``make_ladder_html()`` with the same
+structure, so the parsers can be measured at any ladder size.
+"""
+
+import os
+import json
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+LADDER_PAGE_FIXTURE = os.path.join(FIXTURES_DIR, "ladder_page.html")
+LADDER_API_FIXTURE = os.path.join(FIXTURES_DIR, "ladder_api.json")
+
+CLASSES = [
+    "Juggernaut", "Berserker", "Chieftain", "Raider", "Deadeye", "Pathfinder",
+    "Occultist", "Elementalist", "Necromancer", "Slayer", "Gladiator",
+    "Champion", "Assassin", "Trickster", "Saboteur", "Inquisitor",
+    "Hierophant", "Guardian", "Ascendant",
+]
+
+PAGE_HEADER = """<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Ladder - Path of Exile</title></head>
+<body>
+<div class="league-ladder">
+<table class="league-ladder__entries">
+<thead>
+<tr><th>Rank</th><th>Account</th><th>Character</th><th>Class</th><th>Level</th><th>Experience</th></tr>
+</thead>
+<tbody>
+"""
+
+PAGE_FOOTER = """</tbody>
+</table>
+</div>
+</body>
+</html>
+"""
+
+ROW_TEMPLATE = (
+    '<tr class="league-ladder__entry">'
+    '<td class="league-ladder__entry-rank">{rank}</td>'
+    '<td class="league-ladder__entry-account">'
+    '<a href="/account/view-profile/{account_url}">{account}</a></td>'
+    '<td class="league-ladder__entry-character">"{character}"{state}</td>'
+    '<td class="league-ladder__entry-class">{char_class}</td>'
+    '<td class="league-ladder__entry-level">{level}</td>'
+    '<td class="league-ladder__entry-experience">{experience}</td>'
+    '</tr>\n'
+)
+
+DEAD_STATE = ' <span class="league-ladder__entry-state">(Dead)</span>'
+
+
+def make_ladder_rows(count, seed=0, start_rank=1):
+    """Returns ``count`` synthetic ladder rows as dicts, in rank order."""
+    rng = random.Random(seed)
+    rows = []
+    experience = 4250334444
+    for offset in range(count):
+        experience -= rng.randint(0, 250000)
+        level = max(1, min(100, 100 - (start_rank + offset) // 150))
+        account = f"Exile{rng.randint(1000, 99999)}#{rng.randint(1000, 9999)}"
+        rows.append({
+            "rank": start_rank + offset,
+            "account": account,
+            "character": f"Char_{rng.randint(1, 10 ** 8)}",
+            "dead": rng.random() < 0.1,
+            "char_class": rng.choice(CLASSES),
+            "level": level,
+            "experience": experience,
+        })
+    return rows
+
+
+def render_ladder_html(rows):
+    """Renders dict rows into a full ladder page."""
+    parts = [PAGE_HEADER]
+    for row in rows:
+        parts.append(ROW_TEMPLATE.format(
+            rank=row["rank"],
+            account=row["account"],
+            account_url=row["account"].replace("#", "-"),
+            character=row["character"],
+            state=DEAD_STATE if row["dead"] else "",
+            char_class=row["char_class"],
+            level=row["level"],
+            experience=row["experience"],
+        ))
+    parts.append(PAGE_FOOTER)
+    return "".join(parts)
+
+
+def render_ladder_json(rows, total=None):
+    """Renders dict rows the way the JSON ladder endpoint returns them."""
+    entries = [{
+        "rank": row["rank"],
+        "dead": row["dead"],
+        "character": {
+            "name": row["character"],
+            "level": row["level"],
+            "class": row["char_class"],
+            "experience": row["experience"],
+        },
+        "account": {"name": row["account"]},
+    } for row in rows]
+    return json.dumps({"total": total if total is not None else len(rows), "entries": entries})
+
+
+def make_ladder_html(count, seed=0, start_rank=1):
+    """Returns a synthetic ladder page with ``count`` rows."""
+    return render_ladder_html(make_ladder_rows(count, seed=seed, start_rank=start_rank))
+
+
+def load_ladder_page():
+    """Returns the ladder page fixture."""
+    with open(LADDER_PAGE_FIXTURE, "r", encoding="utf-8") as f:
+        return f.read()
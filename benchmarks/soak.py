@@ -0,0 +1,145 @@
+"""
+Soak test of save_new_characters.py against the local stand-in server.
+
+The script runs (``python -m poe_ladder save-new``) in a scratch directory
+with memory sampling on, polling a ladder that changes every cycle: the
+watched account shows ``--watched`` characters. ``--new`` of them are
+characters never seen before, so the number of characters known and archived
+grows for as long as the test runs, as it does on a real ladder; the others
+come from a pool of ``--characters``, moving ``--step`` characters along the
+pool each cycle, so characters go inactive and come back once the window
+wraps around. With ``--max-in-memory`` the inactive ones are evicted to disk
+(``CHARACTERS_MAX_IN_MEMORY``); ``--max-in-memory 0`` keeps them all, for
+comparison.
+
+After ``--duration`` seconds the script is stopped and its memory log is
+summarized. The test fails (status 1) if the Python heap grew faster than
+``--max-growth`` MB/hour over the second half of the run, once start-up is
+over.
+
+    python -m benchmarks.soak --duration 600 --max-in-memory 500
+"""
+
+import os
+import sys
+import time
+import signal
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from benchmarks.ladder_fixtures import make_ladder_rows, render_ladder_html
+from poe_ladder.memory import read_memory_log, summarize
+from poe_ladder.standin import LadderStandInServer
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ACCOUNT = "Soak#1"
+
+
+def ladder_page(cycle, rows, watched, new, characters, step):
+    """The ladder at ``cycle``: ``rows`` rows, the first ``watched`` of the soak account."""
+    ladder = make_ladder_rows(rows, seed=cycle % 16)
+    first = cycle * step
+    for offset, row in enumerate(ladder[:watched]):
+        row["account"] = ACCOUNT
+        if offset < new:
+            row["character"] = f"Fresh_{cycle}_{offset}"
+        else:
+            row["character"] = f"Soak_{(first + offset) % characters}"
+        row["experience"] += cycle * 1000
+    return render_ladder_html(ladder)
+
+
+def serve_changing_ladder(server, stop, interval, **ladder):
+    cycle = 0
+    while not stop.is_set():
+        server.set_page("ladder_page.html", ladder_page(cycle, **ladder))
+        cycle += 1
+        stop.wait(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=120, help="seconds to run")
+    parser.add_argument("--interval", type=float, default=0.25, help="seconds between checks")
+    parser.add_argument("--rows", type=int, default=500, help="rows on the ladder page")
+    parser.add_argument("--watched", type=int, default=100, help="rows of the watched account")
+    parser.add_argument("--new", type=int, default=5, help="characters never seen before on the page per cycle")
+    parser.add_argument("--characters", type=int, default=2000,
+                        help="pool of characters of the watched account that go inactive and come back")
+    parser.add_argument("--step", type=int, default=10, help="new characters on the page per cycle")
+    parser.add_argument("--max-in-memory", type=int, default=500,
+                        help="CHARACTERS_MAX_IN_MEMORY (0: keep every character in memory)")
+    parser.add_argument("--sample-every", type=int, default=10, help="MEMORY_SAMPLE_EVERY, in checks")
+    parser.add_argument("--max-growth", type=float, default=10.0,
+                        help="heap growth in MB/hour above which the test fails")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="ladder-soak-")
+    memory_log = os.path.join(workdir, "memory.jsonl")
+    stop = threading.Event()
+    with LadderStandInServer() as server:
+        ladder = dict(rows=args.rows, watched=args.watched, new=args.new, characters=args.characters,
+                      step=args.step)
+        server.set_page("ladder_page.html", ladder_page(0, **ladder))
+        threading.Thread(target=serve_changing_ladder, args=(server, stop, args.interval),
+                         kwargs=ladder, daemon=True).start()
+        env = dict(os.environ)
+        env.update({
+            "PYTHONPATH": REPOSITORY + os.pathsep + env.get("PYTHONPATH", ""),
+            "POE_LADDER_PAGE": server.url_for("ladder_page.html"),
+            "LADDER_BACKEND": "http",
+            "ACCOUNT": ACCOUNT,
+            "POLL_INTERVAL": str(args.interval),
+            "POLL_MIN_INTERVAL": str(args.interval),
+            "POLL_MAX_INTERVAL": str(args.interval * 4),
+            "CHARACTERS_MAX_IN_MEMORY": str(args.max_in_memory),
+            "MEMORY_SAMPLE_EVERY": str(args.sample_every),
+            "MEMORY_LOG": memory_log,
+            "LOG_LEVEL": "WARNING",
+        })
+        print(f"Running save_new_characters.py for {args.duration:.0f}s in {workdir} "
+              f"(at most {args.max_in_memory or 'all'} characters in memory)")
+        with open(os.path.join(workdir, "console.log"), "w") as console:
+            process = subprocess.Popen([sys.executable, "-m", "poe_ladder", "save-new"], env=env,
+                                       cwd=workdir, stdout=console, stderr=subprocess.STDOUT)
+            try:
+                time.sleep(args.duration)
+            finally:
+                process.send_signal(signal.SIGINT)
+                process.wait(timeout=60)
+                stop.set()
+
+    try:
+        samples = read_memory_log(memory_log) if os.path.exists(memory_log) else []
+        if len(samples) < 4:
+            print(f"Only {len(samples)} memory samples, run longer.")
+            return 1
+        print(f"{len(samples)} samples over {samples[-1]['cycle']} checks")
+        print(f"{'field':<24}{'first':>10}{'last':>10}{'max':>10}{'per hour':>12}{'2nd half':>12}")
+        summary = summarize(samples)
+        for field, stats in summary.items():
+            trends = [f"{value:+12.2f}" if value is not None else f"{'n/a':>12}"
+                      for value in (stats["per_hour"], stats["per_hour_second_half"])]
+            print(f"{field:<24}{stats['first']:>10.1f}{stats['last']:>10.1f}{stats['max']:>10.1f}{''.join(trends)}")
+        growth = summary.get("heap_mb", {}).get("per_hour_second_half")
+        if growth is None:
+            print("No heap samples (MEMORY_TRACE=0?).")
+            return 1
+        if growth > args.max_growth:
+            print(f"FAIL: the heap grew {growth:+.2f} MB/hour over the second half (limit {args.max_growth}).")
+            return 1
+        print(f"OK: the heap grew {growth:+.2f} MB/hour over the second half (limit {args.max_growth}).")
+        return 0
+    finally:
+        if args.keep:
+            print(f"Kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
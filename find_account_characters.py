@@ -1,209 +1,254 @@
 import os
-import time
+import sys
 import logging
+import argparse
 from logging.handlers import RotatingFileHandler
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import NoSuchElementException
-from dotenv import load_dotenv
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Fetch environment variables
-CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH')
-CHROME_PROFILE_PATH = os.getenv('CHROME_PROFILE_PATH')
-CHROME_EXECUTABLE_PATH = os.getenv('CHROME_EXECUTABLE_PATH')
-POE_LADDER_PAGE = os.getenv('POE_LADDER_PAGE')
-ACCOUNT = os.getenv('ACCOUNT')
-LOG_FILE_PATH = os.getenv('LOG_FILE_PATH', 'poe_ladder_log.log') 
-
-# Validate essential environment variables
-required_vars = [
-    'CHROMEDRIVER_PATH',
-    'CHROME_PROFILE_PATH',
-    'CHROME_EXECUTABLE_PATH',
-    'POE_LADDER_PAGE',
-    'ACCOUNT'
-]
-missing_vars = [var for var in required_vars if not os.getenv(var)]
-if missing_vars:
-    raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
-
-# Set up logging with RotatingFileHandler
+from poe_ladder import browser
+from poe_ladder.models import LadderEntry
+from poe_ladder.change import ChangeDetector
+from poe_ladder.database import LadderDatabase
+from poe_ladder.events import EventPipeline
+from poe_ladder.schedule import PollScheduler, ladder_churn
+from poe_ladder.fetch import make_fetcher
+from poe_ladder.instrument import REGISTRY, start_queue_logging
+from poe_ladder.memory import MemoryMonitor, driver_pool_of
+from poe_ladder.watchlist import Watchlist
+
 logger = logging.getLogger()
-logger.setLevel(logging.INFO)
 
-# Create a rotating file handler
-handler = RotatingFileHandler(
-    LOG_FILE_PATH,
-    maxBytes=5*1024*1024,  # 5 MB per log file
-    backupCount=5,         # Keep up to 5 backup log files
-    encoding='utf-8'
-)
+def load_config():
+    """
+    Loads the .env file and reads the configuration into the module globals.
+    Called by main(), so importing this script has no side effects.
+    """
+    global CHROMEDRIVER_PATH, CHROME_PROFILE_PATH, CHROME_EXECUTABLE_PATH, POE_LADDER_PAGE, ACCOUNT, WATCHLIST_FILE
+    global LOG_FILE_PATH, LADDER_BACKEND, LADDER_WAIT_TIMEOUT, SKIP_UNCHANGED
+    global POLL_INTERVAL, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL, DRIVER_MAX_USES, DRIVER_MAX_RSS_MB
+    global LOG_LEVEL, METRICS_FILE, METRICS_PORT, LADDER_DATABASE
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # Fetch environment variables
+    CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH')
+    CHROME_PROFILE_PATH = os.getenv('CHROME_PROFILE_PATH')
+    CHROME_EXECUTABLE_PATH = os.getenv('CHROME_EXECUTABLE_PATH')
+    POE_LADDER_PAGE = os.getenv('POE_LADDER_PAGE')
+    ACCOUNT = os.getenv('ACCOUNT')  # account to track, or several separated by commas
+    WATCHLIST_FILE = os.getenv('WATCHLIST_FILE')  # and/or a file with one account per line, re-read when it changes
+    LOG_FILE_PATH = os.getenv('LOG_FILE_PATH', 'poe_ladder_log.log') 
+    LADDER_BACKEND = os.getenv('LADDER_BACKEND', 'auto')  # http, selenium or auto
+    LADDER_WAIT_TIMEOUT = float(os.getenv('LADDER_WAIT_TIMEOUT', 20))  # max seconds to wait for the table
+    SKIP_UNCHANGED = os.getenv('LADDER_SKIP_UNCHANGED', '1') != '0'  # don't re-parse an unchanged ladder
+    POLL_INTERVAL = float(os.getenv('POLL_INTERVAL', 60))  # seconds between checks, from the start of a check
+    POLL_MIN_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', 15))  # fastest polling while the ladder churns
+    POLL_MAX_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', 300))  # slowest polling while quiet or failing
+    DRIVER_MAX_USES = int(os.getenv('DRIVER_MAX_USES', 500)) or None  # restart Chrome after this many checks (0: never)
+    DRIVER_MAX_RSS_MB = int(os.getenv('DRIVER_MAX_RSS_MB', 0)) or None  # restart Chrome above this memory use (needs psutil)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()  # DEBUG also logs the matching rows
+    METRICS_FILE = os.getenv('METRICS_FILE')  # Prometheus text file rewritten after every check
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))  # > 0: serve the metrics on http://127.0.0.1:PORT/metrics
+    LADDER_DATABASE = os.getenv('LADDER_DATABASE')  # SQLite file to also store the account's characters in
+    # LADDER_EVENTS: jsonl:PATH, socket:HOST:PORT and/or sqlite:PATH sinks for the account's level-ups, deaths, ...
+
+    # Validate essential environment variables
+    required_vars = [
+        'POE_LADDER_PAGE'
+    ]
+    if LADDER_BACKEND != 'http':
+        required_vars += [
+            'CHROMEDRIVER_PATH',
+            'CHROME_PROFILE_PATH',
+            'CHROME_EXECUTABLE_PATH'
+        ]
+    missing_vars = [var for var in required_vars if not os.getenv(var)]
+    if not ACCOUNT and not WATCHLIST_FILE:
+        missing_vars.append('ACCOUNT or WATCHLIST_FILE')
+    if missing_vars:
+        raise EnvironmentError(f"Missing required environment variables: {', '.join(missing_vars)}")
+
+def start_logging():
+    """Sets up logging with a RotatingFileHandler."""
+    # Create a rotating file handler
+    handler = RotatingFileHandler(
+        LOG_FILE_PATH,
+        maxBytes=5*1024*1024,  # 5 MB per log file
+        backupCount=5,         # Keep up to 5 backup log files
+        encoding='utf-8'
+    )
 
-# Define log message format
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
+    # Define log message format
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
 
-# Add handler to the logger
-logger.addHandler(handler)
+    # Records go through a queue, the file is written by a background thread
+    return start_queue_logging([handler], level=LOG_LEVEL)
 
 def setup_driver():
-    print("[INFO] Setting up Chrome options...")
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")  # Run in headless mode
-    chrome_options.add_argument(f"user-data-dir={CHROME_PROFILE_PATH}")  # Specify custom profile
-    chrome_options.binary_location = CHROME_EXECUTABLE_PATH  # Specify custom Chrome executable
-
-    # Optional: Add other options for better stability
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-    chrome_options.add_experimental_option('useAutomationExtension', False)
-
-    print("[INFO] Initializing WebDriver with Service object...")
-    service = Service(executable_path=CHROMEDRIVER_PATH)
-    driver = webdriver.Chrome(
-        service=service,
-        options=chrome_options
-    )
+    print("[INFO] Starting Chrome with the shared scrape profile...")
+    # Flags, blocked subresources and page-load strategy live in poe_ladder/browser.py
+    driver = browser.setup_driver(headless=True, profile_path=CHROME_PROFILE_PATH)
     print("[INFO] WebDriver initialized successfully.")
     return driver
 
-def fetch_leaderboard(driver):
+def describe_transfer(transfer):
+    if not transfer:
+        return "transfer size unknown"
+    return f"{transfer['bytes'] / 1024:.0f} KB in {transfer['requests']} requests"
+
+def fetch_leaderboard(fetcher):
     try:
-        print(f"[INFO] Navigating to {POE_LADDER_PAGE}...")
-        driver.get(POE_LADDER_PAGE)
-        print("[INFO] Page loaded successfully.")
-        # Wait until the leaderboard table is present
-        from selenium.webdriver.support.ui import WebDriverWait
-        from selenium.webdriver.support import expected_conditions as EC
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "table.league-ladder__entries"))
-        )
-        print("[INFO] Leaderboard table is present.")
+        print(f"[INFO] Fetching {POE_LADDER_PAGE}...")
+        rows = fetcher.fetch_rows()
+        print(f"[INFO] Leaderboard ready in {fetcher.last_load_seconds:.2f} seconds ({describe_transfer(fetcher.last_transfer)}).")
+        logger.info("Leaderboard ready in %.2f seconds (%s).", fetcher.last_load_seconds, describe_transfer(fetcher.last_transfer))
+        if rows is not None:
+            print(f"[INFO] Found {len(rows)} rows in the leaderboard.")
+        return rows
     except Exception as e:
-        print(f"[ERROR] Failed to load the page or locate the leaderboard table: {e}")
-        logger.error(f"Failed to load the page or locate the leaderboard table: {e}")
+        print(f"[ERROR] Failed to fetch the leaderboard: {e}")
+        logger.error("Failed to fetch the leaderboard: %s", e)
+        return []
 
-def parse_leaderboard(driver):
-    characters = []
+def parse_leaderboard(rows, watchlist):
+    """Returns the characters of the watched accounts, grouped by account."""
+    characters = {}
     try:
-        print("[INFO] Locating the leaderboard table...")
-        table = driver.find_element(By.CSS_SELECTOR, "table.league-ladder__entries")
-        tbody = table.find_element(By.TAG_NAME, "tbody")
-        rows = tbody.find_elements(By.TAG_NAME, "tr")
-        print(f"[INFO] Found {len(rows)} rows in the leaderboard.")
-
-        for index, row in enumerate(rows, start=1):
-            try:
-                # Extract all <td> elements in the row
-                tds = row.find_elements(By.TAG_NAME, "td")
-                if len(tds) < 6:
-                    print(f"[WARNING] Row {index} does not have enough columns.")
-                    continue
-
-                # Extract account name
-                account_td = tds[1]
-                account_link = account_td.find_element(By.TAG_NAME, "a")
-                account_name = account_link.text.strip()
-                print(f"[DEBUG] Row {index}: Account Name - {account_name}")
-
-                if account_name.lower() == ACCOUNT.lower():
-                    print(f"[INFO] Match found for account: {ACCOUNT} in row {index}")
-                    
-                    # Extract other details
-                    rank = tds[0].text.strip()
-                    
-                    # Extract character name and check if dead
-                    character_td = tds[2]
-                    try:
-                        dead_span = character_td.find_element(By.CSS_SELECTOR, "span.league-ladder__entry-state")
-                        is_dead = "Dead" in dead_span.text
-                        # Remove the (Dead) text from character name
-                        character_name = character_td.text.replace(dead_span.text, '').strip('" ').strip()
-                    except NoSuchElementException:
-                        character_name = character_td.text.strip('" ').strip()
-                        is_dead = False
-
-                    char_class = tds[3].text.strip()
-                    level = tds[4].text.strip()
-                    experience = tds[5].text.strip()
-
-                    character_info = {
-                        "Rank": rank,
-                        "Account": account_name,
-                        "Character": character_name,
-                        "Class": char_class,
-                        "Level": level,
-                        "Experience": experience,
-                        "Dead": is_dead
-                    }
-
-                    characters.append(character_info)
-                    print(f"[INFO] Character found: {character_info}")
-
-            except IndexError:
-                print(f"[WARNING] Row {index} does not have enough columns.")
-            except Exception as e:
-                print(f"[ERROR] Error parsing row {index}: {e}")
-                logger.error(f"Error parsing row {index}: {e}")
+        # One pass over the rows, whatever the number of watched accounts
+        for account, account_rows in watchlist.group(rows).items():
+            print(f"[INFO] {len(account_rows)} matches found for account: {account}")
+            characters[account] = []
+            for row in account_rows:
+                logger.debug("Matching row for %s: %s", account, row)
+                character_info = LadderEntry.from_row(row).to_account_dict()
+                characters[account].append(character_info)
+                print(f"[INFO] Character found: {character_info}")
 
-    except NoSuchElementException:
-        print("[ERROR] Leaderboard table not found on the page.")
-        logger.error("Leaderboard table not found on the page.")
     except Exception as e:
         print(f"[ERROR] An error occurred while parsing the leaderboard: {e}")
-        logger.error(f"An error occurred while parsing the leaderboard: {e}")
+        logger.error("An error occurred while parsing the leaderboard: %s", e)
 
     return characters
 
-def log_characters(characters):
-    if not characters:
-        print("[INFO] No characters found for the specified account.")
-        logger.info("No characters found for the specified account.")
-        return
-
-    for char in characters:
-        log_message = (
-            f"Rank: {char['Rank']}, "
-            f"Account: {char['Account']}, "
-            f"Character: {char['Character']}, "
-            f"Class: {char['Class']}, "
-            f"Level: {char['Level']}, "
-            f"Experience: {char['Experience']}, "
-            f"Dead: {char['Dead']}"
-        )
-        print(f"[LOG] {log_message}")
-        logger.info(log_message)
-
-def main():
+def log_characters(characters, watchlist):
+    for account in watchlist.accounts:
+        if account not in characters:
+            print(f"[INFO] No characters found for account: {account}")
+            logger.info("No characters found for account: %s", account)
+            continue
+
+        for char in characters[account]:
+            log_message = (
+                f"Rank: {char['Rank']}, "
+                f"Account: {char['Account']}, "
+                f"Character: {char['Character']}, "
+                f"Class: {char['Class']}, "
+                f"Level: {char['Level']}, "
+                f"Experience: {char['Experience']}, "
+                f"Dead: {char['Dead']}"
+            )
+            print(f"[LOG] {log_message}")
+            logger.info(log_message)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find and log the characters of the watched accounts on the POE ladder.")
+    parser.add_argument("--once", action="store_true", help="check once and exit, e.g. when run from cron")
+    args = parser.parse_args(argv)
+
+    load_config()
+    log_listener = start_logging()
     print("[INFO] Starting the POE Ladder Tracker script.")
-    driver = setup_driver()
-
+    watchlist = Watchlist.from_env()
+    print(f"[INFO] Watching {len(watchlist)} accounts: {', '.join(watchlist.accounts)}")
+    print(f"[INFO] Using the {LADDER_BACKEND} ladder backend.")
+    # Unchanged ladders are not parsed or logged again
+    change_detector = ChangeDetector() if SKIP_UNCHANGED else None
+    fetcher = make_fetcher(
+        LADDER_BACKEND,
+        POE_LADDER_PAGE,
+        driver_factory=setup_driver,
+        wait_timeout=LADDER_WAIT_TIMEOUT,
+        change_detector=change_detector,
+        driver_max_uses=DRIVER_MAX_USES,
+        driver_max_rss_mb=DRIVER_MAX_RSS_MB
+    )
+    # Polls faster while the ladder churns, slower while it is quiet or failing
+    scheduler = PollScheduler(POLL_INTERVAL, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL)
+    previous_rows = None
+    # Changes of the account's characters, sent to the LADDER_EVENTS sinks
+    events = EventPipeline.from_env()
+    # Every check that found characters is also stored in SQLite, if configured
+    database = LadderDatabase(LADDER_DATABASE) if LADDER_DATABASE else None
+    if METRICS_PORT:
+        REGISTRY.serve(METRICS_PORT)
+    # Memory samples and trends for long runs (MEMORY_SAMPLE_EVERY, see poe_ladder/memory.py)
+    memory = MemoryMonitor.from_env()
+
+    result = None
     try:
         while True:
+            scheduler.start_cycle()
+            REGISTRY.start_cycle()
+            if watchlist.reload_if_changed():
+                print(f"[INFO] Watchlist reloaded, watching {len(watchlist)} accounts.")
+                if change_detector is not None:
+                    # The new accounts must be looked up even if the ladder did not change
+                    change_detector.reset()
             print("[INFO] Fetching the leaderboard...")
-            fetch_leaderboard(driver)
-            print("[INFO] Parsing the leaderboard for account:", ACCOUNT)
-            characters = parse_leaderboard(driver)
-            log_characters(characters)
-            print("[INFO] Sleeping for 60 seconds before the next check.")
-            time.sleep(60)  # Wait for 1 minute before reloading
+            try:
+                rows = fetch_leaderboard(fetcher)
+                if rows is None:
+                    scheduler.record_unchanged()
+                    result = "unchanged"
+                    print(f"[INFO] Leaderboard unchanged ({change_detector.skipped_cycles} checks skipped so far).")
+                    logger.info("Leaderboard unchanged (%d checks skipped so far).", change_detector.skipped_cycles)
+                elif not rows:
+                    scheduler.record_error()
+                    result = "error"
+                else:
+                    with REGISTRY.span("diff"):
+                        scheduler.record_change(ladder_churn(previous_rows, rows))
+                        previous_rows = rows
+                        print(f"[INFO] Parsing the leaderboard for {len(watchlist)} accounts.")
+                        characters = parse_leaderboard(rows, watchlist)
+                        found = [char for account_characters in characters.values() for char in account_characters]
+                        events.publish(found)
+                    with REGISTRY.span("persist"):
+                        log_characters(characters, watchlist)
+                        if database is not None and found:
+                            database.write_cycle(found, source="account")
+                    result = "changed"
+            except Exception as e:
+                # One bad check must not stop the tracker
+                scheduler.record_error()
+                result = "error"
+                print(f"[ERROR] An unexpected error occurred during this check: {e}")
+                logger.exception("An unexpected error occurred during this check: %s", e)
+            if result == "error" and change_detector is not None:
+                # Whatever failed is retried on the next check, even if the ladder is unchanged
+                change_detector.reset()
+            REGISTRY.count_cycle(result)
+            logger.info("Check timings: %s", REGISTRY.cycle_summary())
+            memory.cycle(driver_pool_of(fetcher))
+            if METRICS_FILE:
+                REGISTRY.write(METRICS_FILE)
+            if args.once:
+                break
+            print(f"[INFO] Next check in {scheduler.remaining():.0f} seconds.")
+            scheduler.sleep()
     except KeyboardInterrupt:
         print("\n[INFO] Script interrupted by user. Exiting...")
-    except Exception as e:
-        print(f"[ERROR] An unexpected error occurred: {e}")
-        logger.error(f"An unexpected error occurred: {e}")
     finally:
-        print("[INFO] Closing the WebDriver.")
-        driver.quit()
+        print("[INFO] Closing the ladder fetcher.")
+        fetcher.close()
+        events.close()
+        if database is not None:
+            database.close()
         print("[INFO] Script terminated.")
+        log_listener.stop()
+    # --once: a failed check exits with status 1, e.g. for cron to report it
+    return 1 if args.once and result == "error" else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
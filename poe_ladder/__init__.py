@@ -0,0 +1,15 @@
+"""
+Shared helpers for the POE ladder scripts.
+
+The scripts at the root of the repository stay the entry points; the modules
+in this package hold the pieces they have in common.
+"""
+
+from poe_ladder.extract import (
+    LADDER_TABLE_SELECTOR,
+    LadderRow,
+    fetch_ladder_html,
+    parse_ladder_html,
+    extract_ladder_rows,
+)
+from poe_ladder.models import LadderEntry
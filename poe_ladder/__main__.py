@@ -0,0 +1,68 @@
+"""
+Single entry point for the scripts and the package tools:
+
+    python -m poe_ladder find-account [--once]      find_account_characters.py
+    python -m poe_ladder save-ladder [--once]       save_ladder_data.py
+    python -m poe_ladder save-new [--once]          save_new_characters.py
+    python -m poe_ladder orchestrate TARGETS        poe_ladder.orchestrator
+    python -m poe_ladder database DB ...            poe_ladder.database
+    python -m poe_ladder columnar ...               poe_ladder.columnar
+    python -m poe_ladder deltas ...                 poe_ladder.deltas
+    python -m poe_ladder analytics DATA_DIR         poe_ladder.analytics
+    python -m poe_ladder memory MEMORY_LOG          poe_ladder.memory
+    python -m poe_ladder standin DIR                poe_ladder.standin
+
+Only the module of the chosen command is imported, so e.g. ``database``
+never loads Selenium. ``--once`` scrapes once and exits, with status 1 if the
+scrape failed, for cron and other schedulers.
+"""
+
+import os
+import sys
+import importlib
+
+# command -> (module, description)
+COMMANDS = {
+    "find-account": ("find_account_characters", "log the characters of the watched accounts"),
+    "save-ladder": ("save_ladder_data", "save a snapshot of the ladder every cycle"),
+    "save-new": ("save_new_characters", "save the new characters of the watched accounts"),
+    "orchestrate": ("poe_ladder.orchestrator", "scrape several ladders from one process"),
+    "database": ("poe_ladder.database", "query the SQLite ladder database"),
+    "columnar": ("poe_ladder.columnar", "columnar ladder history store"),
+    "deltas": ("poe_ladder.deltas", "keyframe + delta snapshot storage"),
+    "analytics": ("poe_ladder.analytics", "XP/hour, deaths and rank churn over ladder_data"),
+    "memory": ("poe_ladder.memory", "summarize a memory log (MEMORY_LOG)"),
+    "standin": ("poe_ladder.standin", "local stand-in for the ladder site"),
+}
+
+# The scripts live at the root of the repository, next to this package
+_REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def usage():
+    lines = ["usage: python -m poe_ladder COMMAND [ARGS]", "", "commands:"]
+    lines += [f"  {name:<14}{description}" for name, (_, description) in COMMANDS.items()]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return 0
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"Unknown command {command!r}.\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    module_name = COMMANDS[command][0]
+    if "." not in module_name and _REPOSITORY not in sys.path:
+        sys.path.insert(0, _REPOSITORY)
+    module = importlib.import_module(module_name)
+    # The tools parse sys.argv themselves
+    sys.argv = [f"python -m poe_ladder {command}"] + args
+    return module.main() or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
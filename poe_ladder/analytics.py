@@ -0,0 +1,273 @@
+"""
+Batch analytics over the ``ladder_data_*.json`` history.
+
+The files are split into chunks of ``chunk_size`` consecutive snapshots and
+each chunk is read by a worker process (``orjson`` is used to decode them when
+it is installed). A worker diffs the snapshots of its chunk and returns a
+LadderStats, which the parent merges in time order: the first snapshot of a
+chunk is diffed against the last one of the previous chunk, so the result is
+the same as reading every file in one process. Only ``2 * workers`` chunk
+results are in flight at a time, so memory depends on the chunk size and the
+number of characters, not on the number of files.
+
+Aggregates:
+
+* XP/hour of every character, between the first and last snapshot it is on;
+* deaths per class (``death`` events, see poe_ladder.events);
+* rank churn: entries, exits and rank changes between consecutive snapshots.
+
+From the command line:
+    python -m poe_ladder.analytics ladder_data --workers 4 --top 20
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import logging
+from collections import Counter, deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from poe_ladder.events import ENTRY, EXIT, DEATH, RANK_CHANGE, diff_events
+from poe_ladder.models import LadderEntry
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+DEFAULT_CHUNK_SIZE = 50  # snapshot files per worker task
+
+_SNAPSHOT_FILE = re.compile(r"ladder_data_(\d{8}_\d{6})\.json$")
+
+_CHURN_EVENTS = (ENTRY, EXIT, RANK_CHANGE)
+
+_loads = None
+
+
+def json_loads():
+    """
+    ``orjson.loads``, imported on first use, or ``json.loads`` if orjson is
+    not installed. Both take the raw bytes of a file.
+    """
+    global _loads
+    if _loads is None:
+        try:
+            from orjson import loads
+        except ImportError:
+            loads = json.loads
+        _loads = loads
+    return _loads
+
+
+def snapshot_files(data_dir):
+    """``(timestamp, path)`` of the ``ladder_data_*.json`` files in ``data_dir``, oldest first."""
+    return sorted(
+        (match.group(1), os.path.join(data_dir, name))
+        for name in os.listdir(data_dir)
+        for match in [_SNAPSHOT_FILE.match(name)] if match
+    )
+
+
+def load_snapshot(path):
+    """The entries of one snapshot file, as LadderEntry."""
+    with open(path, "rb") as f:
+        return [LadderEntry.from_dict(item) for item in json_loads()(f.read())]
+
+
+def _epoch(timestamp):
+    return datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp()
+
+
+class LadderStats:
+    """
+    Aggregates of a run of consecutive snapshots. ``characters`` maps
+    ``(account, character)`` to ``[class, level, first_seen, first_xp,
+    last_seen, last_xp]`` (epoch seconds); ``first`` and ``last`` keep the
+    first and last snapshot so that runs can be merged.
+    """
+
+    def __init__(self):
+        self.snapshots = 0
+        self.first = None  # (timestamp, entries)
+        self.last = None
+        self.characters = {}
+        self.deaths = Counter()  # class -> deaths
+        self.churn = Counter()  # event type -> count, entries/exits/rank changes
+        self.peak_churn = (0, None)  # (entries + exits + rank changes, timestamp)
+
+    def add_snapshot(self, timestamp, entries):
+        """Adds the snapshot taken right after the last one."""
+        if self.last is not None:
+            self._count_events(self.last[1], timestamp, entries)
+        epoch = _epoch(timestamp)
+        characters = self.characters
+        for entry in entries:
+            if entry.experience is None:
+                continue
+            stats = characters.get(entry.key)
+            if stats is None:
+                characters[entry.key] = [entry.char_class, entry.level, epoch, entry.experience,
+                                         epoch, entry.experience]
+            else:
+                stats[0], stats[1], stats[4], stats[5] = entry.char_class, entry.level, epoch, entry.experience
+        if self.first is None:
+            self.first = (timestamp, entries)
+        self.last = (timestamp, entries)
+        self.snapshots += 1
+
+    def _count_events(self, previous, timestamp, entries):
+        moves = 0
+        for event in diff_events(previous, entries, timestamp):
+            if event.type == DEATH:
+                self.deaths[event.char_class] += 1
+            elif event.type in _CHURN_EVENTS:
+                self.churn[event.type] += 1
+                moves += 1
+        if moves > self.peak_churn[0]:
+            self.peak_churn = (moves, timestamp)
+
+    def merge(self, other):
+        """Adds ``other``, the stats of the snapshots right after these."""
+        if not other.snapshots:
+            return
+        if self.last is not None:
+            self._count_events(self.last[1], *other.first)
+        characters = self.characters
+        for key, stats in other.characters.items():
+            mine = characters.get(key)
+            if mine is None:
+                characters[key] = stats
+            else:
+                mine[0], mine[1], mine[4], mine[5] = stats[0], stats[1], stats[4], stats[5]
+        self.deaths.update(other.deaths)
+        self.churn.update(other.churn)
+        if other.peak_churn[0] > self.peak_churn[0]:
+            self.peak_churn = other.peak_churn
+        if self.first is None:
+            self.first = other.first
+        self.last = other.last
+        self.snapshots += other.snapshots
+
+    def xp_per_hour(self):
+        """
+        ``[(xp_per_hour, account, character, class, level, hours), ...]``,
+        fastest first, for the characters seen in two snapshots or more.
+        """
+        rates = []
+        for (account, character), (char_class, level, first_seen, first_xp, last_seen, last_xp) \
+                in self.characters.items():
+            hours = (last_seen - first_seen) / 3600
+            if hours > 0:
+                rates.append(((last_xp - first_xp) / hours, account, character, char_class, level, hours))
+        rates.sort(key=lambda rate: rate[0], reverse=True)
+        return rates
+
+    def report(self, top=20):
+        """The aggregates as a JSON-serializable dict, with the ``top`` XP/hour."""
+        pairs = max(self.snapshots - 1, 0)
+        moves = self.churn[ENTRY] + self.churn[EXIT] + self.churn[RANK_CHANGE]
+        return {
+            "snapshots": self.snapshots,
+            "first": self.first[0] if self.first else None,
+            "last": self.last[0] if self.last else None,
+            "characters": len(self.characters),
+            "xp_per_hour": [
+                {"account": account, "character": character, "class": char_class, "level": level,
+                 "xp_per_hour": round(rate), "hours": round(hours, 2)}
+                for rate, account, character, char_class, level, hours in self.xp_per_hour()[:top]
+            ],
+            "deaths_by_class": dict(self.deaths.most_common()),
+            "churn": {
+                "entries": self.churn[ENTRY],
+                "exits": self.churn[EXIT],
+                "rank_changes": self.churn[RANK_CHANGE],
+                "per_snapshot": round(moves / pairs, 2) if pairs else 0,
+                "peak": {"moves": self.peak_churn[0], "timestamp": self.peak_churn[1]},
+            },
+        }
+
+
+def summarize_files(files):
+    """Worker task: the LadderStats of ``files``, ``(timestamp, path)`` pairs in time order."""
+    stats = LadderStats()
+    for timestamp, path in files:
+        try:
+            entries = load_snapshot(path)
+        except (OSError, ValueError) as e:
+            logger.error("Skipping %s: %s", path, e)
+            continue
+        stats.add_snapshot(timestamp, entries)
+    return stats
+
+
+def _in_order(executor, chunks, window):
+    """Yields the summaries of ``chunks`` in order, with at most ``window`` pending."""
+    chunks = iter(chunks)
+    pending = deque(executor.submit(summarize_files, chunk) for chunk in islice(chunks, window))
+    while pending:
+        summary = pending.popleft().result()
+        chunk = next(chunks, None)
+        if chunk is not None:
+            pending.append(executor.submit(summarize_files, chunk))
+        yield summary
+
+
+def analyze_directory(data_dir, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Returns the LadderStats of every snapshot file in ``data_dir``, read by
+    ``workers`` processes (default: one per CPU; 1 reads them in this
+    process).
+    """
+    files = snapshot_files(data_dir)
+    chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+    workers = min(workers or os.cpu_count() or 1, len(chunks) or 1)
+    stats = LadderStats()
+    if workers == 1:
+        for chunk in chunks:
+            stats.merge(summarize_files(chunk))
+        return stats
+    with ProcessPoolExecutor(workers) as executor:
+        for summary in _in_order(executor, chunks, 2 * workers):
+            stats.merge(summary)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analytics over the ladder_data_*.json history.")
+    parser.add_argument("data_dir")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"snapshot files per worker task (default {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--top", type=int, default=20, help="characters listed by XP/hour")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = analyze_directory(args.data_dir, args.workers, args.chunk_size)
+    elapsed = time.perf_counter() - start
+    report = stats.report(args.top)
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print(f"{report['snapshots']} snapshots from {report['first']} to {report['last']}, "
+              f"{report['characters']} characters")
+        print("\nXP/hour:")
+        for row in report["xp_per_hour"]:
+            print(f"  {row['xp_per_hour']:>12,}  {row['character']} ({row['account']}), "
+                  f"{row['class']} level {row['level']}, over {row['hours']} h")
+        print("\nDeaths by class:")
+        for char_class, deaths in report["deaths_by_class"].items():
+            print(f"  {deaths:>6}  {char_class}")
+        churn = report["churn"]
+        print(f"\nRank churn: {churn['entries']} entries, {churn['exits']} exits, "
+              f"{churn['rank_changes']} rank changes ({churn['per_snapshot']} per snapshot, "
+              f"peak {churn['peak']['moves']} at {churn['peak']['timestamp']})")
+    decoder = "json" if json_loads() is json.loads else "orjson"
+    print(f"{stats.snapshots} files in {elapsed:.2f} s ({decoder})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
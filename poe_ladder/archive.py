@@ -0,0 +1,108 @@
+"""
+Content-addressed storage of the new characters found by save_new_characters.py.
+
+Every character gets one folder, named after its identity rather than after
+the moment it was found:
+
+    new_characters/new_character_<account>_<character>_<id>/character.json
+
+``id`` is a hash of the account and character names (``character_id()``), so
+saving a character that is already archived finds its folder taken and writes
+nothing. Whether a character is archived is answered by the file system (one
+``stat`` of its folder), so memory does not grow with the number of archived
+characters; the scripts only ask for characters missing from their registry.
+When ``characters.json`` is lost or reset, characters seen again are
+recognized from the archive instead of being written out a second time.
+
+Folders written before this layout (named with rank, level and a detection
+timestamp) cannot be found from the names: a single directory scan when the
+archive is opened indexes them from their ``character.json`` and keeps their
+ids, a set that no longer grows, and counts the archived characters.
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+
+from poe_ladder.fileio import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+CHARACTER_FILE = "character.json"
+_FOLDER_PREFIX = "new_character_"
+_ID = re.compile(r"_([0-9a-f]{16})$")
+
+
+def character_id(account_name, character_name):
+    """Stable identity of a character: 16 hex digits of a hash of its names."""
+    digest = hashlib.sha1(f"{account_name}\0{character_name}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def _safe(text):
+    """Folder-name-safe version of a name."""
+    return "".join(c if c.isalnum() or c in (" ", "_") else "_" for c in text)
+
+
+class NewCharacterArchive:
+    """The folders of archived new characters in ``directory``."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._legacy_ids = set()
+        self._count = 0
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.name.startswith(_FOLDER_PREFIX) or not entry.is_dir():
+                    continue
+                if _ID.search(entry.name):
+                    self._count += 1
+                    continue
+                # Older layout: the names are only in the file
+                try:
+                    with open(os.path.join(entry.path, CHARACTER_FILE), "r", encoding="utf-8") as f:
+                        character = json.load(f)
+                    self._legacy_ids.add(character_id(character["account_name"], character["character_name"]))
+                    self._count += 1
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning("Could not index %s: %s", entry.path, e)
+        logger.info("Indexed %d archived characters in %s (%d in the older layout).",
+                    self._count, self.directory, len(self._legacy_ids))
+
+    def __len__(self):
+        """Number of archived characters."""
+        return self._count
+
+    def __contains__(self, character):
+        """True if the character dict is archived already."""
+        account, name = character["account_name"], character["character_name"]
+        if character_id(account, name) in self._legacy_ids:
+            return True
+        return os.path.exists(os.path.join(self.directory, self.folder_name(character), CHARACTER_FILE))
+
+    def folder_name(self, character):
+        """The folder of a character dict."""
+        account, name = character["account_name"], character["character_name"]
+        return f"{_FOLDER_PREFIX}{_safe(account)}_{_safe(name)}_{character_id(account, name)}"
+
+    def save(self, character):
+        """
+        Archives a character dict. Returns its folder path, or None if the
+        character is archived already (nothing is written).
+        """
+        if character_id(character["account_name"], character["character_name"]) in self._legacy_ids:
+            return None
+        folder_path = os.path.join(self.directory, self.folder_name(character))
+        file_path = os.path.join(folder_path, CHARACTER_FILE)
+        if os.path.exists(file_path):
+            return None
+        os.makedirs(folder_path, exist_ok=True)
+        atomic_write_json(file_path, character, indent=4)
+        self._count += 1
+        return folder_path
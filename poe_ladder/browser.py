@@ -0,0 +1,213 @@
+"""
+Headless Chrome setup shared by the scripts and the package tools.
+
+Reads the same environment variables as the scripts: CHROMEDRIVER_PATH,
+CHROME_EXECUTABLE_PATH and CHROME_PROFILE_PATH.
+
+Every browser is started with one ScrapeProfile: the flag set the scripts
+used to build separately, plus, unless ``CHROME_LEAN_PROFILE=0``, a lean mode
+for scraping:
+
+* images, fonts, stylesheets and analytics/ad scripts are blocked through the
+  DevTools ``Network.setBlockedURLs`` command (images also through prefs), so
+  only the page, its scripts and the ladder data are downloaded;
+* background Chrome features (sync, extensions, translation, ...) are off;
+* the ``eager`` page-load strategy returns from ``driver.get()`` once the DOM
+  is ready instead of waiting for every subresource; the fetchers then wait
+  for the ladder rows themselves (see poe_ladder.wait).
+
+``CHROME_BLOCKED_URLS`` adds comma-separated URL patterns (``*`` wildcards)
+to block. ``page_transfer_stats()`` reads how many bytes a page load
+transferred from the Performance API, to see what the profile saves.
+"""
+
+import os
+import logging
+import itertools
+import threading
+
+logger = logging.getLogger(__name__)
+
+BASE_ARGUMENTS = (
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--log-level=3",
+    "--window-size=1920,1080",
+    "--disable-blink-features=AutomationControlled",
+)
+LEAN_ARGUMENTS = (
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--metrics-recording-only",
+    "--mute-audio",
+    "--no-first-run",
+)
+IMAGE_PATTERNS = ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico")
+FONT_PATTERNS = ("*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot")
+CSS_PATTERNS = ("*.css",)
+ANALYTICS_PATTERNS = (
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*facebook.net*",
+    "*hotjar.com*",
+    "*cloudflareinsights.com*",
+)
+
+_TRANSFER_STATS_SCRIPT = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? nav.transferSize : 0;
+for (var i = 0; i < resources.length; i++) { bytes += resources[i].transferSize || 0; }
+return {
+    bytes: bytes,
+    requests: resources.length + (nav ? 1 : 0),
+    dom_ready_ms: nav ? nav.domContentLoadedEventEnd : null
+};
+"""
+
+
+class ScrapeProfile:
+    """What a scraping browser loads and how it is started."""
+
+    def __init__(self, lean=True, block_images=True, block_fonts=True, block_css=True,
+                 block_analytics=True, blocked_urls=(), page_load_strategy=None):
+        self.lean = lean
+        self.block_images = block_images
+        self.block_fonts = block_fonts
+        self.block_css = block_css
+        self.block_analytics = block_analytics
+        self.blocked_urls = tuple(blocked_urls)
+        self.page_load_strategy = page_load_strategy or ("eager" if lean else "normal")
+
+    @classmethod
+    def from_env(cls):
+        """The profile configured by CHROME_LEAN_PROFILE and CHROME_BLOCKED_URLS."""
+        extra = [url.strip() for url in os.getenv("CHROME_BLOCKED_URLS", "").split(",") if url.strip()]
+        return cls(lean=os.getenv("CHROME_LEAN_PROFILE", "1") != "0", blocked_urls=extra)
+
+    def blocked_url_patterns(self):
+        patterns = list(self.blocked_urls)
+        if self.lean:
+            for enabled, group in ((self.block_images, IMAGE_PATTERNS), (self.block_fonts, FONT_PATTERNS),
+                                   (self.block_css, CSS_PATTERNS), (self.block_analytics, ANALYTICS_PATTERNS)):
+                if enabled:
+                    patterns.extend(group)
+        return patterns
+
+    def chrome_options(self, headless=True, profile_path=None):
+        from selenium.webdriver.chrome.options import Options
+
+        chrome_options = Options()
+        if headless:
+            chrome_options.add_argument("--headless")
+        if profile_path:
+            chrome_options.add_argument(f"--user-data-dir={profile_path}")
+        if os.getenv("CHROME_EXECUTABLE_PATH"):
+            chrome_options.binary_location = os.getenv("CHROME_EXECUTABLE_PATH")
+        for argument in BASE_ARGUMENTS:
+            chrome_options.add_argument(argument)
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option("useAutomationExtension", False)
+        chrome_options.page_load_strategy = self.page_load_strategy
+
+        if self.lean:
+            for argument in LEAN_ARGUMENTS:
+                chrome_options.add_argument(argument)
+            if self.block_images:
+                chrome_options.add_experimental_option(
+                    "prefs", {"profile.managed_default_content_settings.images": 2}
+                )
+        return chrome_options
+
+    def apply(self, driver):
+        """Installs the URL blocklist on a started driver."""
+        patterns = self.blocked_url_patterns()
+        if not patterns:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        except Exception as e:
+            # Only Chromium drivers speak DevTools; the page still loads without it
+            logger.warning("Could not block subresources: %s", e)
+
+
+def setup_driver(headless=True, profile_path=None, profile=None):
+    """
+    Starts a Chrome WebDriver with ``profile`` (ScrapeProfile.from_env() by
+    default). ``profile_path`` defaults to CHROME_PROFILE_PATH; concurrent
+    browsers need different profiles.
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    profile = profile or ScrapeProfile.from_env()
+    profile_path = profile_path or os.getenv("CHROME_PROFILE_PATH")
+    chrome_options = profile.chrome_options(headless, profile_path)
+
+    service = Service(executable_path=os.getenv("CHROMEDRIVER_PATH"))
+    driver = webdriver.Chrome(service=service, options=chrome_options)
+    profile.apply(driver)
+    logger.info("WebDriver initialized (profile: %s, %s page load, %d blocked URL patterns).",
+                profile_path or "temporary", profile.page_load_strategy, len(profile.blocked_url_patterns()))
+    return driver
+
+
+def numbered_profile_factory(headless=True):
+    """
+    Returns a driver factory giving every running browser its own profile,
+    CHROME_PROFILE_PATH suffixed with the lowest free number -0, -1, ... (or
+    a temporary profile). A number is freed when its driver quits, so a pool
+    of N browsers uses the profiles -0 to -(N-1) however often they are
+    restarted.
+    """
+    base = os.getenv("CHROME_PROFILE_PATH")
+    lock = threading.Lock()
+    taken = set()
+
+    def release(number):
+        with lock:
+            taken.discard(number)
+
+    def factory():
+        with lock:
+            number = next(n for n in itertools.count() if n not in taken)
+            taken.add(number)
+        try:
+            driver = setup_driver(headless, f"{base}-{number}" if base else None)
+        except BaseException:
+            release(number)
+            raise
+        quit_driver = driver.quit
+
+        def quit():
+            try:
+                quit_driver()
+            finally:
+                release(number)
+
+        driver.quit = quit
+        return driver
+
+    return factory
+
+
+def page_transfer_stats(driver):
+    """
+    Bytes transferred, request count and DOMContentLoaded time (ms) of the
+    page currently loaded in ``driver``, from the Performance API. Cached and
+    blocked resources count as 0 bytes. Returns None if unavailable.
+    """
+    try:
+        return driver.execute_script(_TRANSFER_STATS_SCRIPT)
+    except Exception as e:
+        logger.debug("Performance API not available: %s", e)
+        return None
@@ -0,0 +1,99 @@
+"""
+Change detection for ladder fetches.
+
+Most cycles fetch a ladder identical to the previous one. A fetcher given a
+ChangeDetector fingerprints what it fetched (the ladder table, or the JSON
+body) before parsing it and, when the fingerprint matches the last one, returns
+None from ``fetch_rows()`` instead of a list: the caller skips parsing, diffing
+and saving for that cycle. Over HTTP the detector also keeps the ``ETag`` and
+``Last-Modified`` validators of the last response, so the next request is
+conditional and an unchanged ladder costs a body-less ``304 Not Modified``.
+
+The detector only remembers a fingerprint once the fetch it came from has been
+parsed, so a failed parse is retried on the next cycle. A cycle that fails
+later, while saving, must ``reset()`` the detector, or the same ladder would
+be skipped as unchanged until it changes.
+"""
+
+import re
+import hashlib
+
+from poe_ladder.extract import TABLE_CLASS
+
+# A <table> tag with TABLE_CLASS among the classes of its class attribute
+_LADDER_TABLE_TAG = re.compile(
+    r"""<table\b[^>]*?\bclass\s*=\s*["']?[^"'>]*?(?<![\w-])%s(?![\w-])""" % re.escape(TABLE_CLASS),
+    re.IGNORECASE,
+)
+
+
+def content_fingerprint(content):
+    """Returns a short hex digest of ``content`` (str or bytes)."""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def ladder_table_html(html):
+    """
+    Returns the ``table.league-ladder__entries`` element of a page as a
+    string, or None if the page has no ladder table. Only the table is
+    fingerprinted: the rest of the page (scripts, tokens, ads) may change on
+    every load. The class has to be on a ``<table>`` tag, so the name showing
+    up first in inline CSS or a script does not pick the wrong part.
+    """
+    match = _LADDER_TABLE_TAG.search(html)
+    if match is None:
+        return None
+    end = html.find("</table>", match.end())
+    if end == -1:
+        return None
+    return html[match.start():end + len("</table>")]
+
+
+class ChangeDetector:
+    """
+    Remembers the fingerprint (and HTTP validators) of the last ladder fetched.
+    ``skipped_cycles`` and ``changed_cycles`` count the fetches found unchanged
+    and changed.
+    """
+
+    def __init__(self):
+        self.last_fingerprint = None
+        self.etag = None
+        self.last_modified = None
+        self.skipped_cycles = 0
+        self.changed_cycles = 0
+
+    def conditional_headers(self):
+        """Request headers making the next HTTP fetch conditional."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def not_modified(self):
+        """Records a ``304 Not Modified`` response."""
+        self.skipped_cycles += 1
+
+    def unchanged(self, fingerprint):
+        """True (and counted as skipped) if ``fingerprint`` is the last one seen."""
+        if fingerprint is not None and fingerprint == self.last_fingerprint:
+            self.skipped_cycles += 1
+            return True
+        return False
+
+    def update(self, fingerprint, headers=None):
+        """Records the fingerprint of a fetch that was parsed successfully."""
+        self.last_fingerprint = fingerprint
+        self.etag = headers.get("ETag") if headers is not None else None
+        self.last_modified = headers.get("Last-Modified") if headers is not None else None
+        self.changed_cycles += 1
+
+    def reset(self):
+        """Forgets the last ladder, so the next fetch is always parsed."""
+        self.last_fingerprint = None
+        self.etag = None
+        self.last_modified = None
@@ -0,0 +1,407 @@
+"""
+Columnar time-series store for ladder history.
+
+Turns the snapshots written by save_ladder_data.py (``ladder_data_*.json``
+files or keyframe/delta storage) into typed, fixed-width column files:
+
+    <store>/meta.json              byte order and format version
+    <store>/dictionary.json        account, character and class names
+    <store>/commits.jsonl          one line per appended snapshot
+    <store>/<YYYYMMDD>/<column>    one partition per day
+
+Columns are ``timestamp`` (int64, epoch seconds), ``rank`` (int32), ``level``
+(int16), ``experience`` (int64), ``dead`` (uint8) and the dictionary codes
+``account``, ``character`` and ``class`` (uint32). Unparsable numbers are
+stored as -1.
+
+A snapshot is appended to each column file in turn, then committed by a line
+in ``commits.jsonl`` with its source file and the row count of its partition.
+Opening the store truncates the columns to their last committed row count, so
+a crash in the middle of an append leaves no half-written snapshot behind and
+the snapshot is simply ingested again. Stores written before the commit log
+(with ``ingested.json``) are cut to their shortest column once and logged.
+
+Queries memory-map only the partitions overlapping the requested time range
+and only the columns they need, so the store never has to fit in memory.
+``export_parquet()`` writes the same data as Parquet when pyarrow is
+installed.
+
+    python -m poe_ladder.columnar ingest ladder_data ladder_columns
+    python -m poe_ladder.columnar history ladder_columns CHARACTER [--start TS] [--end TS]
+"""
+
+import os
+import re
+import sys
+import mmap
+import json
+import argparse
+import logging
+from array import array
+from datetime import datetime
+
+from poe_ladder.fileio import atomic_write_json
+from poe_ladder.models import LadderEntry
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+COMMIT_LOG = "commits.jsonl"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+PARTITION_FORMAT = "%Y%m%d"
+
+# column name -> array typecode
+COLUMNS = {
+    "timestamp": "q",
+    "rank": "i",
+    "level": "h",
+    "experience": "q",
+    "dead": "B",
+    "account": "I",
+    "character": "I",
+    "class": "I",
+}
+DICTIONARY_FIELDS = ("account", "character", "class")
+
+_SNAPSHOT_FILE = re.compile(r"ladder_data_(\d{8}_\d{6})\.json$")
+
+
+def _or_missing(value):
+    return -1 if value is None else value
+
+
+def _epoch(timestamp):
+    """YYYYMMDD_HHMMSS (local time, as the scripts write it) -> epoch seconds."""
+    return int(datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp())
+
+
+def _partition_of(epoch):
+    return datetime.fromtimestamp(epoch).strftime(PARTITION_FORMAT)
+
+
+class ColumnarLadderStore:
+    """Append-only columnar store with per-day partitions."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._check_meta()
+        self._dictionary = self._load_json("dictionary.json", {field: [] for field in DICTIONARY_FIELDS})
+        self._codes = {
+            field: {value: code for code, value in enumerate(values)}
+            for field, values in self._dictionary.items()
+        }
+        # Before the commit log, ingested files were listed in ingested.json
+        self._ingested = set(self._load_json("ingested.json", []))
+        self._rows = {}  # partition -> committed rows
+        self._dictionary_dirty = False
+        self._recover()
+
+    def _load_json(self, name, default):
+        path = os.path.join(self.root, name)
+        if not os.path.exists(path):
+            return default
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _check_meta(self):
+        meta = self._load_json("meta.json", None)
+        if meta is None:
+            atomic_write_json(os.path.join(self.root, "meta.json"),
+                              {"version": FORMAT_VERSION, "byteorder": sys.byteorder})
+        elif meta["byteorder"] != sys.byteorder or meta["version"] != FORMAT_VERSION:
+            raise ValueError(f"{self.root} was written with an incompatible format: {meta}")
+
+    def _code(self, field, value):
+        codes = self._codes[field]
+        code = codes.get(value)
+        if code is None:
+            code = len(self._dictionary[field])
+            self._dictionary[field].append(value)
+            codes[value] = code
+            self._dictionary_dirty = True
+        return code
+
+    def _recover(self):
+        """Reads the commit log and truncates the columns to the committed rows."""
+        path = os.path.join(self.root, COMMIT_LOG)
+        logged = os.path.exists(path)
+        if logged:
+            with open(path, "rb") as f:
+                data = f.read()
+            complete = data.rfind(b"\n") + 1
+            for line in data[:complete].splitlines():
+                commit = json.loads(line)
+                self._rows[commit["partition"]] = commit["rows"]
+                if commit["source"] is not None:
+                    self._ingested.add(commit["source"])
+            if complete < len(data):
+                logger.warning("Dropping a torn line at the end of %s.", path)
+                with open(path, "r+b") as f:
+                    f.truncate(complete)
+
+        for partition in self.partitions():
+            lengths = {}
+            for name, typecode in COLUMNS.items():
+                column_path = os.path.join(self.root, partition, name)
+                size = os.path.getsize(column_path) if os.path.exists(column_path) else 0
+                lengths[name] = size // array(typecode).itemsize
+            if logged:
+                rows = self._rows.get(partition, 0)
+            else:
+                rows = min(lengths.values())
+                self._commit(partition, rows, None)
+            if any(length < rows for length in lengths.values()):
+                raise ValueError(f"{self.root}/{partition} has fewer rows than committed ({rows}): {lengths}")
+            for name, length in lengths.items():
+                if length > rows:
+                    logger.warning("Truncating %s/%s/%s from %d to %d rows (uncommitted append).",
+                                   self.root, partition, name, length, rows)
+                    with open(os.path.join(self.root, partition, name), "r+b") as f:
+                        f.truncate(rows * array(COLUMNS[name]).itemsize)
+
+    def _commit(self, partition, rows, source):
+        with open(os.path.join(self.root, COMMIT_LOG), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"partition": partition, "rows": rows, "source": source}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._rows[partition] = rows
+        if source is not None:
+            self._ingested.add(source)
+
+    def partitions(self):
+        """Returns the partition names (YYYYMMDD), oldest first."""
+        return sorted(
+            name for name in os.listdir(self.root)
+            if len(name) == 8 and name.isdigit() and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    # Ingest
+
+    def append_snapshot(self, timestamp, ladder, source=None):
+        """
+        Appends and commits one snapshot. ``timestamp`` is a datetime or a
+        YYYYMMDD_HHMMSS string, ``ladder`` a list of LadderEntry or of dicts
+        in any of the scripts' layouts, ``source`` the name it is ingested
+        under, if any.
+        """
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.strftime(TIMESTAMP_FORMAT)
+        epoch = _epoch(timestamp)
+        columns = {name: array(typecode) for name, typecode in COLUMNS.items()}
+        for entry in ladder:
+            if not isinstance(entry, LadderEntry):
+                entry = LadderEntry.from_dict(entry)
+            columns["timestamp"].append(epoch)
+            columns["rank"].append(_or_missing(entry.rank))
+            columns["level"].append(_or_missing(entry.level))
+            columns["experience"].append(_or_missing(entry.experience))
+            columns["dead"].append(1 if entry.dead else 0)
+            columns["account"].append(self._code("account", entry.account))
+            columns["character"].append(self._code("character", entry.character))
+            columns["class"].append(self._code("class", entry.char_class))
+
+        partition = _partition_of(epoch)
+        partition_dir = os.path.join(self.root, partition)
+        os.makedirs(partition_dir, exist_ok=True)
+        # The dictionary goes first so codes on disk always resolve
+        if self._dictionary_dirty:
+            self._save_dictionary()
+        for name, values in columns.items():
+            with open(os.path.join(partition_dir, name), "ab") as f:
+                values.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+        self._commit(partition, self._rows.get(partition, 0) + len(ladder), source)
+        return len(ladder)
+
+    def _save_dictionary(self):
+        atomic_write_json(os.path.join(self.root, "dictionary.json"), self._dictionary)
+        self._dictionary_dirty = False
+
+    def ingest_directory(self, data_dir):
+        """
+        Ingests the ``ladder_data_*.json`` files of ``data_dir`` that are not
+        in the store yet, oldest first. Returns the number of files ingested.
+        """
+        files = sorted(
+            (match.group(1), name)
+            for name in os.listdir(data_dir)
+            for match in [_SNAPSHOT_FILE.match(name)] if match
+        )
+        count = 0
+        for timestamp, name in files:
+            if name in self._ingested:
+                continue
+            with open(os.path.join(data_dir, name), "r", encoding="utf-8") as f:
+                ladder = json.load(f)
+            self.append_snapshot(timestamp, ladder, source=name)
+            count += 1
+        return count
+
+    def ingest_delta_store(self, delta_store):
+        """Ingests every snapshot of a LadderDeltaStore not in the store yet."""
+        count = 0
+        for timestamp, ladder in delta_store.snapshots():
+            name = f"delta:{timestamp}"
+            if name in self._ingested:
+                continue
+            self.append_snapshot(timestamp, ladder, source=name)
+            count += 1
+        return count
+
+    # Queries
+
+    def _open_column(self, partition, name):
+        """Memory-maps a column, returns (mmap, memoryview) or None if empty."""
+        path = os.path.join(self.root, partition, name)
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return None
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped, memoryview(mapped).cast(COLUMNS[name])
+
+    def _partitions_between(self, start, end):
+        first = _partition_of(start) if start is not None else None
+        last = _partition_of(end) if end is not None else None
+        return [
+            partition for partition in self.partitions()
+            if (first is None or partition >= first) and (last is None or partition <= last)
+        ]
+
+    def character_history(self, character_name, account_name=None, start=None, end=None):
+        """
+        Returns the rows of one character between ``start`` and ``end``
+        (datetimes or YYYYMMDD_HHMMSS strings, both inclusive) as dicts with
+        timestamp, rank, level, experience and dead, oldest first.
+        """
+        character_code = self._codes["character"].get(character_name)
+        account_code = self._codes["account"].get(account_name) if account_name is not None else None
+        if character_code is None or (account_name is not None and account_code is None):
+            return []
+        start = self._as_epoch(start)
+        end = self._as_epoch(end)
+
+        history = []
+        for partition in self._partitions_between(start, end):
+            opened = {}
+            try:
+                for name in ("character", "timestamp"):
+                    opened[name] = self._open_column(partition, name)
+                if opened["character"] is None:
+                    continue
+                characters = opened["character"][1]
+                timestamps = opened["timestamp"][1]
+                matches = [
+                    index for index, code in enumerate(characters)
+                    if code == character_code
+                    and (start is None or timestamps[index] >= start)
+                    and (end is None or timestamps[index] <= end)
+                ]
+                if not matches:
+                    continue
+                for name in ("account", "rank", "level", "experience", "dead"):
+                    opened[name] = self._open_column(partition, name)
+                accounts = opened["account"][1]
+                for index in matches:
+                    if account_code is not None and accounts[index] != account_code:
+                        continue
+                    history.append({
+                        "timestamp": datetime.fromtimestamp(timestamps[index]).strftime(TIMESTAMP_FORMAT),
+                        "account_name": self._dictionary["account"][accounts[index]],
+                        "rank": opened["rank"][1][index],
+                        "level": opened["level"][1][index],
+                        "experience": opened["experience"][1][index],
+                        "dead": bool(opened["dead"][1][index]),
+                    })
+            finally:
+                for column in opened.values():
+                    if column is not None:
+                        column[1].release()
+                        column[0].close()
+        return history
+
+    @staticmethod
+    def _as_epoch(value):
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return int(value.timestamp())
+        return _epoch(value)
+
+    def export_parquet(self, output_dir):
+        """
+        Writes one Parquet file per partition, with dictionary-encoded names.
+        Needs pyarrow.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("export_parquet() needs pyarrow: pip install pyarrow") from e
+
+        os.makedirs(output_dir, exist_ok=True)
+        for partition in self.partitions():
+            data = {}
+            for name, typecode in COLUMNS.items():
+                values = array(typecode)
+                path = os.path.join(self.root, partition, name)
+                with open(path, "rb") as f:
+                    values.frombytes(f.read())
+                data[name] = values
+            table = pa.table({
+                "timestamp": pa.array(data["timestamp"], pa.int64()).cast(pa.timestamp("s", tz="UTC")),
+                "rank": pa.array(data["rank"], pa.int32()),
+                "level": pa.array(data["level"], pa.int16()),
+                "experience": pa.array(data["experience"], pa.int64()),
+                "dead": pa.array([bool(v) for v in data["dead"]]),
+                **{
+                    field: pa.DictionaryArray.from_arrays(
+                        pa.array(data[field], pa.uint32()), pa.array(self._dictionary[field], pa.string())
+                    )
+                    for field in DICTIONARY_FIELDS
+                },
+            })
+            pq.write_table(table, os.path.join(output_dir, f"{partition}.parquet"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar ladder history store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="ingest ladder_data_*.json files")
+    ingest.add_argument("data_dir")
+    ingest.add_argument("store")
+    ingest.add_argument("--delta", action="store_true",
+                        help="data_dir holds keyframe/delta storage (LADDER_STORAGE=delta)")
+
+    history = commands.add_parser("history", help="print the history of a character")
+    history.add_argument("store")
+    history.add_argument("character")
+    history.add_argument("--account")
+    history.add_argument("--start", help="YYYYMMDD_HHMMSS")
+    history.add_argument("--end", help="YYYYMMDD_HHMMSS")
+
+    export = commands.add_parser("parquet", help="export the store as Parquet (needs pyarrow)")
+    export.add_argument("store")
+    export.add_argument("output_dir")
+
+    args = parser.parse_args()
+    store = ColumnarLadderStore(args.store)
+    if args.command == "ingest":
+        if args.delta:
+            from poe_ladder.deltas import LadderDeltaStore
+            count = store.ingest_delta_store(LadderDeltaStore(args.data_dir))
+        else:
+            count = store.ingest_directory(args.data_dir)
+        print(f"Ingested {count} snapshots into {args.store}")
+    elif args.command == "history":
+        for row in store.character_history(args.character, args.account, args.start, args.end):
+            print(json.dumps(row))
+    else:
+        store.export_parquet(args.output_dir)
+        print(f"Exported {args.store} to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
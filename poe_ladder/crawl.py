@@ -0,0 +1,188 @@
+"""
+Paginated crawl of the full ladder.
+
+``POE_LADDER_PAGE`` only shows the top of the ladder. The crawler fetches the
+first page, works out the other pages and fetches them in parallel over HTTP
+(at most ``concurrency`` at a time), then merges everything into one
+rank-ordered list of LadderRow.
+
+* JSON ladder endpoint: the ``total`` of the first response gives the pages,
+  requested with ``offset``/``limit`` query parameters after the rows of the
+  first response.
+* HTML ladder pages: ``pages`` pages are requested with a ``page`` query
+  parameter; empty pages past the end of the ladder are dropped.
+
+The crawler has the fetcher interface (``fetch_rows()``, ``close()``,
+``last_load_seconds``) so the scripts can use it in place of a fetcher.
+``last_page_latencies`` holds ``(url, seconds, rows)`` for every page of the
+last crawl. Crawling is HTTP only: fetching hundreds of pages through Chrome
+would not fit in a cycle.
+
+A page that fails is fetched again up to ``retries`` times. If it still
+fails, ``fetch_rows()`` raises FetchError rather than returning a partial
+ladder: a snapshot with pages missing would be saved as complete and diffed
+into false exits (and false entries on the next full crawl).
+
+With a ``change_detector`` every page keeps its own detector (and HTTP
+validators): unchanged pages reuse the rows parsed last time, and when no page
+changed at all ``fetch_rows()`` returns None like the other fetchers.
+"""
+
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from poe_ladder.change import ChangeDetector, content_fingerprint
+from poe_ladder.fetch import FetchError, HttpLadderFetcher, make_session
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 200  # JSON endpoint maximum
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 2  # extra attempts for a failed page
+
+
+def with_query(url, **params):
+    """Returns ``url`` with the given query parameters set."""
+    parts = urlparse(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update({key: str(value) for key, value in params.items()})
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def _rank_key(row):
+    try:
+        return (0, int(row.rank.replace(",", "")))
+    except ValueError:
+        return (1, 0)
+
+
+def merge_pages(pages):
+    """
+    Merges the rows of several pages into one rank-ordered list. A character
+    seen on two pages (it moved while the pages were fetched) is kept once,
+    at its best rank.
+    """
+    rows = sorted((row for page in pages for row in page), key=_rank_key)
+    seen = set()
+    merged = []
+    for row in rows:
+        key = (row.account, row.character)
+        if key not in seen:
+            seen.add(key)
+            merged.append(row)
+    return merged
+
+
+class LadderCrawler:
+    """Fetches every page of a ladder in parallel."""
+
+    def __init__(self, url, pages=1, page_size=DEFAULT_PAGE_SIZE, max_entries=None,
+                 concurrency=DEFAULT_CONCURRENCY, page_param="page", session=None,
+                 change_detector=None, retries=DEFAULT_RETRIES):
+        self.url = url
+        self.pages = pages
+        self.page_size = page_size
+        self.max_entries = max_entries
+        self.concurrency = concurrency
+        self.page_param = page_param
+        self.owns_session = session is None
+        self.session = session or make_session(pool_size=concurrency)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ladder-crawl")
+        self.change_detector = change_detector
+        self.retries = retries
+        # url -> (fetcher, rows of its last changed fetch), with change detection only
+        self._pages = {}
+        self.last_load_seconds = None
+        self.last_page_latencies = []
+
+    def _fetch_page(self, url):
+        if self.change_detector is None:
+            fetcher = HttpLadderFetcher(url, session=self.session)
+            rows = fetcher.fetch_rows()
+            return url, rows, fetcher.last_load_seconds, fetcher.last_total
+
+        fetcher, cached = self._pages.get(url) or (
+            HttpLadderFetcher(url, session=self.session, change_detector=ChangeDetector()), [])
+        rows = fetcher.fetch_rows()
+        if rows is None:
+            rows = cached
+        self._pages[url] = (fetcher, rows)
+        return url, rows, fetcher.last_load_seconds, fetcher.last_total
+
+    def _crawl_fingerprint(self, urls):
+        """Fingerprint of the last crawl, from the fingerprints of its pages."""
+        # Empty pages past the end of the ladder have no fingerprint
+        parts = [self._pages[url][0].change_detector.last_fingerprint or "-" for url in urls]
+        return content_fingerprint("\n".join(parts))
+
+    def _remaining_urls(self, first_count, total):
+        if total is not None:
+            # JSON endpoint: offsets after the first page, up to the total
+            limit = total if self.max_entries is None else min(total, self.max_entries)
+            if not first_count:
+                return []
+            return [
+                with_query(self.url, offset=offset, limit=self.page_size)
+                for offset in range(first_count, limit, self.page_size)
+            ]
+        return [with_query(self.url, **{self.page_param: page}) for page in range(2, self.pages + 1)]
+
+    def fetch_rows(self):
+        start = time.monotonic()
+        first_url, first_rows, first_seconds, total = self._fetch_page(self.url)
+        latencies = [(first_url, first_seconds, len(first_rows))]
+        pages = [first_rows]
+
+        urls = self._remaining_urls(len(first_rows), total)
+        results = {}
+        pending = urls
+        for attempt in range(self.retries + 1):
+            if attempt:
+                logger.warning("Retrying %d failed crawl pages (attempt %d of %d).",
+                               len(pending), attempt + 1, self.retries + 1)
+            failed = []
+            futures = [(url, self.executor.submit(self._fetch_page, url)) for url in pending]
+            for url, future in futures:
+                try:
+                    results[url] = future.result()
+                except FetchError as e:
+                    logger.error("Crawl page failed: %s", e)
+                    failed.append(url)
+            pending = failed
+            if not pending:
+                break
+        if pending:
+            # A partial ladder must not be saved or diffed as if it were complete
+            raise FetchError(f"{len(pending)} of {len(urls) + 1} crawl pages failed after "
+                             f"{self.retries + 1} attempts, first: {pending[0]}")
+        for url in urls:
+            _, rows, seconds, _ = results[url]
+            latencies.append((url, seconds, len(rows)))
+            pages.append(rows)
+
+        self.last_page_latencies = latencies
+        fingerprint = None
+        if self.change_detector is not None:
+            fingerprint = self._crawl_fingerprint([self.url] + urls)
+            if self.change_detector.unchanged(fingerprint):
+                self.last_load_seconds = time.monotonic() - start
+                logger.info("Crawled %d pages in %.2fs, ladder unchanged.",
+                            len(latencies), self.last_load_seconds)
+                return None
+
+        merged = merge_pages(pages)
+        if self.max_entries is not None:
+            merged = merged[:self.max_entries]
+        if fingerprint is not None:
+            self.change_detector.update(fingerprint)
+        self.last_load_seconds = time.monotonic() - start
+        logger.info("Crawled %d pages into %d entries in %.2fs.",
+                    len(latencies), len(merged), self.last_load_seconds)
+        return merged
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        if self.owns_session:
+            self.session.close()
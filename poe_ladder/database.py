@@ -0,0 +1,312 @@
+"""
+SQLite storage for everything the scripts collect.
+
+One database file holds what is otherwise spread over ``ladder_data/*.json``,
+``characters.json`` and the ``new_characters/`` folders:
+
+    snapshots       one row per scrape: timestamp and source
+                    ("ladder" for save_ladder_data.py, "account" for the
+                    account scripts)
+    ladder_entries  the characters of every snapshot
+    characters      latest state of every character ever seen, with the
+                    first and last time it was seen
+    new_characters  characters detected by save_new_characters.py
+
+The database runs in WAL mode, so queries can run while a script writes, and
+``write_cycle()`` stores a whole cycle in one transaction. Accounts are
+compared case-insensitively, like find_account_characters.py does, and
+account, character and timestamp lookups are indexed.
+
+    python -m poe_ladder.database ladder.db characters ACCOUNT
+    python -m poe_ladder.database ladder.db history ACCOUNT [--character NAME] [--since TS] [--until TS]
+    python -m poe_ladder.database ladder.db character NAME
+    python -m poe_ladder.database ladder.db new [--account ACCOUNT] [--since TS]
+    python -m poe_ladder.database ladder.db import ladder_data [--characters characters.json]
+
+Timestamps are ISO 8601 (``2025-01-31T18:00:00``); ``--since`` and
+``--until`` accept any prefix, e.g. ``2025-01-31``.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import logging
+from datetime import datetime
+
+from poe_ladder.models import LadderEntry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "ladder.db"
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ladder_entries (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id),
+    rank INTEGER,
+    account TEXT NOT NULL COLLATE NOCASE,
+    character TEXT NOT NULL,
+    class TEXT,
+    level INTEGER,
+    experience INTEGER,
+    dead INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS characters (
+    account TEXT NOT NULL COLLATE NOCASE,
+    character TEXT NOT NULL,
+    class TEXT,
+    rank INTEGER,
+    level INTEGER,
+    experience INTEGER,
+    dead INTEGER NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    PRIMARY KEY (account, character)
+);
+CREATE TABLE IF NOT EXISTS new_characters (
+    id INTEGER PRIMARY KEY,
+    detected_at TEXT NOT NULL,
+    account TEXT NOT NULL COLLATE NOCASE,
+    character TEXT NOT NULL,
+    class TEXT,
+    rank INTEGER,
+    level INTEGER,
+    dead INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_timestamp ON snapshots (timestamp);
+CREATE INDEX IF NOT EXISTS ladder_entries_snapshot ON ladder_entries (snapshot_id);
+CREATE INDEX IF NOT EXISTS ladder_entries_account ON ladder_entries (account, snapshot_id);
+CREATE INDEX IF NOT EXISTS ladder_entries_character ON ladder_entries (character, snapshot_id);
+CREATE INDEX IF NOT EXISTS characters_character ON characters (character);
+CREATE INDEX IF NOT EXISTS new_characters_account ON new_characters (account, detected_at);
+CREATE INDEX IF NOT EXISTS new_characters_detected ON new_characters (detected_at);
+"""
+
+# An older sighting (e.g. from an import) never overwrites a newer state
+_UPSERT_CHARACTER = """
+INSERT INTO characters (account, character, class, rank, level, experience, dead, first_seen, last_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (account, character) DO UPDATE SET
+    class = CASE WHEN excluded.last_seen >= last_seen THEN excluded.class ELSE class END,
+    rank = CASE WHEN excluded.last_seen >= last_seen THEN excluded.rank ELSE rank END,
+    level = CASE WHEN excluded.last_seen >= last_seen THEN excluded.level ELSE level END,
+    experience = CASE WHEN excluded.last_seen >= last_seen THEN excluded.experience ELSE experience END,
+    dead = CASE WHEN excluded.last_seen >= last_seen THEN excluded.dead ELSE dead END,
+    first_seen = min(first_seen, excluded.first_seen),
+    last_seen = max(last_seen, excluded.last_seen)
+"""
+
+_SNAPSHOT_FILE = re.compile(r"ladder_data_(\d{8}_\d{6})\.json$")
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _until(value):
+    # "2025-01-31" must include the whole day
+    return value + "\uffff" if value else None
+
+
+class LadderDatabase:
+    """The SQLite database at ``path``, created on first use."""
+
+    def __init__(self, path=DEFAULT_PATH, timeout=30):
+        import sqlite3
+
+        self.path = path
+        self._connection = sqlite3.connect(path, timeout=timeout)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # Safe in WAL mode: a crash can only lose the last transactions, never corrupt the file
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write_cycle(self, entries, source="ladder", timestamp=None, new_characters=()):
+        """
+        Stores one cycle in a single transaction: a snapshot of ``entries``
+        (LadderEntry, LadderRow or dicts in any script layout), the latest
+        state of those characters and the ``new_characters`` detected.
+        Returns the id of the snapshot.
+        """
+        timestamp = timestamp or _now()
+        entries = [LadderEntry.coerce(item) for item in entries]
+        with self._connection:
+            snapshot_id = self._connection.execute(
+                "INSERT INTO snapshots (timestamp, source) VALUES (?, ?)", (timestamp, source)
+            ).lastrowid
+            self._connection.executemany(
+                "INSERT INTO ladder_entries (snapshot_id, rank, account, character, class, level, experience, dead) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(snapshot_id, e.rank, e.account, e.character, e.char_class, e.level, e.experience, e.dead)
+                 for e in entries],
+            )
+            self._upsert_characters(entries, timestamp)
+            self._connection.executemany(
+                "INSERT INTO new_characters (detected_at, account, character, class, rank, level, dead) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(timestamp, e.account, e.character, e.char_class, e.rank, e.level, e.dead)
+                 for e in map(LadderEntry.coerce, new_characters)],
+            )
+        return snapshot_id
+
+    def _upsert_characters(self, entries, first_seen, last_seen=None):
+        self._connection.executemany(
+            _UPSERT_CHARACTER,
+            [(e.account, e.character, e.char_class, e.rank, e.level, e.experience, e.dead,
+              first_seen, last_seen or first_seen) for e in entries],
+        )
+
+    def import_registry(self, records):
+        """Merges characters.json records (with first_seen/last_seen) into ``characters``."""
+        with self._connection:
+            for record in records:
+                seen = record.get("first_seen") or _now()
+                self._upsert_characters([LadderEntry.from_dict(record)], seen, record.get("last_seen") or seen)
+
+    def import_directory(self, data_dir):
+        """
+        Imports the ``ladder_data_*.json`` files of ``data_dir`` not imported
+        yet (by timestamp), one transaction each. Returns how many were imported.
+        """
+        known = {row[0] for row in self._connection.execute(
+            "SELECT timestamp FROM snapshots WHERE source = 'ladder'")}
+        count = 0
+        for name in sorted(os.listdir(data_dir)):
+            match = _SNAPSHOT_FILE.match(name)
+            if not match:
+                continue
+            timestamp = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").isoformat()
+            if timestamp in known:
+                continue
+            try:
+                with open(os.path.join(data_dir, name), "r", encoding="utf-8") as f:
+                    ladder = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning("Skipping %s: %s", name, e)
+                continue
+            self.write_cycle(ladder, "ladder", timestamp)
+            count += 1
+        return count
+
+    def _query(self, sql, parameters=()):
+        return [dict(row) for row in self._connection.execute(sql, parameters)]
+
+    def account_characters(self, account):
+        """The latest known state of every character of ``account``."""
+        return self._query(
+            "SELECT * FROM characters WHERE account = ? ORDER BY last_seen DESC, character", (account,)
+        )
+
+    def account_history(self, account, character=None, since=None, until=None):
+        """Every snapshot row of ``account`` (or one of its characters), oldest first."""
+        sql = ("SELECT s.timestamp, s.source, e.rank, e.account, e.character, e.class, e.level, e.experience, e.dead "
+               "FROM ladder_entries e JOIN snapshots s ON s.id = e.snapshot_id WHERE e.account = ?")
+        parameters = [account]
+        if character is not None:
+            sql += " AND e.character = ?"
+            parameters.append(character)
+        return self._history(sql, parameters, since, until)
+
+    def character_history(self, character, since=None, until=None):
+        """Every snapshot row of characters named ``character``, oldest first."""
+        sql = ("SELECT s.timestamp, s.source, e.rank, e.account, e.character, e.class, e.level, e.experience, e.dead "
+               "FROM ladder_entries e JOIN snapshots s ON s.id = e.snapshot_id WHERE e.character = ?")
+        return self._history(sql, [character], since, until)
+
+    def _history(self, sql, parameters, since, until):
+        if since:
+            sql += " AND s.timestamp >= ?"
+            parameters.append(since)
+        if until:
+            sql += " AND s.timestamp <= ?"
+            parameters.append(_until(until))
+        return self._query(sql + " ORDER BY s.timestamp, e.rank", parameters)
+
+    def new_characters(self, account=None, since=None):
+        """Characters detected by save_new_characters.py, newest first."""
+        sql = "SELECT * FROM new_characters WHERE 1 = 1"
+        parameters = []
+        if account is not None:
+            sql += " AND account = ?"
+            parameters.append(account)
+        if since:
+            sql += " AND detected_at >= ?"
+            parameters.append(since)
+        return self._query(sql + " ORDER BY detected_at DESC, id DESC", parameters)
+
+    def close(self):
+        self._connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the SQLite ladder database.")
+    parser.add_argument("database", help=f"database file (LADDER_DATABASE, default {DEFAULT_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    characters = commands.add_parser("characters", help="latest state of an account's characters")
+    characters.add_argument("account")
+
+    history = commands.add_parser("history", help="snapshot history of an account")
+    history.add_argument("account")
+    history.add_argument("--character")
+    history.add_argument("--since", help="ISO timestamp or prefix")
+    history.add_argument("--until", help="ISO timestamp or prefix")
+
+    character = commands.add_parser("character", help="snapshot history of a character")
+    character.add_argument("character")
+    character.add_argument("--since", help="ISO timestamp or prefix")
+    character.add_argument("--until", help="ISO timestamp or prefix")
+
+    new = commands.add_parser("new", help="characters detected by save_new_characters.py")
+    new.add_argument("--account")
+    new.add_argument("--since", help="ISO timestamp or prefix")
+
+    ingest = commands.add_parser("import", help="import ladder_data_*.json files and characters.json")
+    ingest.add_argument("data_dir")
+    ingest.add_argument("--characters", help="characters.json to merge into the characters table")
+
+    args = parser.parse_args()
+    with LadderDatabase(args.database) as database:
+        start = time.perf_counter()
+        if args.command == "import":
+            count = database.import_directory(args.data_dir)
+            print(f"Imported {count} snapshots into {args.database}")
+            if args.characters:
+                with open(args.characters, "r", encoding="utf-8") as f:
+                    records = json.load(f)
+                database.import_registry(records)
+                print(f"Merged {len(records)} characters from {args.characters}")
+            return
+        if args.command == "characters":
+            rows = database.account_characters(args.account)
+        elif args.command == "history":
+            rows = database.account_history(args.account, args.character, args.since, args.until)
+        elif args.command == "character":
+            rows = database.character_history(args.character, args.since, args.until)
+        else:
+            rows = database.new_characters(args.account, args.since)
+        elapsed = time.perf_counter() - start
+        for row in rows:
+            print(json.dumps(row))
+        print(f"{len(rows)} rows in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Keyframe + delta storage for ladder snapshots.
+
+Instead of one pretty-printed JSON file per scrape, a full keyframe is written
+every ``keyframe_every`` snapshots and the scrapes in between are stored as
+diffs against the previous one: entries, exits and field changes (rank moves,
+level/experience, deaths). Files live in one directory:
+
+    keyframe_YYYYMMDD_HHMMSS.json   full ladder, compact JSON
+    deltas_YYYYMMDD_HHMMSS.jsonl    one diff per line, for that keyframe
+
+``load_at()`` rebuilds the ladder as it was at any timestamp. Every diff is
+checked against the snapshot it came from before it is written; if it would
+not rebuild the snapshot exactly (e.g. duplicate names), a keyframe is written
+instead.
+
+Rebuild from the command line:
+    python -m poe_ladder.deltas ladder_data 20250119_153000
+"""
+
+import os
+import sys
+import json
+import logging
+from datetime import datetime
+
+from poe_ladder.fileio import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+DEFAULT_KEYFRAME_EVERY = 60  # snapshots
+
+_KEYFRAME_PREFIX = "keyframe_"
+_DELTAS_PREFIX = "deltas_"
+
+
+def entry_key(entry):
+    """Identity of a ladder entry across snapshots."""
+    return (entry["account_name"], entry["character_name"])
+
+
+def _rank_order(entry):
+    rank = entry.get("rank")
+    try:
+        return (0, int(rank))
+    except (TypeError, ValueError):
+        return (1, 0)
+
+
+def diff_ladders(old, new):
+    """
+    Returns the delta turning the ``old`` ladder into ``new``:
+    ``{"exits": [key, ...], "entries": [entry, ...], "changes": [[key, {field: value}], ...]}``
+    with keys as ``[account_name, character_name]`` lists.
+    """
+    old_by_key = {entry_key(entry): entry for entry in old}
+    new_keys = set()
+    entries = []
+    changes = []
+    for entry in new:
+        key = entry_key(entry)
+        new_keys.add(key)
+        previous = old_by_key.get(key)
+        if previous is None:
+            entries.append(entry)
+            continue
+        changed = {field: value for field, value in entry.items() if previous.get(field) != value}
+        if changed:
+            changes.append([list(key), changed])
+    exits = [list(key) for key in old_by_key if key not in new_keys]
+    return {"exits": exits, "entries": entries, "changes": changes}
+
+
+def apply_delta(old, delta):
+    """Applies a delta from diff_ladders() to the ``old`` ladder and returns the new one."""
+    by_key = {entry_key(entry): dict(entry) for entry in old}
+    for key in delta["exits"]:
+        by_key.pop(tuple(key), None)
+    for key, changed in delta["changes"]:
+        by_key[tuple(key)].update(changed)
+    for entry in delta["entries"]:
+        by_key[entry_key(entry)] = dict(entry)
+    # dicts keep insertion order and sorted() is stable, so entries with the
+    # same rank keep their previous relative order
+    return sorted(by_key.values(), key=_rank_order)
+
+
+def is_empty_delta(delta):
+    return not (delta["exits"] or delta["entries"] or delta["changes"])
+
+
+class LadderDeltaStore:
+    """Writes ladder snapshots as keyframes and deltas and reads them back."""
+
+    def __init__(self, directory, keyframe_every=DEFAULT_KEYFRAME_EVERY):
+        self.directory = directory
+        self.keyframe_every = keyframe_every
+        self._last = None
+        self._deltas_path = None
+        self._since_keyframe = 0
+        self._last_timestamp = None
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, ladder, now=None):
+        """
+        Stores a snapshot taken at ``now``. Returns "keyframe" or "delta"
+        depending on what was written. Snapshots are named to the second, so
+        one taken in the same second as an earlier one raises ValueError
+        instead of overwriting it.
+        """
+        timestamp = (now or datetime.now()).strftime(TIMESTAMP_FORMAT)
+        if self._last_timestamp is not None and timestamp <= self._last_timestamp:
+            raise ValueError(f"A snapshot at {timestamp} or later is already stored.")
+        # The keyframe counts as the first of every ``keyframe_every`` snapshots
+        if self._last is not None and self._since_keyframe < self.keyframe_every - 1:
+            delta = diff_ladders(self._last, ladder)
+            line = json.dumps({"timestamp": timestamp, **delta}, separators=(",", ":"))
+            # A delta bigger than half a keyframe (e.g. league start) is not worth it
+            if (len(line) * 2 < len(json.dumps(ladder, separators=(",", ":")))
+                    and apply_delta(self._last, delta) == ladder):
+                with open(self._deltas_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                self._last = ladder
+                self._last_timestamp = timestamp
+                self._since_keyframe += 1
+                return "delta"
+
+        keyframe_path = os.path.join(self.directory, f"{_KEYFRAME_PREFIX}{timestamp}.json")
+        # e.g. a restart within the same second: keep the keyframe its deltas belong to
+        if os.path.exists(keyframe_path):
+            raise ValueError(f"A keyframe at {timestamp} is already stored.")
+        atomic_write_json(keyframe_path, {"timestamp": timestamp, "ladder": ladder})
+        self._deltas_path = os.path.join(self.directory, f"{_DELTAS_PREFIX}{timestamp}.jsonl")
+        self._last = ladder
+        self._last_timestamp = timestamp
+        self._since_keyframe = 0
+        return "keyframe"
+
+    def keyframe_timestamps(self):
+        """Returns the timestamps of all keyframes, oldest first."""
+        return sorted(
+            name[len(_KEYFRAME_PREFIX):-len(".json")]
+            for name in os.listdir(self.directory)
+            if name.startswith(_KEYFRAME_PREFIX) and name.endswith(".json")
+        )
+
+    def _read_deltas(self, keyframe_timestamp):
+        path = os.path.join(self.directory, f"{_DELTAS_PREFIX}{keyframe_timestamp}.jsonl")
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.endswith("\n"):  # skip a torn last line
+                    yield json.loads(line)
+
+    def snapshots(self):
+        """Yields ``(timestamp, ladder)`` for every stored snapshot, oldest first."""
+        for keyframe_timestamp in self.keyframe_timestamps():
+            path = os.path.join(self.directory, f"{_KEYFRAME_PREFIX}{keyframe_timestamp}.json")
+            with open(path, "r", encoding="utf-8") as f:
+                ladder = json.load(f)["ladder"]
+            yield keyframe_timestamp, ladder
+            for delta in self._read_deltas(keyframe_timestamp):
+                ladder = apply_delta(ladder, delta)
+                yield delta["timestamp"], ladder
+
+    def load_at(self, timestamp):
+        """
+        Rebuilds the ladder as of ``timestamp`` (a datetime or a
+        YYYYMMDD_HHMMSS string): the last snapshot taken at or before it.
+        Returns None if there is no such snapshot.
+        """
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.strftime(TIMESTAMP_FORMAT)
+        keyframes = [ts for ts in self.keyframe_timestamps() if ts <= timestamp]
+        if not keyframes:
+            return None
+
+        keyframe_timestamp = keyframes[-1]
+        path = os.path.join(self.directory, f"{_KEYFRAME_PREFIX}{keyframe_timestamp}.json")
+        with open(path, "r", encoding="utf-8") as f:
+            ladder = json.load(f)["ladder"]
+        for delta in self._read_deltas(keyframe_timestamp):
+            if delta["timestamp"] > timestamp:
+                break
+            ladder = apply_delta(ladder, delta)
+        return ladder
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python -m poe_ladder.deltas DATA_DIR YYYYMMDD_HHMMSS")
+        sys.exit(2)
+    ladder = LadderDeltaStore(sys.argv[1]).load_at(sys.argv[2])
+    if ladder is None:
+        print(f"No snapshot at or before {sys.argv[2]}.")
+        sys.exit(1)
+    json.dump(ladder, sys.stdout, indent=4)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Pool of WebDriver sessions.
+
+Selenium fetchers borrow a driver for the duration of one fetch instead of
+owning one each, so several ladders can share a bounded number of browsers.
+Drivers are created lazily by ``driver_factory``, up to ``size`` of them.
+
+The pool also keeps long-running scrapers alive:
+
+* a driver is health-checked (one cheap script call) before it is handed out,
+  and after a lease that raised; dead browsers are discarded and replaced;
+* a driver is recycled after ``max_uses`` leases, or once its browser
+  processes use more than ``max_rss_mb`` MB (requires ``psutil``);
+* replacements are started in a background thread right after the old driver
+  is retired, so the next fetch finds a warm browser instead of waiting for
+  Chrome to start. The old driver is quit first, in the same thread, so a
+  factory reusing one Chrome profile never runs two browsers on it.
+"""
+
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def driver_rss_mb(driver):
+    """
+    Resident memory in MB of the browser behind ``driver`` (chromedriver and
+    every process it started), or None if it cannot be measured.
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+    except (AttributeError, psutil.Error):
+        return None
+    total = 0
+    for proc in processes:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return total / (1024 * 1024)
+
+
+def is_alive(driver):
+    """True if the browser behind ``driver`` still answers."""
+    try:
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+
+class DriverPool:
+    """Hands out at most ``size`` drivers created by ``driver_factory``."""
+
+    def __init__(self, driver_factory, size=1, max_uses=None, max_rss_mb=None, health_check=True):
+        self.driver_factory = driver_factory
+        self.size = size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.health_check = health_check
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._drivers = []
+        self._uses = {}
+        self._workers = []
+        self._closed = False
+        # Drivers replaced because they died / because they were recycled
+        self.restarts = 0
+        self.recycled = 0
+
+    def _create(self):
+        driver = self.driver_factory()
+        with self._lock:
+            if not self._closed:
+                self._drivers.append(driver)
+                self._uses[id(driver)] = 0
+                return driver
+        # The pool was closed while the browser was starting
+        _quit(driver)
+        return None
+
+    def _checked(self, driver):
+        """Returns ``driver`` if it answers, else discards it and returns None."""
+        if not self.health_check or is_alive(driver):
+            return driver
+        logger.warning("Discarding a WebDriver that stopped responding.")
+        self.restarts += 1
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+            self._uses.pop(id(driver), None)
+        # Quit here, before its slot is freed, so the caller cannot start the
+        # replacement on the same profile while this browser is shutting down
+        _quit(driver)
+        with self._lock:
+            self._created -= 1
+        return None
+
+    def _acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("The driver pool is closed.")
+            try:
+                driver = self._checked(self._idle.get_nowait())
+                if driver is not None:
+                    return driver
+                continue
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    driver = self._create()
+                except BaseException:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                if driver is not None:
+                    return driver
+                with self._lock:
+                    self._created -= 1
+                continue
+
+            # Every driver is busy or starting; wake up now and then in case a
+            # background start failed and a driver can be created here instead
+            wait = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+            if wait <= 0:
+                raise queue.Empty
+            try:
+                driver = self._checked(self._idle.get(timeout=wait))
+            except queue.Empty:
+                continue
+            if driver is not None:
+                return driver
+
+    def _release(self, driver, failed=False):
+        with self._lock:
+            uses = self._uses.get(id(driver), 0) + 1
+            self._uses[id(driver)] = uses
+        if failed and not is_alive(driver):
+            logger.warning("WebDriver crashed, starting a new one.")
+            self.restarts += 1
+            self._retire(driver)
+        elif self.max_uses is not None and uses >= self.max_uses:
+            logger.info("Recycling a WebDriver after %d uses.", uses)
+            self.recycled += 1
+            self._retire(driver)
+        elif self.max_rss_mb is not None and (driver_rss_mb(driver) or 0) > self.max_rss_mb:
+            logger.info("Recycling a WebDriver using more than %d MB.", self.max_rss_mb)
+            self.recycled += 1
+            self._retire(driver)
+        else:
+            self._idle.put(driver)
+
+    def _retire(self, driver, replace=True):
+        """Quits ``driver`` and, if ``replace``, starts its replacement, in the background."""
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+            self._uses.pop(id(driver), None)
+            replace = replace and not self._closed
+            if not replace:
+                self._created -= 1
+        self._start_worker(self._replace if replace else _quit, driver)
+
+    def _replace(self, old_driver):
+        _quit(old_driver)
+        self._warm_one()
+
+    def _warm_one(self):
+        try:
+            driver = self._create()
+        except Exception as e:
+            logger.error("Error starting a replacement WebDriver: %s", e)
+            with self._lock:
+                self._created -= 1
+            return
+        if driver is None:
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(driver)
+
+    def _start_worker(self, target, *args):
+        worker = threading.Thread(target=target, args=args, daemon=True, name="driver-pool")
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            self._workers.append(worker)
+        worker.start()
+
+    def warm_up(self, count=1):
+        """Starts up to ``count`` drivers in the background, ahead of the first lease."""
+        for _ in range(count):
+            with self._lock:
+                if self._closed or self._created >= self.size:
+                    return
+                self._created += 1
+            self._start_worker(self._warm_one)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """
+        Borrows a driver, waiting up to ``timeout`` seconds if all are busy.
+        If the block raises, the driver is checked and replaced if it died.
+        """
+        driver = self._acquire(timeout)
+        try:
+            yield driver
+        except BaseException:
+            self._release(driver, failed=True)
+            raise
+        self._release(driver)
+
+    def browser_rss_mb(self):
+        """
+        Resident memory in MB of all the pool's browsers, or None if it
+        cannot be measured (no browser yet, or psutil not installed).
+        """
+        with self._lock:
+            drivers = list(self._drivers)
+        sizes = [size for size in map(driver_rss_mb, drivers) if size is not None]
+        return sum(sizes) if sizes else None
+
+    def close(self):
+        """Quits every driver the pool created."""
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.join()
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+            self._uses.clear()
+            self._created = 0
+        self._idle = queue.LifoQueue()
+        for driver in drivers:
+            _quit(driver)
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception as e:
+        logger.warning("Error closing a WebDriver: %s", e)
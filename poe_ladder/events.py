@@ -0,0 +1,364 @@
+"""
+Live feed of ladder changes.
+
+``diff_events(previous, current)`` compares two consecutive snapshots and
+yields typed LadderEvents:
+
+* ``entry`` / ``exit``: a character appeared on / dropped off the ladder;
+* ``level_up``: its level went up;
+* ``death``: it died (hardcore and SSF ladders);
+* ``rank_change``: it moved on the ladder.
+
+An EventPipeline keeps the previous snapshot, diffs every new one and hands
+the events to its sinks in batches of ``batch_size``. Every sink is flushed at
+the end of ``publish()``, so consumers see a cycle's events as soon as it is
+scraped instead of polling the snapshot directory:
+
+* JsonlEventSink appends one JSON object per line to a file (``tail -f``);
+* SocketEventSink streams the same lines to every client connected to a
+  local TCP port or Unix socket (``nc 127.0.0.1 8765``);
+* SqliteEventSink inserts them into a ``ladder_events`` table.
+
+The scripts build their pipeline from ``LADDER_EVENTS``, comma-separated sink
+specs: ``jsonl:PATH``, ``socket:HOST:PORT``, ``socket:/PATH.sock`` or
+``sqlite:PATH`` (see ``sinks_from_spec``). ``LADDER_EVENT_TYPES`` limits the
+feed to some event types. ``iter_events()`` and ``stream_events()`` are the
+same stage over a (sync or async) iterable of snapshots.
+"""
+
+import os
+import json
+import socket
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from poe_ladder.models import LadderEntry
+
+logger = logging.getLogger(__name__)
+
+ENTRY = "entry"
+EXIT = "exit"
+LEVEL_UP = "level_up"
+DEATH = "death"
+RANK_CHANGE = "rank_change"
+EVENT_TYPES = (ENTRY, EXIT, LEVEL_UP, DEATH, RANK_CHANGE)
+
+DEFAULT_BATCH_SIZE = 500  # events per sink write
+SOCKET_SEND_TIMEOUT = 1.0  # seconds before a stalled client is dropped
+
+
+class LadderEvent(namedtuple("LadderEvent", ["type", "timestamp", "account", "character",
+                                              "char_class", "rank", "level", "previous"])):
+    """
+    One change of one character. ``rank`` and ``level`` are the current
+    values (the last known ones for an ``exit``); ``previous`` holds the old
+    value of what changed, e.g. ``{"level": 91}`` for a ``level_up``.
+    """
+
+    __slots__ = ()
+
+    def to_dict(self):
+        return self._asdict()
+
+    def to_json(self):
+        return json.dumps(self._asdict(), separators=(",", ":"))
+
+
+def _event(event_type, timestamp, entry, previous=None):
+    return LadderEvent(event_type, timestamp, entry.account, entry.character,
+                       entry.char_class, entry.rank, entry.level, previous or {})
+
+
+def diff_events(previous, current, timestamp=None):
+    """
+    Yields the events turning snapshot ``previous`` into ``current``. Both
+    are iterables of LadderEntry, extracted LadderRows or dicts in any of the
+    script layouts. Nothing is yielded for the first snapshot (``previous``
+    None): there is nothing to compare it with.
+    """
+    if previous is None:
+        return
+    timestamp = timestamp or datetime.now().isoformat(timespec="seconds")
+    old = {entry.key: entry for entry in map(LadderEntry.coerce, previous)}
+    seen = set()
+    for entry in map(LadderEntry.coerce, current):
+        seen.add(entry.key)
+        before = old.get(entry.key)
+        if before is None:
+            yield _event(ENTRY, timestamp, entry)
+            continue
+        if entry.dead and not before.dead:
+            yield _event(DEATH, timestamp, entry)
+        if entry.level is not None and before.level is not None and entry.level > before.level:
+            yield _event(LEVEL_UP, timestamp, entry, {"level": before.level})
+        if entry.rank != before.rank:
+            yield _event(RANK_CHANGE, timestamp, entry, {"rank": before.rank})
+    for key, entry in old.items():
+        if key not in seen:
+            yield _event(EXIT, timestamp, entry)
+
+
+def iter_events(snapshots, types=None):
+    """
+    Yields the events of consecutive ``snapshots``, an iterable of
+    ``(timestamp, entries)`` pairs; ``types`` filters the event types.
+    """
+    previous = None
+    for timestamp, entries in snapshots:
+        entries = [LadderEntry.coerce(item) for item in entries]
+        for event in diff_events(previous, entries, timestamp):
+            if types is None or event.type in types:
+                yield event
+        previous = entries
+
+
+async def stream_events(snapshots, types=None):
+    """Async version of iter_events() over an async iterable of snapshots."""
+    previous = None
+    async for timestamp, entries in snapshots:
+        entries = [LadderEntry.coerce(item) for item in entries]
+        for event in diff_events(previous, entries, timestamp):
+            if types is None or event.type in types:
+                yield event
+        previous = entries
+
+
+class BatchedSink:
+    """
+    Buffers events and writes them ``batch_size`` at a time with
+    ``write_batch()``, which subclasses implement.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.written = 0
+        self._batch = []
+
+    def emit(self, event):
+        self._batch.append(event)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        self.write_batch(batch)
+        self.written += len(batch)
+
+    def write_batch(self, events):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+
+class JsonlEventSink(BatchedSink):
+    """Appends the events, one JSON object per line, to ``path``."""
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write_batch(self, events):
+        self._file.write("".join(event.to_json() + "\n" for event in events))
+        self._file.flush()
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class SocketEventSink(BatchedSink):
+    """
+    Streams the events as JSON lines to every client connected to
+    ``address``: a ``(host, port)`` pair for TCP or a path for a Unix socket.
+    Clients only get the events published after they connect; one that
+    stops reading for SOCKET_SEND_TIMEOUT seconds is disconnected, so a slow
+    consumer never holds up the scraper.
+    """
+
+    def __init__(self, address, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(batch_size)
+        if isinstance(address, str):
+            if os.path.exists(address):
+                os.remove(address)
+            self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(address)
+        self._server.listen()
+        self.address = self._server.getsockname()
+        self._clients = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._accept, daemon=True, name="event-socket").start()
+        logger.info("Streaming ladder events on %s", self.address)
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except OSError:
+                return  # closed
+            client.settimeout(SOCKET_SEND_TIMEOUT)
+            with self._lock:
+                self._clients.append(client)
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+    def write_batch(self, events):
+        with self._lock:
+            clients = list(self._clients)
+        if not clients:
+            return
+        data = "".join(event.to_json() + "\n" for event in events).encode("utf-8")
+        for client in clients:
+            try:
+                client.sendall(data)
+            except OSError as e:
+                logger.info("Dropping an event stream client: %s", e)
+                with self._lock:
+                    self._clients.remove(client)
+                client.close()
+
+    def close(self):
+        super().close()
+        self._server.close()
+        with self._lock:
+            clients, self._clients = self._clients, []
+        for client in clients:
+            client.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class SqliteEventSink(BatchedSink):
+    """
+    Inserts the events into the ``table`` of the SQLite database at
+    ``path``, one transaction per batch. ``previous`` is stored as JSON text.
+    """
+
+    def __init__(self, path, table="ladder_events", batch_size=DEFAULT_BATCH_SIZE):
+        import sqlite3
+
+        super().__init__(batch_size)
+        self.path = path
+        self.table = table
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            self._connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "id INTEGER PRIMARY KEY, timestamp TEXT NOT NULL, type TEXT NOT NULL, "
+                "account TEXT NOT NULL, character TEXT NOT NULL, class TEXT, "
+                "rank INTEGER, level INTEGER, previous TEXT)"
+            )
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_character ON {table} (account, character)"
+            )
+
+    def write_batch(self, events):
+        with self._connection:
+            self._connection.executemany(
+                f"INSERT INTO {self.table} (timestamp, type, account, character, class, rank, level, previous) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(e.timestamp, e.type, e.account, e.character, e.char_class, e.rank, e.level,
+                  json.dumps(e.previous) if e.previous else None) for e in events],
+            )
+
+    def close(self):
+        super().close()
+        self._connection.close()
+
+
+def sinks_from_spec(spec, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Builds the sinks described by ``spec``, comma-separated ``jsonl:PATH``,
+    ``socket:HOST:PORT``, ``socket:PATH`` (Unix socket) or ``sqlite:PATH``.
+    """
+    sinks = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        kind, _, target = part.partition(":")
+        if not target:
+            raise ValueError(f"Event sink {part!r} has no target, e.g. jsonl:events.jsonl.")
+        if kind == "jsonl":
+            sinks.append(JsonlEventSink(target, batch_size))
+        elif kind == "sqlite":
+            sinks.append(SqliteEventSink(target, batch_size=batch_size))
+        elif kind == "socket":
+            host, _, port = target.rpartition(":")
+            if host and port.isdigit():
+                sinks.append(SocketEventSink((host, int(port)), batch_size))
+            else:
+                sinks.append(SocketEventSink(target, batch_size))
+        else:
+            raise ValueError(f"Unknown event sink {kind!r}: use jsonl, socket or sqlite.")
+    return sinks
+
+
+class EventPipeline:
+    """
+    Diffs every snapshot against the previous one and delivers the events to
+    ``sinks``. A sink that fails is logged and skipped for that batch; it
+    never fails the scrape. Without sinks ``publish()`` does nothing.
+    """
+
+    def __init__(self, sinks=(), types=None):
+        self.sinks = list(sinks)
+        self.types = frozenset(types) if types else None
+        unknown = (self.types or frozenset()) - set(EVENT_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown event types: {', '.join(sorted(unknown))}.")
+        self.published = 0
+        self._previous = None
+
+    @classmethod
+    def from_env(cls):
+        """The pipeline configured by LADDER_EVENTS and LADDER_EVENT_TYPES."""
+        types = [t.strip() for t in os.getenv("LADDER_EVENT_TYPES", "").split(",") if t.strip()]
+        return cls(sinks_from_spec(os.getenv("LADDER_EVENTS")), types or None)
+
+    def __bool__(self):
+        return bool(self.sinks)
+
+    def publish(self, entries, timestamp=None):
+        """
+        Diffs ``entries`` (LadderEntry, LadderRow or dicts) against the
+        previous snapshot and sends the events. Returns how many were sent.
+        """
+        if not self.sinks:
+            return 0
+        entries = [LadderEntry.coerce(item) for item in entries]
+        count = 0
+        for event in diff_events(self._previous, entries, timestamp):
+            if self.types is not None and event.type not in self.types:
+                continue
+            count += 1
+            for sink in self.sinks:
+                self._deliver(sink, sink.emit, event)
+        for sink in self.sinks:
+            self._deliver(sink, sink.flush)
+        self._previous = entries
+        self.published += count
+        return count
+
+    def _deliver(self, sink, method, *args):
+        try:
+            method(*args)
+        except Exception as e:
+            logger.error("Event sink %s failed: %s", type(sink).__name__, e)
+            sink._batch.clear()
+
+    def close(self):
+        for sink in self.sinks:
+            self._deliver(sink, sink.close)
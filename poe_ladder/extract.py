@@ -0,0 +1,227 @@
+"""
+Single round-trip extraction of the ladder table.
+
+Instead of asking WebDriver for every row and every cell (7+ HTTP round-trips
+per row), the whole ``table.league-ladder__entries`` element is fetched once as
+HTML and parsed in-process into LadderRow tuples, which
+``poe_ladder.models.LadderEntry.from_row()`` turns into typed entries.
+"""
+
+import re
+import logging
+from collections import namedtuple
+from html.parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+LADDER_TABLE_SELECTOR = "table.league-ladder__entries"
+TABLE_CLASS = "league-ladder__entries"
+ENTRY_STATE_CLASS = "league-ladder__entry-state"
+
+# Raw text of one ladder row, as Selenium's ``.text`` would have returned it.
+# ``account`` is the text of the account link, ``state`` is None when the
+# character cell has no entry-state span.
+LadderRow = namedtuple(
+    "LadderRow",
+    ["rank", "account", "character", "state", "char_class", "level", "experience"],
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+_OUTER_HTML_SCRIPT = (
+    "var table = document.querySelector(arguments[0]);"
+    "return table ? table.outerHTML : null;"
+)
+
+
+def _clean(parts):
+    """Join text fragments and collapse whitespace the way ``.text`` does."""
+    return _WHITESPACE.sub(" ", "".join(parts)).strip()
+
+
+class _LadderTableParser(HTMLParser):
+    """Collects the ``(text, link, state)`` cells of every ``tbody > tr`` of the ladder table."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self._table_depth = 0
+        self._in_tbody = False
+        self._row = None
+        self._cell = None
+        self._link = None
+        self._span = None
+        self._span_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            classes = (dict(attrs).get("class") or "").split()
+            if self._table_depth or TABLE_CLASS in classes:
+                self._table_depth += 1
+            return
+        if not self._table_depth:
+            return
+
+        if tag == "tbody":
+            self._in_tbody = True
+        elif tag == "tr" and self._in_tbody:
+            self._row = []
+        elif tag in ("td", "th") and self._row is not None:
+            self._cell = {"text": [], "link": None, "state": None}
+        elif tag == "a" and self._cell is not None and self._cell["link"] is None:
+            self._link = []
+        elif tag == "span" and self._cell is not None:
+            if self._span is not None:
+                self._span_depth += 1
+            elif ENTRY_STATE_CLASS in (dict(attrs).get("class") or "").split():
+                self._span = []
+                self._span_depth = 1
+
+    def handle_endtag(self, tag):
+        if not self._table_depth:
+            return
+        if tag == "table":
+            self._table_depth -= 1
+        elif tag == "tbody":
+            self._in_tbody = False
+        elif tag == "tr" and self._row is not None:
+            self.rows.append(self._row)
+            self._row = None
+        elif tag in ("td", "th") and self._cell is not None:
+            cell = self._cell
+            self._row.append((_clean(cell["text"]), cell["link"], cell["state"]))
+            self._cell = None
+        elif tag == "a" and self._link is not None:
+            self._cell["link"] = _clean(self._link)
+            self._link = None
+        elif tag == "span" and self._span is not None:
+            self._span_depth -= 1
+            if not self._span_depth:
+                if self._cell["state"] is None:
+                    self._cell["state"] = _clean(self._span)
+                self._span = None
+
+    def handle_data(self, data):
+        if self._cell is None:
+            return
+        self._cell["text"].append(data)
+        if self._link is not None:
+            self._link.append(data)
+        if self._span is not None:
+            self._span.append(data)
+
+
+def _table_cells_html_parser(html):
+    """Returns the ``(text, link, state)`` cells of each row using html.parser."""
+    parser = _LadderTableParser()
+    parser.feed(html)
+    parser.close()
+    return parser.rows
+
+
+_etree = None  # lxml.etree once imported, False if lxml is not installed
+
+
+def lxml_etree():
+    """
+    ``lxml.etree``, imported on first use so importing this module stays
+    cheap. None if lxml is not installed (html.parser is used without it).
+    """
+    global _etree
+    if _etree is None:
+        try:
+            from lxml import etree
+        except ImportError:
+            etree = False
+        _etree = etree
+    return _etree or None
+
+
+_LXML_ROWS_XPATH = (
+    "//table[contains(concat(' ', normalize-space(@class), ' '), ' %s ')]/tbody/tr" % TABLE_CLASS
+)
+
+
+def _element_text(element):
+    """Text of an lxml element with whitespace collapsed, like ``_clean()``."""
+    if len(element):
+        return " ".join("".join(element.itertext()).split())
+    text = element.text
+    return " ".join(text.split()) if text else ""
+
+
+def _table_cells_lxml(html, etree):
+    """Returns the ``(text, link, state)`` cells of each row using lxml."""
+    document = etree.fromstring(html, etree.HTMLParser())
+    rows = []
+    if document is None:
+        return rows
+    for tr in document.xpath(_LXML_ROWS_XPATH):
+        cells = []
+        for td in tr:
+            if td.tag != "td" and td.tag != "th":
+                continue
+            link = None
+            state = None
+            # Most cells are plain text: only the account and character
+            # cells have a link or a state span to look for
+            if len(td):
+                for element in td.iter("a", "span"):
+                    if element.tag == "a":
+                        if link is None:
+                            link = _element_text(element)
+                    elif state is None and ENTRY_STATE_CLASS in (element.get("class") or "").split():
+                        state = _element_text(element)
+            cells.append((_element_text(td), link, state))
+        rows.append(cells)
+    return rows
+
+
+def parse_ladder_html(html):
+    """
+    Parses the HTML of the ladder table (or of a whole page containing it).
+    Returns a list of LadderRow, skipping rows with fewer than 6 cells or
+    without an account link.
+    """
+    etree = lxml_etree()
+    if etree is not None:
+        table_rows = _table_cells_lxml(html, etree)
+    else:
+        table_rows = _table_cells_html_parser(html)
+
+    rows = []
+    for index, cells in enumerate(table_rows, start=1):
+        if len(cells) < 6:
+            logger.warning("Row %d does not have enough cells. Skipping.", index)
+            continue
+        if cells[1][1] is None:
+            logger.error("Row %d has no account link. Skipping.", index)
+            continue
+        rows.append(LadderRow(
+            rank=cells[0][0],
+            account=cells[1][1],
+            character=cells[2][0],
+            state=cells[2][2],
+            char_class=cells[3][0],
+            level=cells[4][0],
+            experience=cells[5][0],
+        ))
+    return rows
+
+
+def fetch_ladder_html(driver):
+    """
+    Returns the outerHTML of the ladder table in a single WebDriver call,
+    or None if the table is not on the page.
+    """
+    return driver.execute_script(_OUTER_HTML_SCRIPT, LADDER_TABLE_SELECTOR)
+
+
+def extract_ladder_rows(driver):
+    """Fetches the ladder table once and parses it into LadderRow tuples."""
+    html = fetch_ladder_html(driver)
+    if html is None:
+        logger.error("Leaderboard table not found on the page.")
+        return []
+    return parse_ladder_html(html)
+
@@ -0,0 +1,295 @@
+"""
+Fetch backends for the ladder.
+
+* ``http``: plain HTTP through a pooled keep-alive ``requests.Session``. Works
+  with the ladder page itself (HTML) and with the JSON ladder endpoint.
+* ``selenium``: the headless Chrome path the scripts have always used.
+* ``auto``: ``http`` first, falling back to ``selenium`` when the HTTP fetch
+  fails or yields no rows. Chrome is only started if the fallback is needed.
+
+Every fetcher has a ``fetch_rows()`` method returning a list of LadderRow, a
+``close()`` method, a ``last_load_seconds`` attribute holding how long the
+last fetch took until the ladder was ready and a ``last_transfer`` dict
+(``bytes``, ``requests``) telling how much it downloaded. The fetchers time
+their ``fetch``, ``wait`` and ``parse`` phases into poe_ladder.instrument.
+
+A fetcher given a ``change_detector`` (see poe_ladder.change) returns None
+instead of a list when the ladder is the same as on its last fetch.
+"""
+
+import time
+import logging
+
+from poe_ladder.browser import page_transfer_stats
+from poe_ladder.change import content_fingerprint, ladder_table_html
+from poe_ladder.drivers import DriverPool
+from poe_ladder.extract import LadderRow, fetch_ladder_html, parse_ladder_html
+from poe_ladder.instrument import REGISTRY
+from poe_ladder.wait import DEFAULT_WAIT_TIMEOUT, wait_for_ladder
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("http", "selenium", "auto")
+
+DEFAULT_TIMEOUT = 20  # seconds
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+
+class FetchError(Exception):
+    """Raised when a backend could not fetch the ladder."""
+
+
+def make_session(pool_size=4, user_agent=DEFAULT_USER_AGENT):
+    """Creates a requests session that keeps its connections alive and pooled."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": user_agent,
+        "Accept": "text/html,application/json;q=0.9,*/*;q=0.8",
+    })
+    return session
+
+
+def parse_ladder_json(data):
+    """
+    Converts a response of the JSON ladder endpoint into LadderRow tuples.
+    The rows carry the same text the HTML table would show.
+    """
+    rows = []
+    for entry in data.get("entries", []):
+        character = entry.get("character") or {}
+        account = entry.get("account") or {}
+        name = character.get("name", "")
+        dead = bool(entry.get("dead"))
+        rows.append(LadderRow(
+            rank=str(entry.get("rank", "")),
+            account=account.get("name", ""),
+            character=f"{name} (Dead)" if dead else name,
+            state="(Dead)" if dead else None,
+            char_class=character.get("class", ""),
+            level=str(character.get("level", "")),
+            experience=str(character.get("experience", "")),
+        ))
+    return rows
+
+
+class HttpLadderFetcher:
+    """Fetches the ladder over plain HTTP."""
+
+    def __init__(self, url, session=None, timeout=DEFAULT_TIMEOUT, change_detector=None):
+        self.url = url
+        self.timeout = timeout
+        # A session passed in is shared with other fetchers and left open
+        self.owns_session = session is None
+        self.session = session or make_session()
+        self.change_detector = change_detector
+        self.last_load_seconds = None
+        self.last_transfer = None
+        # "total" of the last JSON response, None for HTML pages
+        self.last_total = None
+
+    def fetch_rows(self):
+        import requests
+
+        detector = self.change_detector
+        headers = detector.conditional_headers() if detector is not None else None
+        start = time.monotonic()
+        try:
+            response = self.session.get(self.url, timeout=self.timeout, headers=headers)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            REGISTRY.counter("ladder_fetch_errors_total", "Failed ladder fetches.", backend="http").inc()
+            raise FetchError(f"HTTP fetch of {self.url} failed: {e}") from e
+        self.last_load_seconds = time.monotonic() - start
+        self.last_transfer = {"bytes": len(response.content), "requests": 1}
+        REGISTRY.observe_phase("fetch", self.last_load_seconds)
+        REGISTRY.counter("ladder_bytes_transferred_total", "Bytes downloaded by the fetchers.",
+                         backend="http").inc(len(response.content))
+
+        if response.status_code == 304:
+            if detector is None or detector.last_fingerprint is None:
+                raise FetchError(f"Unexpected 304 Not Modified from {self.url}")
+            detector.not_modified()
+            return None
+
+        if "json" in response.headers.get("Content-Type", ""):
+            fingerprint = content_fingerprint(response.content) if detector is not None else None
+            if detector is not None and detector.unchanged(fingerprint):
+                return None
+            try:
+                with REGISTRY.span("parse"):
+                    data = response.json()
+                    self.last_total = data.get("total")
+                    rows = parse_ladder_json(data)
+            except (ValueError, AttributeError) as e:
+                raise FetchError(f"Invalid ladder JSON from {self.url}: {e}") from e
+        else:
+            self.last_total = None
+            html = response.text
+            fingerprint = None
+            if detector is not None:
+                # Without a ladder table tag the whole page is fingerprinted.
+                # A page without rows (rendered by JavaScript) resets the
+                # detector below, so it is never reported unchanged and the
+                # auto backend still falls back
+                table = ladder_table_html(html)
+                fingerprint = content_fingerprint(html if table is None else table)
+                if detector.unchanged(fingerprint):
+                    return None
+                if table is not None:
+                    html = table
+            with REGISTRY.span("parse"):
+                rows = parse_ladder_html(html)
+
+        if detector is not None and fingerprint is not None:
+            if rows:
+                detector.update(fingerprint, response.headers)
+            else:
+                detector.reset()
+        return rows
+
+    def close(self):
+        if self.owns_session:
+            self.session.close()
+
+
+class SeleniumLadderFetcher:
+    """
+    Fetches the ladder with a driver borrowed from ``driver_pool`` (see
+    poe_ladder.drivers); after each load the fetcher waits until the table
+    rows are present and stable, for at most ``wait_timeout`` seconds. If the
+    browser crashes during a fetch, the pool replaces it and the fetch is
+    retried once. The pool is only closed with the fetcher if ``owns_pool`` is
+    true.
+    """
+
+    def __init__(self, url, driver_pool, wait_timeout=DEFAULT_WAIT_TIMEOUT, owns_pool=True,
+                 change_detector=None):
+        self.url = url
+        self.driver_pool = driver_pool
+        self.wait_timeout = wait_timeout
+        self.owns_pool = owns_pool
+        self.change_detector = change_detector
+        self.last_load_seconds = None
+        self.last_ready_seconds = None
+        self.last_transfer = None
+
+    def _load_table_html(self):
+        from selenium.common.exceptions import TimeoutException
+
+        with self.driver_pool.lease() as driver:
+            start = time.monotonic()
+            driver.get(self.url)
+            REGISTRY.observe_phase("fetch", time.monotonic() - start)
+            try:
+                self.last_ready_seconds = wait_for_ladder(driver, timeout=self.wait_timeout)
+            except TimeoutException as e:
+                raise FetchError(f"Ladder table of {self.url} not ready: {e.msg}") from e
+            REGISTRY.observe_phase("wait", self.last_ready_seconds)
+            self.last_load_seconds = time.monotonic() - start
+            self.last_transfer = page_transfer_stats(driver)
+            if self.last_transfer:
+                REGISTRY.counter("ladder_bytes_transferred_total", "Bytes downloaded by the fetchers.",
+                                 backend="selenium").inc(self.last_transfer["bytes"])
+            return fetch_ladder_html(driver)
+
+    def fetch_rows(self):
+        from selenium.common.exceptions import WebDriverException
+
+        try:
+            html = self._load_table_html()
+        except WebDriverException as e:
+            logger.warning("WebDriver error (%s), retrying with a fresh browser.", e.msg)
+            try:
+                html = self._load_table_html()
+            except WebDriverException as e:
+                REGISTRY.counter("ladder_fetch_errors_total", "Failed ladder fetches.", backend="selenium").inc()
+                raise FetchError(f"Selenium fetch of {self.url} failed: {e.msg}") from e
+
+        if html is None:
+            logger.error("Leaderboard table not found on the page.")
+            return []
+        detector = self.change_detector
+        fingerprint = content_fingerprint(html) if detector is not None else None
+        if detector is not None and detector.unchanged(fingerprint):
+            return None
+        with REGISTRY.span("parse"):
+            rows = parse_ladder_html(html)
+        if detector is not None and rows:
+            detector.update(fingerprint)
+        return rows
+
+    def close(self):
+        if self.owns_pool:
+            self.driver_pool.close()
+
+
+class FallbackLadderFetcher:
+    """
+    Tries ``primary`` first and uses ``fallback`` when it fails or finds
+    nothing. An unchanged ladder (None) is passed on as is.
+    """
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.last_load_seconds = None
+        self.last_transfer = None
+
+    def fetch_rows(self):
+        try:
+            rows = self.primary.fetch_rows()
+            if rows is None or rows:
+                self.last_load_seconds = self.primary.last_load_seconds
+                self.last_transfer = self.primary.last_transfer
+                return rows
+            logger.warning("Primary fetcher returned no rows, using the fallback.")
+        except FetchError as e:
+            logger.warning("Primary fetcher failed (%s), using the fallback.", e)
+        rows = self.fallback.fetch_rows()
+        self.last_load_seconds = self.fallback.last_load_seconds
+        self.last_transfer = self.fallback.last_transfer
+        return rows
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+
+def make_fetcher(backend, url, driver_factory=None, wait_timeout=DEFAULT_WAIT_TIMEOUT,
+                 session=None, driver_pool=None, change_detector=None,
+                 driver_max_uses=None, driver_max_rss_mb=None):
+    """
+    Builds the fetcher for ``backend`` (one of BACKENDS). The ``selenium`` and
+    ``auto`` backends need either a shared ``driver_pool`` or a
+    ``driver_factory`` for a private single-driver pool, recycling its browser
+    after ``driver_max_uses`` fetches or above ``driver_max_rss_mb`` MB. With
+    the ``selenium`` backend the browser is started in the background right
+    away. With the ``auto`` backend both fetchers share the ``change_detector``.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ladder backend {backend!r}, expected one of {', '.join(BACKENDS)}.")
+    if backend == "http":
+        return HttpLadderFetcher(url, session=session, change_detector=change_detector)
+    owns_pool = driver_pool is None
+    if owns_pool:
+        if driver_factory is None:
+            raise ValueError(f"The {backend!r} backend needs a driver_factory or a driver_pool.")
+        driver_pool = DriverPool(driver_factory, size=1, max_uses=driver_max_uses,
+                                 max_rss_mb=driver_max_rss_mb)
+        if backend == "selenium":
+            driver_pool.warm_up()
+    selenium_fetcher = SeleniumLadderFetcher(url, driver_pool, wait_timeout, owns_pool, change_detector)
+    if backend == "selenium":
+        return selenium_fetcher
+    http_fetcher = HttpLadderFetcher(url, session=session, change_detector=change_detector)
+    return FallbackLadderFetcher(http_fetcher, selenium_fetcher)
+
@@ -0,0 +1,68 @@
+"""
+Crash-safe file writes.
+
+Data is written to a temporary file in the target directory, flushed to disk
+and then renamed over the target, so readers only ever see the old or the new
+content, never a half-written file.
+"""
+
+import os
+import json
+import tempfile
+
+
+def atomic_write_chunks(path, chunks):
+    """Atomically replaces ``path`` with the concatenated byte ``chunks``."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_bytes(path, data):
+    """Atomically replaces ``path`` with ``data``."""
+    atomic_write_chunks(path, [data])
+
+
+def atomic_write_text(path, text, encoding="utf-8"):
+    """Atomically replaces ``path`` with ``text``."""
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+def atomic_write_json(path, data, indent=None):
+    """Atomically replaces ``path`` with ``data`` serialized as JSON."""
+    atomic_write_text(path, json.dumps(data, indent=indent))
+
+
+def _json_list_chunks(items, indent, encoding):
+    if indent is None:
+        separator, prefix, suffix = ", ", "[", "]"
+    else:
+        separator, prefix, suffix = ",\n", "[\n", "\n]"
+    pad = " " * indent if indent is not None else ""
+    empty = True
+    for item in items:
+        text = json.dumps(item, indent=indent)
+        if indent is not None:
+            text = text.replace("\n", "\n" + pad)
+        yield ((prefix if empty else separator) + pad + text).encode(encoding)
+        empty = False
+    yield b"[]" if empty else suffix.encode(encoding)
+
+
+def atomic_write_json_list(path, items, indent=None, encoding="utf-8"):
+    """
+    Atomically replaces ``path`` with the iterable ``items`` as a JSON list,
+    written item by item, so the whole list is never held in memory. The
+    output is the same as ``atomic_write_json(path, list(items), indent)``.
+    """
+    atomic_write_chunks(path, _json_list_chunks(items, indent, encoding))
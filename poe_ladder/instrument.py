@@ -0,0 +1,228 @@
+"""
+Logging and metrics shared by the scripts.
+
+Logging: ``start_queue_logging(handlers)`` puts a QueueHandler on the root
+logger and runs the real handlers (files, console) in a QueueListener thread,
+so a log call in a scrape loop only enqueues a record instead of writing to
+disk or the console. Hot loops log per-row details at DEBUG level with
+%-style arguments, which are not even formatted unless DEBUG is enabled.
+
+Metrics: a MetricsRegistry holds counters, gauges and histograms and renders them in
+the Prometheus text format, either to a file (``write(path)``, e.g. for the
+node_exporter textfile collector) or on a local HTTP endpoint
+(``serve(port)``, then ``curl http://127.0.0.1:PORT/metrics``). ``span(phase)``
+times one phase of a cycle (``fetch``, ``wait``, ``parse``, ``diff``,
+``persist``) into the ``ladder_phase_seconds`` histogram; the fetchers record
+their own phases in the default ``REGISTRY``.
+"""
+
+import time
+import queue
+import logging
+import threading
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+from poe_ladder.fileio import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a fast HTTP fetch to a slow browser load
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PHASES = ("fetch", "wait", "parse", "diff", "persist")
+
+
+def start_queue_logging(handlers, level=logging.INFO):
+    """
+    Routes every record of the root logger through a queue to ``handlers``,
+    which run in a background thread. Returns the QueueListener; call its
+    ``stop()`` on exit to flush the remaining records.
+    """
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def _phase_order(phase):
+    return (PHASES.index(phase), phase) if phase in PHASES else (len(PHASES), phase)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A value that only goes up."""
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    """A value that is set, e.g. the memory in use."""
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    """Counts observations into cumulative ``buckets`` (upper bounds)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[index] += 1
+                    break
+            self.count += 1
+            self.sum += value
+
+
+class MetricsRegistry:
+    """Named, labelled counters, gauges and histograms."""
+
+    def __init__(self):
+        self._metrics = {}  # name -> (kind, help, {labels: metric})
+        self._lock = threading.Lock()
+        self._cycle_phases = {}
+
+    def _get(self, kind, name, help_text, labels, factory):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            entry = self._metrics.get(name)
+            if entry is None:
+                entry = self._metrics[name] = (kind, help_text, {})
+            elif entry[0] != kind:
+                raise ValueError(f"Metric {name!r} is a {entry[0]}, not a {kind}.")
+            metric = entry[2].get(key)
+            if metric is None:
+                metric = entry[2][key] = factory()
+            return metric
+
+    def counter(self, name, help_text="", **labels):
+        return self._get("counter", name, help_text, labels, Counter)
+
+    def gauge(self, name, help_text="", **labels):
+        return self._get("gauge", name, help_text, labels, Gauge)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS, **labels):
+        return self._get("histogram", name, help_text, labels, lambda: Histogram(buckets))
+
+    def observe_phase(self, phase, seconds):
+        self.histogram("ladder_phase_seconds", "Time spent in each phase of a scrape cycle.",
+                       phase=phase).observe(seconds)
+        with self._lock:
+            self._cycle_phases[phase] = self._cycle_phases.get(phase, 0.0) + seconds
+
+    def start_cycle(self):
+        """Starts collecting the phases of a new cycle (see cycle_summary)."""
+        with self._lock:
+            self._cycle_phases = {}
+
+    def count_cycle(self, result):
+        """Counts a finished cycle by ``result``: changed, unchanged or error."""
+        self.counter("ladder_cycles_total", "Scrape cycles by result.", result=result).inc()
+
+    def cycle_summary(self):
+        """The phases timed since start_cycle(), as one log-friendly string."""
+        with self._lock:
+            phases = dict(self._cycle_phases)
+        return ", ".join(f"{phase} {phases[phase]:.3f}s" for phase in sorted(phases, key=_phase_order))
+
+    @contextmanager
+    def span(self, phase):
+        """Times the block as one ``phase`` of the current cycle."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_phase(phase, time.perf_counter() - start)
+
+    def render(self):
+        """The metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted((name, kind, help_text, dict(series))
+                             for name, (kind, help_text, series) in self._metrics.items())
+        lines = []
+        for name, kind, help_text, series in metrics:
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in sorted(series.items()):
+                if kind in ("counter", "gauge"):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(metric.value)}")
+                    continue
+                with metric._lock:
+                    counts, total, count = list(metric.counts), metric.sum, metric.count
+                cumulative = 0
+                for bound, bucket_count in zip(metric.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = _format_labels(labels + (("le", _format_value(bound)),))
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Atomically writes the metrics to ``path``."""
+        atomic_write_text(path, self.render())
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves the metrics on ``http://host:port/metrics`` from a daemon thread."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = self
+
+        class _MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+        logger.info("Serving metrics on http://%s:%d/metrics", host, server.server_address[1])
+        return server
+
+
+# Default registry the fetchers and the scripts record into
+REGISTRY = MetricsRegistry()
+span = REGISTRY.span
@@ -0,0 +1,117 @@
+"""
+Append-only persistence for the character registry.
+
+Each cycle only the new or changed records are appended, one JSON object per
+line, to a journal next to ``characters.json``. Every ``compact_every``
+appended records (and on close) the journal is folded into an atomically
+written ``characters.json`` snapshot and truncated, so the snapshot keeps the
+format existing deployments read.
+
+Loading reads the snapshot and replays the journal on top of it. A torn last
+journal line, left by a crash in the middle of an append, is ignored.
+A ``last_seen`` that moved on its own is journaled once an hour (see
+CharacterRegistry.observe()), so after a crash it is at most an hour behind;
+it is exact in every compacted snapshot.
+"""
+
+import os
+import json
+import logging
+
+from poe_ladder.registry import CharacterRegistry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPACT_EVERY = 1000  # journal records
+
+
+class CharacterJournal:
+    """Snapshot plus journal storage of a CharacterRegistry."""
+
+    def __init__(self, snapshot_path, journal_path=None, compact_every=DEFAULT_COMPACT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or snapshot_path + ".journal"
+        self.compact_every = compact_every
+        self.journal_records = 0
+        self._journal_file = None
+
+    def load(self):
+        """Returns the registry stored in the snapshot and the journal."""
+        registry = CharacterRegistry()
+        if os.path.exists(self.snapshot_path):
+            try:
+                registry = CharacterRegistry.load(self.snapshot_path)
+            except json.JSONDecodeError as e:
+                logger.error("Error decoding %s (%s). Rebuilding from the journal only.",
+                             self.snapshot_path, e)
+
+        self.journal_records = 0
+        if os.path.exists(self.journal_path):
+            self._drop_torn_tail()
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line_number, line in enumerate(f, start=1):
+                    if not line.strip():
+                        continue
+                    try:
+                        registry.apply(json.loads(line))
+                    except (json.JSONDecodeError, KeyError) as e:
+                        logger.warning("Ignoring unreadable journal line %d of %s: %s",
+                                       line_number, self.journal_path, e)
+                        continue
+                    self.journal_records += 1
+        # Anything loaded is already on disk
+        registry.pop_changes()
+        return registry
+
+    def _drop_torn_tail(self):
+        """Cuts a partial last line so the next append starts on a fresh line."""
+        with open(self.journal_path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                logger.warning("Dropping a partial record at the end of %s.", self.journal_path)
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def persist(self, registry):
+        """
+        Appends the records changed since the last call to the journal and
+        compacts once the journal is large enough. Returns the number of
+        records written.
+        """
+        written = self._append(registry.pop_changes())
+        if self.journal_records >= self.compact_every:
+            self.compact(registry)
+        return written
+
+    def _append(self, records):
+        if not records:
+            return 0
+        if self._journal_file is None:
+            self._journal_file = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_file.write("".join(
+            json.dumps(record, separators=(",", ":")) + "\n" for record in records
+        ))
+        self._journal_file.flush()
+        self.journal_records += len(records)
+        return len(records)
+
+    def compact(self, registry):
+        """Writes the full snapshot atomically and empties the journal."""
+        # Journal pending changes first: if we crash before the journal is
+        # removed, replaying it over the new snapshot still gives this state.
+        self._append(registry.pop_changes())
+        registry.save(self.snapshot_path)
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        logger.info("Compacted %d journal records into %s.", self.journal_records, self.snapshot_path)
+        self.journal_records = 0
+
+    def close(self, registry=None):
+        """Compacts ``registry`` if given, then releases the journal file."""
+        if registry is not None:
+            self.compact(registry)
+        elif self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
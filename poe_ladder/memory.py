@@ -0,0 +1,232 @@
+"""
+Memory sampling for long runs of the scripts.
+
+Every ``sample_every`` cycles a MemoryMonitor records:
+
+* the Python heap (``tracemalloc``: memory currently traced, and the peak);
+* the resident memory of this process and of the browsers of the fetcher's
+  DriverPool (requires ``psutil``);
+* the sizes of the structures a script keeps between cycles, e.g. the
+  characters held in memory.
+
+Each sample is logged, appended as one JSON line to ``log_path`` and set as
+``ladder_memory_*`` gauges in the metrics REGISTRY. The trend is a
+least-squares slope in MB per hour over the last ``window`` samples. When
+the heap or the process grows faster than ``leak_mb_per_hour`` a warning is
+logged, with the source lines whose allocations grew most since the first
+sample.
+
+The scripts read MEMORY_SAMPLE_EVERY (cycles, 0 turns sampling off),
+MEMORY_LOG, MEMORY_TRACE (0 samples only the process and browsers, without
+tracemalloc's overhead) and MEMORY_LEAK_MB_PER_HOUR.
+
+Summary of a memory log, e.g. after a soak test:
+    python -m poe_ladder.memory memory.jsonl
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+from poe_ladder.instrument import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 60  # samples in the trend
+TRENDS = ("heap_mb", "rss_mb", "browser_rss_mb")
+_MB = 1024 * 1024
+
+
+def process_rss_mb():
+    """Resident memory of this process in MB, or None without psutil."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / _MB
+
+
+def driver_pool_of(fetcher):
+    """The DriverPool behind ``fetcher`` (or behind its selenium fallback), or None."""
+    for candidate in (fetcher, getattr(fetcher, "fallback", None)):
+        pool = getattr(candidate, "driver_pool", None)
+        if pool is not None:
+            return pool
+    return None
+
+
+def slope_per_hour(samples, field):
+    """
+    Least-squares slope of ``field`` over time, in units per hour, or None
+    with fewer than two samples that have it.
+    """
+    points = [(datetime.fromisoformat(sample["timestamp"]).timestamp(), sample[field])
+              for sample in samples if sample.get(field) is not None]
+    if len(points) < 2:
+        return None
+    mean_t = sum(t for t, _ in points) / len(points)
+    mean_v = sum(v for _, v in points) / len(points)
+    variance = sum((t - mean_t) ** 2 for t, _ in points)
+    if not variance:
+        return None
+    covariance = sum((t - mean_t) * (v - mean_v) for t, v in points)
+    return covariance / variance * 3600
+
+
+def _format_mb(value):
+    return "n/a" if value is None else f"{value:.1f} MB"
+
+
+def _format_trend(value):
+    return "n/a" if value is None else f"{value:+.2f} MB/h"
+
+
+class MemoryMonitor:
+    """Samples the memory of this process every ``sample_every`` cycles."""
+
+    def __init__(self, sample_every=0, log_path=None, trace=True, leak_mb_per_hour=None,
+                 window=DEFAULT_WINDOW):
+        self.sample_every = sample_every
+        self.log_path = log_path
+        self.leak_mb_per_hour = leak_mb_per_hour
+        self.samples = deque(maxlen=window)
+        self.cycles = 0
+        self._baseline = None
+        self.trace = trace and sample_every > 0
+        if self.trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_env(cls):
+        """The monitor configured by MEMORY_SAMPLE_EVERY, MEMORY_LOG, MEMORY_TRACE and MEMORY_LEAK_MB_PER_HOUR."""
+        leak = os.getenv("MEMORY_LEAK_MB_PER_HOUR")
+        return cls(
+            sample_every=int(os.getenv("MEMORY_SAMPLE_EVERY", 0)),
+            log_path=os.getenv("MEMORY_LOG") or None,
+            trace=os.getenv("MEMORY_TRACE", "1") != "0",
+            leak_mb_per_hour=float(leak) if leak else None,
+        )
+
+    def __bool__(self):
+        return self.sample_every > 0
+
+    def cycle(self, driver_pool=None, **sizes):
+        """
+        Counts a finished cycle and samples every ``sample_every`` of them.
+        ``sizes`` are extra counts to record, e.g. ``characters=1234``.
+        Returns the sample, or None.
+        """
+        if not self.sample_every:
+            return None
+        self.cycles += 1
+        if self.cycles % self.sample_every:
+            return None
+        return self.sample(driver_pool, **sizes)
+
+    def sample(self, driver_pool=None, **sizes):
+        """Takes, records and returns one sample."""
+        sample = {"timestamp": datetime.now().isoformat(timespec="milliseconds"), "cycle": self.cycles}
+        if self.trace:
+            current, peak = tracemalloc.get_traced_memory()
+            sample["heap_mb"] = round(current / _MB, 3)
+            sample["heap_peak_mb"] = round(peak / _MB, 3)
+            if self._baseline is None:
+                self._baseline = tracemalloc.take_snapshot()
+        rss = process_rss_mb()
+        sample["rss_mb"] = round(rss, 3) if rss is not None else None
+        browsers = driver_pool.browser_rss_mb() if driver_pool is not None else None
+        sample["browser_rss_mb"] = round(browsers, 3) if browsers is not None else None
+        sample.update(sizes)
+        self.samples.append(sample)
+
+        for name, value in sample.items():
+            if name not in ("timestamp", "cycle") and value is not None:
+                REGISTRY.gauge(f"ladder_memory_{name}", "Last memory sample of the scraper.").set(value)
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(sample) + "\n")
+
+        trend = self.trend()
+        logger.info("Memory: heap %s (%s), RSS %s (%s), browsers %s (%s)%s",
+                    _format_mb(sample.get("heap_mb")), _format_trend(trend["heap_mb"]),
+                    _format_mb(sample["rss_mb"]), _format_trend(trend["rss_mb"]),
+                    _format_mb(sample["browser_rss_mb"]), _format_trend(trend["browser_rss_mb"]),
+                    "".join(f", {name} {value}" for name, value in sizes.items()))
+        self._check_leak(trend)
+        return sample
+
+    def trend(self):
+        """Growth of the heap, the process and the browsers in MB/hour, over the window."""
+        return {field: slope_per_hour(self.samples, field) for field in TRENDS}
+
+    def _check_leak(self, trend):
+        # Half a window at least, so start-up growth is not reported as a leak
+        if self.leak_mb_per_hour is None or len(self.samples) < max(2, self.samples.maxlen // 2):
+            return
+        growing = [field for field in ("heap_mb", "rss_mb")
+                   if trend[field] is not None and trend[field] > self.leak_mb_per_hour]
+        if not growing:
+            return
+        logger.warning("Memory keeps growing: %s.",
+                       ", ".join(f"{field} {_format_trend(trend[field])}" for field in growing))
+        for line in self.top_growth():
+            logger.warning("Grown since the first sample: %s", line)
+
+    def top_growth(self, limit=5):
+        """The ``limit`` source lines whose traced allocations grew most since the first sample."""
+        if not self.trace or self._baseline is None:
+            return []
+        snapshot = tracemalloc.take_snapshot()
+        return [str(stat) for stat in snapshot.compare_to(self._baseline, "lineno")[:limit]]
+
+
+def summarize(samples):
+    """
+    First, last, minimum, maximum and slope (per hour) of every numeric
+    field of ``samples``, over all of them and over their second half,
+    when start-up growth is over.
+    """
+    fields = [name for name, value in samples[-1].items()
+              if name not in ("timestamp", "cycle") and isinstance(value, (int, float))] if samples else []
+    second_half = samples[len(samples) // 2:]
+    summary = {}
+    for field in fields:
+        values = [sample[field] for sample in samples if sample.get(field) is not None]
+        summary[field] = {
+            "first": values[0], "last": values[-1], "min": min(values), "max": max(values),
+            "per_hour": slope_per_hour(samples, field),
+            "per_hour_second_half": slope_per_hour(second_half, field),
+        }
+    return summary
+
+
+def read_memory_log(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a memory log written with MEMORY_LOG.")
+    parser.add_argument("memory_log")
+    args = parser.parse_args()
+    samples = read_memory_log(args.memory_log)
+    if not samples:
+        print(f"No samples in {args.memory_log}", file=sys.stderr)
+        return 1
+    print(f"{len(samples)} samples from {samples[0]['timestamp']} to {samples[-1]['timestamp']}")
+    print(f"{'field':<24}{'first':>10}{'last':>10}{'min':>10}{'max':>10}{'per hour':>12}{'2nd half':>12}")
+    for field, stats in summarize(samples).items():
+        trends = [f"{value:+12.2f}" if value is not None else f"{'n/a':>12}"
+                  for value in (stats["per_hour"], stats["per_hour_second_half"])]
+        print(f"{field:<24}{stats['first']:>10.1f}{stats['last']:>10.1f}{stats['min']:>10.1f}"
+              f"{stats['max']:>10.1f}{''.join(trends)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
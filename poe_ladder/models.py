@@ -0,0 +1,181 @@
+"""
+Typed ladder entry shared by all scripts.
+
+Numbers are parsed once into ints and dead/alive is a single bool, whatever
+layout the entry came from. Names are interned, so the same account, character
+and class strings are shared by every snapshot kept in memory, and
+``__slots__`` keeps each entry a fraction of the size of the equivalent dict.
+
+The legacy layouts keep the numbers as the ladder printed them ("1,234,567"):
+an entry remembers the text of its rank, level and experience and the
+``to_*_dict()`` methods write it back as long as it still parses to the
+number, so a value that does not parse is kept as well instead of being
+lost. Numbers set without such a text are written as plain digits.
+
+The three JSON layouts the scripts write are converted with ``from_dict()``
+and the ``to_*_dict()`` methods:
+
+* find_account_characters.py: Rank, Account, Character, Class, Level, Experience, Dead
+* save_ladder_data.py: rank, account_name, character_name, class, level, experience, is_dead
+* save_new_characters.py: same as above with status ("alive"/"dead") instead of is_dead
+"""
+
+import sys
+
+_DEAD_SUFFIX = "(Dead)"
+
+
+def parse_int(value):
+    """Parses ladder numbers ("1,234" or 1234). Returns None if not a number."""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).replace(",", "").strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def clean_character_name(text):
+    """Strips the quotes and the (Dead) marker the ladder puts around names."""
+    return text.replace(_DEAD_SUFFIX, "").strip('" ').strip()
+
+
+def _raw_numbers(*values):
+    """The ladder text of the numbers of an entry, or None if none was text."""
+    if not any(isinstance(value, str) for value in values):
+        return None
+    return tuple(value.strip() if isinstance(value, str) else value for value in values)
+
+
+def _format_int(value, raw):
+    """``raw``, the ladder text, if it is still the number ``value``, else ``value`` as digits."""
+    if isinstance(raw, str) and parse_int(raw) == value:
+        return raw
+    return "" if value is None else str(value)
+
+
+class LadderEntry:
+    """One character on the ladder."""
+
+    __slots__ = ("rank", "account", "character", "char_class", "level", "experience", "dead", "_raw")
+    _FIELDS = __slots__[:-1]
+
+    # Entries are mutable (benchmarks and callers update rank and experience in
+    # place), so they compare by value but are deliberately unhashable; use
+    # ``key`` to index them.
+    __hash__ = None
+
+    def __init__(self, rank, account, character, char_class, level, experience, dead=False, raw=None):
+        self.rank = rank
+        self.account = sys.intern(account)
+        self.character = sys.intern(character)
+        self.char_class = sys.intern(char_class)
+        self.level = level
+        self.experience = experience
+        self.dead = dead
+        self._raw = raw  # (rank, level, experience) as printed, see _format_int
+
+    @property
+    def key(self):
+        """Identity of the character across snapshots."""
+        return (self.account, self.character)
+
+    def __eq__(self, other):
+        if not isinstance(other, LadderEntry):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._FIELDS)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._FIELDS)
+        return f"LadderEntry({fields})"
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds an entry from an extracted LadderRow."""
+        return cls(
+            rank=parse_int(row.rank),
+            account=row.account,
+            character=clean_character_name(row.character),
+            char_class=row.char_class,
+            level=parse_int(row.level),
+            experience=parse_int(row.experience),
+            dead=row.state is not None and "Dead" in row.state,
+            raw=_raw_numbers(row.rank, row.level, row.experience),
+        )
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds an entry from a dict in any of the three layouts."""
+        if "Account" in data:
+            return cls(
+                rank=parse_int(data.get("Rank")),
+                account=data["Account"],
+                character=clean_character_name(data["Character"]),
+                char_class=data.get("Class", ""),
+                level=parse_int(data.get("Level")),
+                experience=parse_int(data.get("Experience")),
+                dead=bool(data.get("Dead")),
+                raw=_raw_numbers(data.get("Rank"), data.get("Level"), data.get("Experience")),
+            )
+        if "status" in data:
+            dead = data["status"] == "dead"
+        else:
+            dead = bool(data.get("is_dead"))
+        return cls(
+            rank=parse_int(data.get("rank")),
+            account=data["account_name"],
+            character=clean_character_name(data["character_name"]),
+            char_class=data.get("class", ""),
+            level=parse_int(data.get("level")),
+            experience=parse_int(data.get("experience")),
+            dead=dead,
+            raw=_raw_numbers(data.get("rank"), data.get("level"), data.get("experience")),
+        )
+
+    @classmethod
+    def coerce(cls, item):
+        """Returns ``item`` as an entry: a LadderEntry, LadderRow or dict in any layout."""
+        if isinstance(item, cls):
+            return item
+        if isinstance(item, dict):
+            return cls.from_dict(item)
+        return cls.from_row(item)
+
+    def to_account_dict(self):
+        """Layout logged by find_account_characters.py."""
+        raw = self._raw or (None, None, None)
+        return {
+            "Rank": _format_int(self.rank, raw[0]),
+            "Account": self.account,
+            "Character": self.character,
+            "Class": self.char_class,
+            "Level": _format_int(self.level, raw[1]),
+            "Experience": _format_int(self.experience, raw[2]),
+            "Dead": self.dead,
+        }
+
+    def to_ladder_dict(self):
+        """Layout saved by save_ladder_data.py."""
+        raw = self._raw or (None, None, None)
+        return {
+            "rank": _format_int(self.rank, raw[0]),
+            "account_name": self.account,
+            "character_name": self.character,
+            "class": self.char_class,
+            "level": _format_int(self.level, raw[1]),
+            "experience": _format_int(self.experience, raw[2]),
+            "is_dead": self.dead,
+        }
+
+    def to_new_character_dict(self):
+        """Layout stored by save_new_characters.py."""
+        raw = self._raw or (None, None, None)
+        return {
+            "rank": _format_int(self.rank, raw[0]),
+            "account_name": self.account,
+            "character_name": self.character,
+            "class": self.char_class,
+            "level": _format_int(self.level, raw[1]),
+            "experience": _format_int(self.experience, raw[2]),
+            "status": "dead" if self.dead else "alive",
+        }
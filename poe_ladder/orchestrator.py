@@ -0,0 +1,240 @@
+"""
+Scrapes many ladders (leagues or pages) from one process.
+
+Each target runs its own asyncio loop with its own PollScheduler (see
+poe_ladder.schedule) around its ``interval``; the actual
+fetches go through a bounded thread pool, so at most ``concurrency`` ladders
+are fetched at once. With the ``http`` backend the targets share one pooled
+keep-alive session; with ``selenium``/``auto`` they share a pool of at most
+``concurrency`` browsers instead of one Chrome per league. Every target writes
+to its own directory under ``output_root``. Each target has its own
+ChangeDetector: an unchanged ladder is neither parsed nor saved, and is
+counted in the ``skipped`` stat of its target.
+
+Targets are read from a JSON file:
+
+    [
+        {"name": "settlers", "url": "https://.../ladders/league/Settlers", "interval": 60},
+        {"name": "hc-settlers", "url": "https://.../ladders/league/Hardcore%20Settlers"}
+    ]
+
+    python -m poe_ladder.orchestrator ladders.json --concurrency 4 --output ladder_data
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+
+from poe_ladder.change import ChangeDetector
+from poe_ladder.deltas import LadderDeltaStore
+from poe_ladder.drivers import DriverPool
+from poe_ladder.fetch import make_fetcher, make_session
+from poe_ladder.models import LadderEntry
+from poe_ladder.schedule import PollScheduler, ladder_churn
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL = 60  # seconds
+DEFAULT_CONCURRENCY = 4
+STORAGES = ("json", "delta")
+
+
+class LadderTarget:
+    """One ladder to scrape."""
+
+    __slots__ = ("name", "url", "interval")
+
+    def __init__(self, url, name=None, interval=DEFAULT_INTERVAL):
+        self.url = url
+        self.name = name or target_name_from_url(url)
+        self.interval = interval
+
+    def __repr__(self):
+        return f"LadderTarget(name={self.name!r}, url={self.url!r}, interval={self.interval!r})"
+
+
+def target_name_from_url(url):
+    """Derives a directory-safe name from a ladder URL (its last path segment)."""
+    segment = unquote(urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]) or "ladder"
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in segment)
+
+
+def load_targets(path):
+    """Reads the list of targets from a JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [
+            LadderTarget(item["url"], item.get("name"), item.get("interval", DEFAULT_INTERVAL))
+            for item in json.load(f)
+        ]
+
+
+class LadderOutput:
+    """Writes the snapshots of one target to its own directory."""
+
+    def __init__(self, directory, storage="json"):
+        if storage not in STORAGES:
+            raise ValueError(f"Unknown storage {storage!r}, expected one of {', '.join(STORAGES)}.")
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.delta_store = LadderDeltaStore(directory) if storage == "delta" else None
+
+    def save(self, ladder):
+        if self.delta_store is not None:
+            return self.delta_store.save(ladder)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        with open(os.path.join(self.directory, f"ladder_data_{timestamp}.json"), "w", encoding="utf-8") as f:
+            json.dump(ladder, f)
+        return "json"
+
+
+class LadderOrchestrator:
+    """Runs the scrape loops of several targets concurrently."""
+
+    def __init__(self, targets, backend="http", concurrency=DEFAULT_CONCURRENCY,
+                 output_root="ladder_data", storage="json", driver_factory=None,
+                 wait_timeout=None, on_snapshot=None, driver_max_uses=None, driver_max_rss_mb=None):
+        self.targets = list(targets)
+        names = [target.name for target in self.targets]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Ladder target names must be unique: {names}")
+
+        self.concurrency = concurrency
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ladder-fetch")
+        self.session = make_session(pool_size=concurrency)
+        self.driver_pool = None
+        if driver_factory:
+            self.driver_pool = DriverPool(driver_factory, size=concurrency, max_uses=driver_max_uses,
+                                          max_rss_mb=driver_max_rss_mb)
+
+        fetcher_options = {"session": self.session, "driver_pool": self.driver_pool}
+        if wait_timeout is not None:
+            fetcher_options["wait_timeout"] = wait_timeout
+        self.detectors = {target.name: ChangeDetector() for target in self.targets}
+        self.fetchers = {
+            target.name: make_fetcher(backend, target.url, change_detector=self.detectors[target.name],
+                                      **fetcher_options)
+            for target in self.targets
+        }
+        self.outputs = {
+            target.name: LadderOutput(os.path.join(output_root, target.name), storage)
+            for target in self.targets
+        }
+        # Called with (target, entries) after each successful scrape
+        self.on_snapshot = on_snapshot
+        self.stats = {
+            target.name: {"cycles": 0, "errors": 0, "skipped": 0, "last_seconds": None}
+            for target in self.targets
+        }
+        # Rows of the last snapshot of each target and the share that changed in it
+        self.last_rows = {}
+        self.churn = {}
+
+    def scrape(self, target):
+        """
+        Fetches and stores one target synchronously (runs in the thread pool).
+        Returns (entries, seconds); entries is None if the ladder is unchanged.
+        """
+        start = time.monotonic()
+        rows = self.fetchers[target.name].fetch_rows()
+        if rows is None:
+            return None, time.monotonic() - start
+        entries = [LadderEntry.from_row(row) for row in rows]
+        if entries:
+            self.outputs[target.name].save([entry.to_ladder_dict() for entry in entries])
+        self.churn[target.name] = ladder_churn(self.last_rows.get(target.name), rows)
+        self.last_rows[target.name] = rows
+        return entries, time.monotonic() - start
+
+    async def run_target(self, target, cycles=None):
+        """Scrape loop of one target, around every ``interval`` seconds, ``cycles`` times or forever."""
+        loop = asyncio.get_running_loop()
+        scheduler = PollScheduler(target.interval, clock=loop.time)
+        stats = self.stats[target.name]
+        done = 0
+        while cycles is None or done < cycles:
+            scheduler.start_cycle()
+            try:
+                entries, seconds = await loop.run_in_executor(self.executor, self.scrape, target)
+                stats["cycles"] += 1
+                stats["last_seconds"] = seconds
+                if entries is None:
+                    scheduler.record_unchanged()
+                    stats["skipped"] += 1
+                    logger.info("[%s] Unchanged (%.2fs)", target.name, seconds)
+                else:
+                    scheduler.record_change(self.churn.get(target.name))
+                    logger.info("[%s] %d entries in %.2fs", target.name, len(entries), seconds)
+                    if self.on_snapshot is not None:
+                        self.on_snapshot(target, entries)
+            except Exception as e:
+                scheduler.record_error()
+                stats["errors"] += 1
+                logger.error("[%s] Scrape failed: %s", target.name, e)
+                # A ladder fetched but not saved must not be skipped as unchanged next time
+                self.detectors[target.name].reset()
+            done += 1
+            if cycles is not None and done >= cycles:
+                break
+            await asyncio.sleep(scheduler.remaining())
+
+    async def run(self, cycles=None):
+        """Runs every target until cancelled (or for ``cycles`` cycles each)."""
+        await asyncio.gather(*(self.run_target(target, cycles) for target in self.targets))
+
+    def close(self):
+        for fetcher in self.fetchers.values():
+            fetcher.close()
+        if self.driver_pool is not None:
+            self.driver_pool.close()
+        self.session.close()
+        self.executor.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape several POE ladders from one process.")
+    parser.add_argument("targets", help="JSON file with the ladders to scrape")
+    parser.add_argument("--backend", default=os.getenv("LADDER_BACKEND", "http"),
+                        choices=("http", "selenium", "auto"))
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--output", default="ladder_data", help="one sub-directory per target")
+    parser.add_argument("--storage", default=os.getenv("LADDER_STORAGE", "json"), choices=STORAGES)
+    parser.add_argument("--cycles", type=int, help="stop after this many cycles per target")
+    parser.add_argument("--driver-max-uses", type=int, default=int(os.getenv("DRIVER_MAX_USES", 500)) or None,
+                        help="restart a browser after this many fetches")
+    parser.add_argument("--driver-max-rss-mb", type=int, default=int(os.getenv("DRIVER_MAX_RSS_MB", 0)) or None,
+                        help="restart a browser above this memory use (needs psutil)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    driver_factory = None
+    if args.backend != "http":
+        from poe_ladder.browser import numbered_profile_factory
+        driver_factory = numbered_profile_factory()
+
+    orchestrator = LadderOrchestrator(
+        load_targets(args.targets),
+        backend=args.backend,
+        concurrency=args.concurrency,
+        output_root=args.output,
+        storage=args.storage,
+        driver_factory=driver_factory,
+        driver_max_uses=args.driver_max_uses,
+        driver_max_rss_mb=args.driver_max_rss_mb,
+    )
+    try:
+        asyncio.run(orchestrator.run(args.cycles))
+    except KeyboardInterrupt:
+        logger.info("Interrupted by user.")
+    finally:
+        orchestrator.close()
+
+
+if __name__ == "__main__":
+    main()
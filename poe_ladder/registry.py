@@ -0,0 +1,214 @@
+"""
+Indexed registry of known characters.
+
+Characters are keyed by ``(account_name, character_name)`` so membership
+checks and updates are O(1) instead of a scan over every known character. The
+registry reads and writes the list-of-dicts layout of ``characters.json``;
+the ``first_seen``/``last_seen`` timestamps it adds are plain extra keys, so
+older files load unchanged.
+
+For long runs the registry can be capped: ``evict(max_records)`` moves the
+characters seen least recently to a ColdCharacterStore, an SQLite file, and a
+character found there is brought back into memory when it is seen again.
+Saving writes the records in memory and in the cold store, one at a time.
+"""
+
+import json
+import heapq
+import logging
+from datetime import datetime
+
+from poe_ladder.fileio import atomic_write_json_list
+
+logger = logging.getLogger(__name__)
+
+# ``last_seen`` moves are reported when the hour changes: "YYYY-MM-DDTHH"
+_LAST_SEEN_PRECISION = len("2025-01-19T12")
+
+
+def character_key(character):
+    """Returns the registry key of a character dict."""
+    return (character["account_name"], character["character_name"])
+
+
+class CharacterRegistry:
+    """Known characters with the time they were first and last seen."""
+
+    def __init__(self, characters=()):
+        self._records = {}
+        self._changed = set()
+        self.cold_store = None
+        for character in characters:
+            record = dict(character)
+            self._records[character_key(record)] = record
+
+    def __len__(self):
+        cold = len(self.cold_store) if self.cold_store is not None else 0
+        return len(self._records) + cold
+
+    @property
+    def resident(self):
+        """Number of records held in memory."""
+        return len(self._records)
+
+    def __contains__(self, key):
+        return key in self._records or (self.cold_store is not None and key in self.cold_store)
+
+    def __iter__(self):
+        """Every record, the ones in memory first, then the evicted ones."""
+        yield from self._records.values()
+        if self.cold_store is not None:
+            yield from self.cold_store
+
+    def _restore(self, key):
+        """Brings an evicted record back into memory. Returns it, or None."""
+        if self.cold_store is None:
+            return None
+        record = self.cold_store.take(key)
+        if record is not None:
+            self._records[key] = record
+        return record
+
+    def get(self, account_name, character_name):
+        """Returns the stored record of a character, or None."""
+        key = (account_name, character_name)
+        return self._records.get(key) or self._restore(key)
+
+    def observe(self, character, seen_at=None):
+        """
+        Records a sighting of ``character``. New characters are added with
+        ``first_seen`` set; known ones get their data and ``last_seen``
+        refreshed. Returns True if the character was not known yet.
+
+        New characters and characters whose data changed are reported by
+        ``pop_changes()``. A sighting that only moves ``last_seen`` is
+        reported when it moves to another hour, so the journal keeps it to
+        the hour (eviction orders by it) without a record per sighting.
+        """
+        seen_at = seen_at or datetime.now().isoformat(timespec="seconds")
+        key = character_key(character)
+        record = self._records.get(key) or self._restore(key)
+        if record is None:
+            record = dict(character)
+            record["first_seen"] = seen_at
+            record["last_seen"] = seen_at
+            self._records[key] = record
+            self._changed.add(key)
+            return True
+        if any(record.get(field) != value for field, value in character.items()):
+            record.update(character)
+            self._changed.add(key)
+        record.setdefault("first_seen", seen_at)
+        last_seen = record.get("last_seen")
+        if last_seen is None or last_seen[:_LAST_SEEN_PRECISION] != seen_at[:_LAST_SEEN_PRECISION]:
+            self._changed.add(key)
+        record["last_seen"] = seen_at
+        return False
+
+    def pop_changes(self):
+        """Returns the records added or changed since the last call."""
+        changes = [self._records[key] for key in self._changed]
+        self._changed.clear()
+        return changes
+
+    def apply(self, record):
+        """Stores a full record as is, e.g. when replaying a journal."""
+        self._records[character_key(record)] = dict(record)
+
+    def to_list(self):
+        """Returns the records in the characters.json layout."""
+        return list(self)
+
+    def set_cold_store(self, cold_store):
+        """
+        Evicts to ``cold_store`` from now on. The store is emptied first: the
+        registry was loaded in full, so it holds every record.
+        """
+        cold_store.clear()
+        self.cold_store = cold_store
+
+    def evict(self, max_records):
+        """
+        Moves the records seen least recently to the cold store until at most
+        ``max_records`` are left in memory. Records not persisted yet (see
+        ``pop_changes()``) stay. Returns how many were evicted.
+        """
+        excess = len(self._records) - max_records
+        if self.cold_store is None or excess <= 0:
+            return 0
+        candidates = (key for key in self._records if key not in self._changed)
+        keys = heapq.nsmallest(excess, candidates, key=lambda key: self._records[key].get("last_seen", ""))
+        self.cold_store.put([self._records.pop(key) for key in keys])
+        return len(keys)
+
+    @classmethod
+    def load(cls, path):
+        """Loads a registry from a characters.json file."""
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def save(self, path):
+        """Atomically writes the registry to a characters.json file."""
+        atomic_write_json_list(path, self, indent=4)
+
+
+class ColdCharacterStore:
+    """
+    Records evicted from a CharacterRegistry, in the SQLite file at ``path``.
+    A record taken back into memory is removed from the store, so memory and
+    store never hold the same character.
+    """
+
+    def __init__(self, path):
+        import sqlite3
+
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS characters ("
+                "account TEXT NOT NULL, character TEXT NOT NULL, record TEXT NOT NULL, "
+                "PRIMARY KEY (account, character)) WITHOUT ROWID"
+            )
+        self._count = self._connection.execute("SELECT COUNT(*) FROM characters").fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        return self._connection.execute(
+            "SELECT 1 FROM characters WHERE account = ? AND character = ?", key
+        ).fetchone() is not None
+
+    def __iter__(self):
+        for (record,) in self._connection.execute("SELECT record FROM characters"):
+            yield json.loads(record)
+
+    def put(self, records):
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO characters (account, character, record) VALUES (?, ?, ?)",
+                [(*character_key(record), json.dumps(record, separators=(",", ":"))) for record in records],
+            )
+        self._count = self._connection.execute("SELECT COUNT(*) FROM characters").fetchone()[0]
+
+    def take(self, key):
+        """Removes and returns the record of ``key``, or None."""
+        row = self._connection.execute(
+            "SELECT record FROM characters WHERE account = ? AND character = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        with self._connection:
+            self._connection.execute("DELETE FROM characters WHERE account = ? AND character = ?", key)
+        self._count -= 1
+        return json.loads(row[0])
+
+    def clear(self):
+        with self._connection:
+            self._connection.execute("DELETE FROM characters")
+        self._count = 0
+
+    def close(self):
+        self._connection.close()
@@ -0,0 +1,118 @@
+"""
+Adaptive polling for the scrape loops.
+
+PollScheduler replaces the fixed ``time.sleep(60)`` between cycles:
+
+* the delay is counted from the start of the cycle, so a scrape taking 15s
+  no longer stretches a 60s cadence to 75s;
+* cycles that find the ladder unchanged stretch the interval (up to
+  ``max_interval``), cycles with high churn (a share of rows at least
+  ``high_churn`` changed, e.g. at league start) shrink it (down to
+  ``min_interval``), and ordinary changes bring it back to ``interval``;
+* failed cycles back off exponentially from the current interval, and the
+  first success afterwards resumes the normal cadence.
+
+``clock`` and ``sleep`` default to ``time.monotonic`` and ``time.sleep`` and
+can be replaced, e.g. by a fake clock in tests or ``loop.time`` in asyncio
+code that only needs ``remaining()``.
+"""
+
+import time
+
+DEFAULT_INTERVAL = 60  # seconds
+DEFAULT_BACKOFF = 1.5
+DEFAULT_SPEEDUP = 0.5
+DEFAULT_HIGH_CHURN = 0.2
+
+
+def ladder_churn(previous_rows, rows):
+    """
+    Share (0 to 1) of ``rows`` that were not in ``previous_rows`` exactly as
+    they are now: new entries, rank moves, level or experience changes.
+    None without a previous snapshot to compare with.
+    """
+    if not previous_rows:
+        return None
+    if not rows:
+        return 0.0
+    previous = set(previous_rows)
+    return sum(1 for row in rows if row not in previous) / len(rows)
+
+
+class PollScheduler:
+    """
+    Decides how long to wait before the next cycle. Call ``start_cycle()``
+    before each scrape, one of ``record_change()``, ``record_unchanged()`` or
+    ``record_error()`` after it, then ``sleep()``.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, min_interval=None, max_interval=None,
+                 backoff=DEFAULT_BACKOFF, speedup=DEFAULT_SPEEDUP, high_churn=DEFAULT_HIGH_CHURN,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.base_interval = interval
+        self.min_interval = interval / 4 if min_interval is None else min_interval
+        self.max_interval = interval * 5 if max_interval is None else max_interval
+        if not 0 < self.min_interval <= interval <= self.max_interval:
+            raise ValueError(
+                f"Poll intervals must satisfy 0 < min ({self.min_interval}) <= "
+                f"interval ({interval}) <= max ({self.max_interval})."
+            )
+        self.backoff = backoff
+        self.speedup = speedup
+        self.high_churn = high_churn
+        self.clock = clock
+        self._sleep = sleep
+        self.interval = interval
+        self.delay = interval
+        self.consecutive_errors = 0
+        self._cycle_start = None
+
+    def _clamp(self, seconds):
+        return min(self.max_interval, max(self.min_interval, seconds))
+
+    def start_cycle(self):
+        self._cycle_start = self.clock()
+
+    def record_change(self, churn=None):
+        """
+        The ladder changed; ``churn`` is the share of rows that changed (see
+        ladder_churn), None if unknown. Returns the delay until the next cycle.
+        """
+        if churn == 0:
+            return self.record_unchanged()
+        self.consecutive_errors = 0
+        if churn is not None and churn >= self.high_churn:
+            self.interval = self._clamp(self.interval * self.speedup)
+        elif self.interval > self.base_interval:
+            # Activity after a quiet spell: back to the normal cadence at once
+            self.interval = self.base_interval
+        else:
+            self.interval = min(self.base_interval, self.interval * self.backoff)
+        self.delay = self.interval
+        return self.delay
+
+    def record_unchanged(self):
+        """The ladder did not change. Returns the delay until the next cycle."""
+        self.consecutive_errors = 0
+        self.interval = self._clamp(self.interval * self.backoff)
+        self.delay = self.interval
+        return self.delay
+
+    def record_error(self):
+        """The cycle failed. Returns the delay until the next cycle."""
+        self.consecutive_errors += 1
+        self.delay = min(self.max_interval, self.interval * 2 ** self.consecutive_errors)
+        return self.delay
+
+    def remaining(self):
+        """Seconds left until the next cycle is due (0 if it is overdue)."""
+        if self._cycle_start is None:
+            return 0.0
+        return max(0.0, self._cycle_start + self.delay - self.clock())
+
+    def sleep(self):
+        """Sleeps until the next cycle is due. Returns the seconds slept."""
+        seconds = self.remaining()
+        if seconds > 0:
+            self._sleep(seconds)
+        return seconds
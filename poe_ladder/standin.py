@@ -0,0 +1,150 @@
+"""
+Local HTTP stand-in for the ladder site.
+
+Serves recorded pages from memory or from a directory over HTTP/1.1 with
+keep-alive, so the fetchers can be exercised without touching the real site.
+Every page gets an ``ETag`` and conditional requests for an unchanged page are
+answered with ``304 Not Modified``.
+
+    python -m poe_ladder.standin benchmarks/fixtures --port 8765
+
+then point ``POE_LADDER_PAGE`` at ``http://127.0.0.1:8765/ladder_page.html``.
+"""
+
+import os
+import hashlib
+import argparse
+import mimetypes
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; with Nagle on, small pages stall
+    # ~40ms on the client's delayed ACK and skew the latencies measured
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        page = self.server.standin.lookup(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+        body, content_type = page
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=8).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.server.standin.count_not_modified()
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LadderStandInServer:
+    """
+    Serves ``pages`` (a dict of path -> str/bytes body) and, for other paths,
+    files from ``directory``. Use as a context manager or call start()/stop().
+    """
+
+    def __init__(self, pages=None, directory=None, host="127.0.0.1", port=0):
+        self.pages = {}
+        self.directory = directory
+        self.request_count = 0
+        self.not_modified_count = 0
+        self._lock = threading.Lock()
+        for path, body in (pages or {}).items():
+            self.set_page(path, body)
+        self._server = ThreadingHTTPServer((host, port), _StandInHandler)
+        self._server.daemon_threads = True
+        self._server.standin = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, path):
+        return self.base_url + "/" + path.lstrip("/")
+
+    def set_page(self, path, body, content_type=None):
+        """Adds or replaces a page, e.g. to simulate the ladder changing."""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if content_type is None:
+            content_type = mimetypes.guess_type(path)[0] or "text/html"
+            if content_type.startswith("text/"):
+                content_type += "; charset=utf-8"
+        with self._lock:
+            self.pages["/" + path.lstrip("/")] = (body, content_type)
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified_count += 1
+
+    def lookup(self, path):
+        """Returns (body, content_type) for a request path, or None."""
+        with self._lock:
+            self.request_count += 1
+            page = self.pages.get(path) or self.pages.get(path.split("?", 1)[0])
+        if page is not None or self.directory is None:
+            return page
+
+        relative = os.path.normpath(path.split("?", 1)[0].lstrip("/"))
+        if relative.startswith(".."):
+            return None
+        file_path = os.path.join(self.directory, relative)
+        if not os.path.isfile(file_path):
+            return None
+        with open(file_path, "rb") as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+        return body, content_type
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded ladder pages locally.")
+    parser.add_argument("directory", help="directory holding the recorded pages")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = LadderStandInServer(directory=args.directory, host=args.host, port=args.port)
+    print(f"Serving {args.directory} on {server.base_url} (Ctrl+C to stop)")
+    server.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
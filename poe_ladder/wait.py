@@ -0,0 +1,67 @@
+"""
+Readiness-driven waiting for the ladder table.
+
+Replaces the fixed ``time.sleep(5)`` after each page load: the wait returns as
+soon as the table has rows and they stopped changing, and reports how long
+that took.
+"""
+
+import time
+import logging
+
+from poe_ladder.extract import LADDER_TABLE_SELECTOR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WAIT_TIMEOUT = 20  # seconds
+DEFAULT_STABLE_FOR = 0.5  # seconds the rows must stay unchanged
+DEFAULT_POLL_FREQUENCY = 0.1  # seconds
+
+# Row count and text of the last row, in a single round-trip
+_ROWS_STATE_SCRIPT = (
+    "var rows = document.querySelectorAll(arguments[0] + ' tbody tr');"
+    "return [rows.length, rows.length ? rows[rows.length - 1].textContent : ''];"
+)
+
+
+class LadderRowsStable:
+    """
+    WebDriverWait condition: true once the ladder table has rows and neither
+    their count nor the last row changed for ``stable_for`` seconds.
+    """
+
+    def __init__(self, stable_for=DEFAULT_STABLE_FOR, clock=time.monotonic):
+        self.stable_for = stable_for
+        self.clock = clock
+        self._state = None
+        self._since = None
+
+    def __call__(self, driver):
+        state = tuple(driver.execute_script(_ROWS_STATE_SCRIPT, LADDER_TABLE_SELECTOR))
+        now = self.clock()
+        if not state[0]:
+            self._state = None
+            return False
+        if state != self._state:
+            self._state = state
+            self._since = now
+            return False
+        return now - self._since >= self.stable_for
+
+
+def wait_for_ladder(driver, timeout=DEFAULT_WAIT_TIMEOUT, stable_for=DEFAULT_STABLE_FOR,
+                    poll_frequency=DEFAULT_POLL_FREQUENCY):
+    """
+    Waits until the ladder rows are present and stable.
+    Returns the seconds it took, raises TimeoutException after ``timeout``.
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    start = time.monotonic()
+    WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(
+        LadderRowsStable(stable_for),
+        f"Ladder rows not ready after {timeout} seconds"
+    )
+    elapsed = time.monotonic() - start
+    logger.debug("Ladder rows ready after %.2f seconds.", elapsed)
+    return elapsed
@@ -0,0 +1,115 @@
+"""
+Accounts watched by the account scripts.
+
+A Watchlist holds any number of accounts, normalized once (surrounding
+whitespace stripped, case-folded) into a set, so matching a snapshot is one
+pass over its rows with a set lookup per row, whatever the number of
+accounts. ``group()`` returns the matches by account, in ladder order.
+
+The accounts come from ``ACCOUNT`` (one account, or several separated by
+commas) and/or ``WATCHLIST_FILE``, a text file with one account per line;
+blank lines and lines starting with ``#`` are ignored. The file is read again
+by ``reload_if_changed()`` whenever its modification time changes, so
+accounts can be added or removed without restarting a script.
+"""
+
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_account(name):
+    """The form accounts are compared in: stripped and case-folded."""
+    return name.strip().casefold()
+
+
+def read_watchlist_file(path):
+    """Returns the accounts listed in ``path``."""
+    accounts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                accounts.append(line)
+    return accounts
+
+
+class Watchlist:
+    """Accounts to match, from ``accounts`` and the file at ``path``."""
+
+    def __init__(self, accounts=(), path=None):
+        self.fixed_accounts = [account.strip() for account in accounts if account.strip()]
+        self.path = path
+        self._mtime = None
+        self._names = {}  # normalized -> name as configured
+        self._accounts = frozenset()
+        self._set_accounts(self.fixed_accounts)
+        if path is not None:
+            self.reload_if_changed()
+
+    @classmethod
+    def from_env(cls):
+        """The watchlist configured by ACCOUNT and WATCHLIST_FILE."""
+        accounts = (os.getenv("ACCOUNT") or "").split(",")
+        return cls(accounts, os.getenv("WATCHLIST_FILE") or None)
+
+    def _set_accounts(self, accounts):
+        names = {}
+        for account in accounts:
+            names.setdefault(normalize_account(account), account)
+        self._names = names
+        self._accounts = frozenset(names)
+
+    def __len__(self):
+        return len(self._accounts)
+
+    def __contains__(self, account):
+        return normalize_account(account) in self._accounts
+
+    @property
+    def accounts(self):
+        """The watched accounts as configured, sorted."""
+        return sorted(self._names.values(), key=normalize_account)
+
+    def reload_if_changed(self):
+        """
+        Reads the watchlist file again if it changed since the last read.
+        Returns True if the watched accounts changed. An unreadable file is
+        logged and the current accounts are kept.
+        """
+        if self.path is None:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime == self._mtime:
+                return False
+            accounts = read_watchlist_file(self.path)
+        except OSError as e:
+            logger.warning("Could not read the watchlist %s, keeping %d accounts: %s",
+                           self.path, len(self), e)
+            return False
+        self._mtime = mtime
+        previous = self._accounts
+        self._set_accounts(self.fixed_accounts + accounts)
+        if self._accounts == previous:
+            return False
+        logger.info("Watching %d accounts (%d added, %d removed) from %s.", len(self),
+                    len(self._accounts - previous), len(previous - self._accounts), self.path)
+        return True
+
+    def group(self, rows):
+        """
+        Returns ``{account: [rows]}`` for the rows (anything with an
+        ``account`` attribute: LadderRow, LadderEntry) of watched accounts, in
+        one pass. Keys are the account names as configured; accounts without
+        a match are left out.
+        """
+        watched = self._accounts
+        names = self._names
+        groups = {}
+        for row in rows:
+            account = normalize_account(row.account)
+            if account in watched:
+                groups.setdefault(names[account], []).append(row)
+        return groups
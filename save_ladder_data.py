@@ -1,143 +1,182 @@
 import os
-import time
+import sys
 import json
 import logging
+import argparse
 from datetime import datetime
-from dotenv import load_dotenv
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import (
-    NoSuchElementException,
-    TimeoutException,
-    WebDriverException,
-)
-from selenium.webdriver.common.by import By
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Retrieve environment variables
-CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")
-CHROME_PROFILE_PATH = os.getenv("CHROME_PROFILE_PATH")
-CHROME_EXECUTABLE_PATH = os.getenv("CHROME_EXECUTABLE_PATH")
-POE_LADDER_PAGE = os.getenv("POE_LADDER_PAGE")
-
-# Validate environment variables
-if not all([CHROMEDRIVER_PATH, CHROME_PROFILE_PATH, CHROME_EXECUTABLE_PATH, POE_LADDER_PAGE]):
-    raise ValueError("One or more environment variables are missing. Please check your .env file.")
-
-# Setup logging
-logging.basicConfig(
-    filename='ladder_scraper.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-
-# Create ladder_data directory if it doesn't exist
+from logging.handlers import RotatingFileHandler
+from poe_ladder import browser
+from poe_ladder.models import LadderEntry
+from poe_ladder.change import ChangeDetector
+from poe_ladder.crawl import LadderCrawler
+from poe_ladder.database import LadderDatabase
+from poe_ladder.deltas import LadderDeltaStore
+from poe_ladder.events import EventPipeline
+from poe_ladder.instrument import REGISTRY, start_queue_logging
+from poe_ladder.memory import MemoryMonitor, driver_pool_of
+from poe_ladder.schedule import PollScheduler, ladder_churn
+from poe_ladder.fetch import FetchError, make_fetcher
+
 DATA_DIR = "ladder_data"
-if not os.path.exists(DATA_DIR):
-    os.makedirs(DATA_DIR)
-    print(f"Created directory: {DATA_DIR}")
-    logging.info(f"Created directory: {DATA_DIR}")
-
-# Configure Selenium options
-chrome_options = Options()
-chrome_options.add_argument("--headless")  # Run in headless mode
-chrome_options.add_argument(f"--user-data-dir={CHROME_PROFILE_PATH}")  # Custom Chrome profile
-chrome_options.binary_location = CHROME_EXECUTABLE_PATH  # Custom Chrome executable
-
-# Initialize Selenium WebDriver
-try:
-    service = Service(executable_path=CHROMEDRIVER_PATH)
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    print("Initialized Chrome WebDriver successfully.")
-    logging.info("Initialized Chrome WebDriver successfully.")
-except WebDriverException as e:
-    print(f"Error initializing Chrome WebDriver: {e}")
-    logging.error(f"Error initializing Chrome WebDriver: {e}")
-    raise e
-
-def scrape_ladder():
+STORAGES = ("json", "delta", "sqlite")  # LADDER_STORAGE values
+
+def load_config():
+    """
+    Loads the .env file and reads the configuration into the module globals.
+    Called by main(), so importing this script has no side effects.
+    """
+    global CHROMEDRIVER_PATH, CHROME_PROFILE_PATH, CHROME_EXECUTABLE_PATH, POE_LADDER_PAGE, LADDER_BACKEND
+    global LADDER_WAIT_TIMEOUT, LADDER_CRAWL_PAGES, LADDER_CRAWL_CONCURRENCY, LADDER_STORAGE, LADDER_DATABASE
+    global KEYFRAME_EVERY, SKIP_UNCHANGED, POLL_INTERVAL, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL
+    global DRIVER_MAX_USES, DRIVER_MAX_RSS_MB, LOG_LEVEL, METRICS_FILE, METRICS_PORT
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # Retrieve environment variables
+    CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")
+    CHROME_PROFILE_PATH = os.getenv("CHROME_PROFILE_PATH")
+    CHROME_EXECUTABLE_PATH = os.getenv("CHROME_EXECUTABLE_PATH")
+    POE_LADDER_PAGE = os.getenv("POE_LADDER_PAGE")
+    LADDER_BACKEND = os.getenv("LADDER_BACKEND", "auto")  # http, selenium or auto
+    LADDER_WAIT_TIMEOUT = float(os.getenv("LADDER_WAIT_TIMEOUT", 20))  # max seconds to wait for the table
+    LADDER_CRAWL_PAGES = int(os.getenv("LADDER_CRAWL_PAGES", 0))  # > 0: crawl the full ladder (HTML pages to fetch)
+    LADDER_CRAWL_CONCURRENCY = int(os.getenv("LADDER_CRAWL_CONCURRENCY", 4))  # pages fetched at once
+    LADDER_STORAGE = os.getenv("LADDER_STORAGE", "json")  # json (one file per scrape), delta or sqlite
+    LADDER_DATABASE = os.getenv("LADDER_DATABASE", "ladder.db")  # sqlite storage: database file
+    KEYFRAME_EVERY = int(os.getenv("LADDER_KEYFRAME_EVERY", 60))  # delta storage: snapshots between keyframes
+    SKIP_UNCHANGED = os.getenv("LADDER_SKIP_UNCHANGED", "1") != "0"  # don't parse or save an unchanged ladder
+    POLL_INTERVAL = float(os.getenv("POLL_INTERVAL", 60))  # seconds between scrapes, from the start of a scrape
+    POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", 15))  # fastest polling while the ladder churns
+    POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", 300))  # slowest polling while quiet or failing
+    DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", 500)) or None  # restart Chrome after this many scrapes (0: never)
+    DRIVER_MAX_RSS_MB = int(os.getenv("DRIVER_MAX_RSS_MB", 0)) or None  # restart Chrome above this memory use (needs psutil)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # DEBUG also logs every scraped character
+    METRICS_FILE = os.getenv("METRICS_FILE")  # Prometheus text file rewritten after every scrape
+    METRICS_PORT = int(os.getenv("METRICS_PORT", 0))  # > 0: serve the metrics on http://127.0.0.1:PORT/metrics
+    # LADDER_EVENTS: jsonl:PATH, socket:HOST:PORT and/or sqlite:PATH sinks for the live feed of ladder changes
+
+    # Validate environment variables (Chrome is only needed by the selenium backends)
+    if not POE_LADDER_PAGE or (
+        LADDER_BACKEND != "http"
+        and not LADDER_CRAWL_PAGES
+        and not all([CHROMEDRIVER_PATH, CHROME_PROFILE_PATH, CHROME_EXECUTABLE_PATH])
+    ):
+        raise ValueError("One or more environment variables are missing. Please check your .env file.")
+    if LADDER_STORAGE not in STORAGES:
+        raise ValueError(f"Unknown LADDER_STORAGE {LADDER_STORAGE!r}, expected one of {', '.join(STORAGES)}.")
+
+def start_logging():
+    """Sets up logging: records are written to the file by a background thread."""
+    # Rotated so a run of several weeks can't fill the disk
+    log_handler = RotatingFileHandler('ladder_scraper.log', maxBytes=5*1024*1024, backupCount=5, encoding='utf-8')
+    log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    return start_queue_logging([log_handler], level=LOG_LEVEL)
+
+def setup_driver():
+    """
+    Initializes the headless Chrome WebDriver with the shared scrape profile.
+    Only called when a selenium backend needs it.
+    """
+    from selenium.common.exceptions import WebDriverException
+
+    try:
+        driver = browser.setup_driver(headless=True, profile_path=CHROME_PROFILE_PATH)
+        print("Initialized Chrome WebDriver successfully.")
+        logging.info("Initialized Chrome WebDriver successfully.")
+        return driver
+    except WebDriverException as e:
+        print(f"Error initializing Chrome WebDriver: {e}")
+        logging.error("Error initializing Chrome WebDriver: %s", e)
+        raise e
+
+def make_ladder_fetcher(change_detector):
+    """The fetcher configured by LADDER_CRAWL_PAGES and LADDER_BACKEND."""
+    if LADDER_CRAWL_PAGES:
+        # Full ladder: every page fetched in parallel over HTTP
+        return LadderCrawler(
+            POE_LADDER_PAGE,
+            pages=LADDER_CRAWL_PAGES,
+            concurrency=LADDER_CRAWL_CONCURRENCY,
+            change_detector=change_detector
+        )
+    return make_fetcher(
+        LADDER_BACKEND,
+        POE_LADDER_PAGE,
+        driver_factory=setup_driver,
+        wait_timeout=LADDER_WAIT_TIMEOUT,
+        change_detector=change_detector,
+        driver_max_uses=DRIVER_MAX_USES,
+        driver_max_rss_mb=DRIVER_MAX_RSS_MB
+    )
+
+def scrape_ladder(fetcher):
     """
     Scrapes the ladder data from the POE ladder page.
-    Returns a list of character dictionaries.
+    Returns a list of character dictionaries, or None if the ladder
+    has not changed since the last scrape.
     """
     characters = []
     try:
-        driver.get(POE_LADDER_PAGE)
-        print(f"Accessed POE ladder page: {POE_LADDER_PAGE}")
-        logging.info(f"Accessed POE ladder page: {POE_LADDER_PAGE}")
-        
-        # Wait for the table to load
-        time.sleep(5)  # Adjust as necessary for page load time
-
-        # Locate the table body
-        tbody = driver.find_element(By.CSS_SELECTOR, "table.league-ladder__entries tbody")
-        rows = tbody.find_elements(By.CSS_SELECTOR, "tr.league-ladder__entry")
+        # Grab the whole table in one go and parse it locally
+        rows = fetcher.fetch_rows()
+        transfer = getattr(fetcher, "last_transfer", None)
+        transferred = f", {transfer['bytes'] / 1024:.0f} KB in {transfer['requests']} requests" if transfer else ""
+        print(f"Accessed POE ladder page: {POE_LADDER_PAGE} (ready in {fetcher.last_load_seconds:.2f}s{transferred})")
+        logging.info("Accessed POE ladder page: %s (ready in %.2fs%s)", POE_LADDER_PAGE, fetcher.last_load_seconds, transferred)
+        for url, seconds, count in getattr(fetcher, "last_page_latencies", []):
+            logging.debug("Crawled %s: %d rows in %.2fs", url, count, seconds)
+        if rows is None:
+            return None
         print(f"Found {len(rows)} rows in the ladder.")
-        logging.info(f"Found {len(rows)} rows in the ladder.")
-
-        for row in rows:
-            try:
-                # Extract cells
-                cells = row.find_elements(By.TAG_NAME, "td")
-                if len(cells) < 6:
-                    print("Row does not have enough cells. Skipping.")
-                    logging.warning("Row does not have enough cells. Skipping.")
-                    continue
-
-                rank = cells[0].text.strip()
-                account_element = cells[1].find_element(By.TAG_NAME, "a")
-                account_name = account_element.text.strip()
-                character_name = cells[2].text.strip().strip('"').strip()
-                character_class = cells[3].text.strip()
-                level = cells[4].text.strip()
-                experience = cells[5].text.strip()
-
-                # Check if character is dead
-                try:
-                    dead_element = cells[2].find_element(By.CLASS_NAME, "league-ladder__entry-state")
-                    status = dead_element.text.strip().strip("()")
-                    is_dead = True if "Dead" in status else False
-                except NoSuchElementException:
-                    is_dead = False
-
-                character = {
-                    "rank": rank,
-                    "account_name": account_name,
-                    "character_name": character_name,
-                    "class": character_class,
-                    "level": level,
-                    "experience": experience,
-                    "is_dead": is_dead
-                }
+        logging.info("Found %d rows in the ladder.", len(rows))
 
+        with REGISTRY.span("parse"):
+            for row in rows:
+                character = LadderEntry.from_row(row).to_ladder_dict()
                 characters.append(character)
-                print(f"Scraped character: {character}")
-                logging.info(f"Scraped character: {character}")
+                logging.debug("Scraped character: %s", character)
 
-            except Exception as e:
-                print(f"Error parsing row: {e}")
-                logging.error(f"Error parsing row: {e}")
-                continue
-
-    except TimeoutException as e:
-        print(f"Timeout while loading the page: {e}")
-        logging.error(f"Timeout while loading the page: {e}")
-    except NoSuchElementException as e:
-        print(f"Error finding elements on the page: {e}")
-        logging.error(f"Error finding elements on the page: {e}")
+    except FetchError as e:
+        # Timeouts waiting for the table end up here too
+        print(f"Error while loading the page: {e}")
+        logging.error("Error while loading the page: %s", e)
     except Exception as e:
         print(f"An unexpected error occurred: {e}")
-        logging.error(f"An unexpected error occurred: {e}")
+        logging.error("An unexpected error occurred: %s", e)
 
     return characters
 
-def save_to_json(data):
+def save_to_json(data, delta_store=None, database=None):
     """
-    Saves the scraped data to a JSON file with a timestamp.
+    Saves the scraped data to a JSON file with a timestamp,
+    as a keyframe/delta when LADDER_STORAGE is "delta" (delta_store)
+    or into the SQLite database when it is "sqlite" (database).
+    Returns True if the data was saved.
     """
+    if database is not None:
+        try:
+            database.write_cycle(data)
+            print(f"Saved data to {LADDER_DATABASE}")
+            logging.info("Saved data to %s", LADDER_DATABASE)
+        except Exception as e:
+            print(f"Error saving data to the database: {e}")
+            logging.error("Error saving data to the database: %s", e)
+            return False
+        return True
+
+    if delta_store is not None:
+        try:
+            kind = delta_store.save(data)
+            print(f"Saved data as a {kind} in {DATA_DIR}")
+            logging.info("Saved data as a %s in %s", kind, DATA_DIR)
+        except Exception as e:
+            print(f"Error saving ladder delta: {e}")
+            logging.error("Error saving ladder delta: %s", e)
+            return False
+        return True
+
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"ladder_data_{timestamp}.json"
     filepath = os.path.join(DATA_DIR, filename)
@@ -145,42 +184,118 @@ def save_to_json(data):
         with open(filepath, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4)
         print(f"Saved data to {filepath}")
-        logging.info(f"Saved data to {filepath}")
+        logging.info("Saved data to %s", filepath)
     except Exception as e:
         print(f"Error saving data to JSON: {e}")
-        logging.error(f"Error saving data to JSON: {e}")
+        logging.error("Error saving data to JSON: %s", e)
+        return False
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Save a snapshot of the POE ladder every POLL_INTERVAL seconds.")
+    parser.add_argument("--once", action="store_true", help="scrape once and exit, e.g. when run from cron")
+    args = parser.parse_args(argv)
 
-def main():
-    print("Starting ladder scraper. Press Ctrl+C to stop.")
-    logging.info("Ladder scraper started.")
+    load_config()
+    log_listener = start_logging()
+
+    # Create ladder_data directory if it doesn't exist
+    if not os.path.exists(DATA_DIR):
+        os.makedirs(DATA_DIR)
+        print(f"Created directory: {DATA_DIR}")
+        logging.info("Created directory: %s", DATA_DIR)
+
+    # Keyframes + deltas instead of a full file per scrape
+    delta_store = LadderDeltaStore(DATA_DIR, KEYFRAME_EVERY) if LADDER_STORAGE == "delta" else None
+    # Or every scrape in one indexed SQLite database (see poe_ladder/database.py)
+    database = LadderDatabase(LADDER_DATABASE) if LADDER_STORAGE == "sqlite" else None
+    # Fingerprints each fetched ladder, unchanged ones are not parsed or saved again
+    change_detector = ChangeDetector() if SKIP_UNCHANGED else None
+    fetcher = make_ladder_fetcher(change_detector)
+
+    if not args.once:
+        print("Starting ladder scraper. Press Ctrl+C to stop.")
+    logging.info("Ladder scraper started with the %s backend.", LADDER_BACKEND)
+    # Scrapes faster while the ladder churns, slower while it is quiet or failing
+    scheduler = PollScheduler(POLL_INTERVAL, POLL_MIN_INTERVAL, POLL_MAX_INTERVAL)
+    previous_snapshot = None
+    # Entries, exits, level-ups, deaths and rank changes, sent to the LADDER_EVENTS sinks
+    events = EventPipeline.from_env()
+    if METRICS_PORT:
+        REGISTRY.serve(METRICS_PORT)
+    # Memory samples and trends for long runs (MEMORY_SAMPLE_EVERY, see poe_ladder/memory.py)
+    memory = MemoryMonitor.from_env()
+    result = None
     try:
         while True:
+            scheduler.start_cycle()
+            REGISTRY.start_cycle()
             print(f"\nScraping ladder data at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
             logging.info("Starting new scrape cycle.")
 
-            characters = scrape_ladder()
-            if characters:
-                save_to_json(characters)
-                print(f"Total characters scraped: {len(characters)}")
-                logging.info(f"Total characters scraped: {len(characters)}")
-            else:
-                print("No characters found during this scrape.")
-                logging.warning("No characters found during this scrape.")
+            try:
+                characters = scrape_ladder(fetcher)
+                if characters is None:
+                    scheduler.record_unchanged()
+                    result = "unchanged"
+                    print(f"Ladder unchanged, nothing to save ({change_detector.skipped_cycles} cycles skipped so far).")
+                    logging.info("Ladder unchanged, nothing to save (%d cycles skipped so far).", change_detector.skipped_cycles)
+                elif characters:
+                    with REGISTRY.span("diff"):
+                        snapshot = [tuple(character.values()) for character in characters]
+                        scheduler.record_change(ladder_churn(previous_snapshot, snapshot))
+                        previous_snapshot = snapshot
+                        published = events.publish(characters)
+                    if published:
+                        logging.info("Published %d ladder events.", published)
+                    with REGISTRY.span("persist"):
+                        saved = save_to_json(characters, delta_store, database)
+                    if saved:
+                        result = "changed"
+                    else:
+                        scheduler.record_error()
+                        result = "error"
+                    print(f"Total characters scraped: {len(characters)}")
+                    logging.info("Total characters scraped: %d", len(characters))
+                else:
+                    scheduler.record_error()
+                    result = "error"
+                    print("No characters found during this scrape.")
+                    logging.warning("No characters found during this scrape.")
+            except Exception as e:
+                # One bad cycle must not stop the collection
+                scheduler.record_error()
+                result = "error"
+                print(f"An unexpected error occurred in this cycle: {e}")
+                logging.exception("An unexpected error occurred in this cycle: %s", e)
+            if result == "error" and change_detector is not None:
+                # The ladder was fetched but not saved: fetch it in full again next cycle
+                change_detector.reset()
 
-            print("Waiting for 60 seconds before the next scrape.")
-            logging.info("Waiting for 60 seconds before the next scrape.")
-            time.sleep(60)  # Fixed 60 seconds wait after saving data
+            REGISTRY.count_cycle(result)
+            logging.info("Cycle timings: %s", REGISTRY.cycle_summary())
+            memory.cycle(driver_pool_of(fetcher))
+            if METRICS_FILE:
+                REGISTRY.write(METRICS_FILE)
+            if args.once:
+                break
+            print(f"Waiting for {scheduler.remaining():.0f} seconds before the next scrape.")
+            logging.info("Waiting for %.0f seconds before the next scrape.", scheduler.remaining())
+            scheduler.sleep()
 
     except KeyboardInterrupt:
         print("\nScript terminated by user.")
         logging.info("Ladder scraper terminated by user.")
-    except Exception as e:
-        print(f"An unexpected error occurred in the main loop: {e}")
-        logging.error(f"An unexpected error occurred in the main loop: {e}")
     finally:
-        driver.quit()
-        print("Closed Chrome WebDriver.")
-        logging.info("Closed Chrome WebDriver.")
+        fetcher.close()
+        events.close()
+        if database is not None:
+            database.close()
+        print("Closed the ladder fetcher.")
+        logging.info("Closed the ladder fetcher.")
+        log_listener.stop()
+    # --once: a failed scrape exits with status 1, e.g. for cron to report it
+    return 1 if args.once and result == "error" else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
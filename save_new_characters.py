@@ -1,204 +1,328 @@
 import os
-import json
-import time
+import sys
 import logging
-from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-# Configuration from environment variables
-CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH')
-CHROME_PROFILE_PATH = os.getenv('CHROME_PROFILE_PATH')
-CHROME_EXECUTABLE_PATH = os.getenv('CHROME_EXECUTABLE_PATH')
-POE_LADDER_PAGE = os.getenv('POE_LADDER_PAGE')
-ACCOUNT = os.getenv('ACCOUNT')
-
-# Constants
-CHECK_INTERVAL = 60  # in seconds
+import argparse
+from logging.handlers import RotatingFileHandler
+from poe_ladder import browser
+from poe_ladder.archive import NewCharacterArchive
+from poe_ladder.models import LadderEntry
+from poe_ladder.change import ChangeDetector
+from poe_ladder.crawl import LadderCrawler
+from poe_ladder.database import LadderDatabase
+from poe_ladder.events import EventPipeline
+from poe_ladder.fetch import make_fetcher
+from poe_ladder.instrument import REGISTRY, start_queue_logging
+from poe_ladder.journal import CharacterJournal
+from poe_ladder.memory import MemoryMonitor, driver_pool_of
+from poe_ladder.registry import CharacterRegistry, ColdCharacterStore, character_key
+from poe_ladder.schedule import PollScheduler, ladder_churn
+from poe_ladder.watchlist import Watchlist
+
 CHARACTERS_FILE = 'characters.json'
 NEW_CHARACTERS_DIR = 'new_characters'
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    handlers=[
-        logging.FileHandler("poe_ladder_monitor.log"),
+def load_config():
+    """
+    Loads the .env file and reads the configuration into the module globals.
+    Called by main(), so importing this script has no side effects.
+    """
+    global CHROMEDRIVER_PATH, CHROME_PROFILE_PATH, CHROME_EXECUTABLE_PATH, POE_LADDER_PAGE, ACCOUNT, WATCHLIST_FILE
+    global LADDER_BACKEND, LADDER_WAIT_TIMEOUT, LADDER_CRAWL_PAGES, LADDER_CRAWL_CONCURRENCY, SKIP_UNCHANGED
+    global CHECK_INTERVAL, MIN_CHECK_INTERVAL, MAX_CHECK_INTERVAL, DRIVER_MAX_USES, DRIVER_MAX_RSS_MB
+    global LOG_LEVEL, METRICS_FILE, METRICS_PORT, COMPACT_EVERY, LADDER_DATABASE, MAX_CHARACTERS_IN_MEMORY
+    from dotenv import load_dotenv
+
+    # Load environment variables from .env file
+    load_dotenv()
+
+    # Configuration from environment variables
+    CHROMEDRIVER_PATH = os.getenv('CHROMEDRIVER_PATH')
+    CHROME_PROFILE_PATH = os.getenv('CHROME_PROFILE_PATH')
+    CHROME_EXECUTABLE_PATH = os.getenv('CHROME_EXECUTABLE_PATH')
+    POE_LADDER_PAGE = os.getenv('POE_LADDER_PAGE')
+    ACCOUNT = os.getenv('ACCOUNT')  # account to watch, or several separated by commas
+    WATCHLIST_FILE = os.getenv('WATCHLIST_FILE')  # and/or a file with one account per line, re-read when it changes
+    LADDER_BACKEND = os.getenv('LADDER_BACKEND', 'auto')  # http, selenium or auto
+    LADDER_WAIT_TIMEOUT = float(os.getenv('LADDER_WAIT_TIMEOUT', 20))  # max seconds to wait for the table
+    LADDER_CRAWL_PAGES = int(os.getenv('LADDER_CRAWL_PAGES', 0))  # > 0: crawl the full ladder (HTML pages to fetch)
+    LADDER_CRAWL_CONCURRENCY = int(os.getenv('LADDER_CRAWL_CONCURRENCY', 4))  # pages fetched at once
+    SKIP_UNCHANGED = os.getenv('LADDER_SKIP_UNCHANGED', '1') != '0'  # don't re-check an unchanged ladder
+
+    # Constants
+    CHECK_INTERVAL = float(os.getenv('POLL_INTERVAL', 60))  # in seconds, from the start of a check
+    MIN_CHECK_INTERVAL = float(os.getenv('POLL_MIN_INTERVAL', 15))  # fastest polling while the ladder churns
+    MAX_CHECK_INTERVAL = float(os.getenv('POLL_MAX_INTERVAL', 300))  # slowest polling while quiet or failing
+    DRIVER_MAX_USES = int(os.getenv('DRIVER_MAX_USES', 500)) or None  # restart Chrome after this many checks (0: never)
+    DRIVER_MAX_RSS_MB = int(os.getenv('DRIVER_MAX_RSS_MB', 0)) or None  # restart Chrome above this memory use (needs psutil)
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()  # DEBUG also logs every known character seen
+    METRICS_FILE = os.getenv('METRICS_FILE')  # Prometheus text file rewritten after every check
+    METRICS_PORT = int(os.getenv('METRICS_PORT', 0))  # > 0: serve the metrics on http://127.0.0.1:PORT/metrics
+    COMPACT_EVERY = int(os.getenv('CHARACTERS_COMPACT_EVERY', 1000))  # journal records between snapshots
+    MAX_CHARACTERS_IN_MEMORY = int(os.getenv('CHARACTERS_MAX_IN_MEMORY', 0))  # > 0: evict the least recently seen beyond this
+    # MEMORY_SAMPLE_EVERY, MEMORY_LOG, ...: memory samples and trends for long runs, see poe_ladder/memory.py
+    LADDER_DATABASE = os.getenv('LADDER_DATABASE')  # SQLite file to also store sightings and new characters in
+    # LADDER_EVENTS: jsonl:PATH, socket:HOST:PORT and/or sqlite:PATH sinks for the account's level-ups, deaths, ...
+
+    if not ACCOUNT and not WATCHLIST_FILE:
+        raise EnvironmentError("Set ACCOUNT and/or WATCHLIST_FILE to the accounts to watch.")
+
+def start_logging():
+    """Setup logging: the file and console are written by a background thread."""
+    log_formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+    # Rotated so a run of several weeks can't fill the disk
+    log_handlers = [
+        RotatingFileHandler("poe_ladder_monitor.log", maxBytes=5*1024*1024, backupCount=5, encoding='utf-8'),
         logging.StreamHandler()
     ]
-)
+    for log_handler in log_handlers:
+        log_handler.setFormatter(log_formatter)
+    return start_queue_logging(log_handlers, level=LOG_LEVEL)
 
 def setup_driver(headless=True):
-    """Setup Selenium WebDriver with custom paths and headless mode."""
-    chrome_options = Options()
-    chrome_options.add_argument(f"--user-data-dir={CHROME_PROFILE_PATH}")
-    chrome_options.binary_location = CHROME_EXECUTABLE_PATH
-    
-    if headless:
-        chrome_options.add_argument("--headless")  # Enable headless mode
-        chrome_options.add_argument("--disable-gpu")  # Disable GPU acceleration (optional but recommended)
-        chrome_options.add_argument("--window-size=1920,1080")  # Set window size to ensure all elements are loaded properly
-        chrome_options.add_argument("--no-sandbox")  # Bypass OS security model, required for some environments
-        chrome_options.add_argument("--disable-dev-shm-usage")  # Overcome limited resource problems
-
-    # Optional: Disable logging (suppressing unnecessary logs)
-    chrome_options.add_argument("--log-level=3")  # Suppress logs except for errors
-
-    # Create a Service object
-    service = Service(CHROMEDRIVER_PATH)
-
-    # Initialize the WebDriver with the Service object
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    return driver
-
-def load_existing_characters():
-    """Load existing characters from characters.json."""
-    if not os.path.exists(CHARACTERS_FILE):
-        logging.info(f"{CHARACTERS_FILE} not found. Creating a new one.")
-        with open(CHARACTERS_FILE, 'w') as f:
-            json.dump([], f)
-        return []
-    with open(CHARACTERS_FILE, 'r') as f:
+    """Setup Selenium WebDriver with the shared scrape profile (see poe_ladder/browser.py)."""
+    return browser.setup_driver(headless=headless, profile_path=CHROME_PROFILE_PATH)
+
+def load_existing_characters(characters_journal):
+    """Load the registry of existing characters from characters.json and its journal."""
+    if not os.path.exists(CHARACTERS_FILE) and not os.path.exists(characters_journal.journal_path):
+        logging.info("%s not found. Creating a new one.", CHARACTERS_FILE)
+        registry = CharacterRegistry()
+        registry.save(CHARACTERS_FILE)
+        return registry
+    registry = characters_journal.load()
+    logging.info("Loaded %d existing characters.", len(registry))
+    return registry
+
+def save_characters(characters_journal, registry):
+    """Append new and changed characters to the characters.json journal."""
+    written = characters_journal.persist(registry)
+    if written:
+        logging.info("Saved %d new or changed characters to %s.", written, characters_journal.journal_path)
+
+def save_new_character(archive, character_data):
+    """Save new character data in its folder, unless it is archived already."""
+    folder_path = archive.save(character_data)
+    if folder_path is None:
+        logging.info("Character already archived: %s", character_data['character_name'])
+    else:
+        logging.info("New character saved: %s", os.path.basename(folder_path))
+
+def find_new_characters(rows, watchlist, registry, archive):
+    """
+    Returns the new characters (dicts) of the watched accounts in ``rows``,
+    and the LadderEntry of all their rows. Known characters are recorded as
+    seen; new ones only once archive_new_characters() archived them.
+    """
+    new_characters = []
+    account_entries = []
+    # Only the rows of watched accounts are turned into records, found in one pass
+    for account, account_rows in watchlist.group(rows).items():
+        logging.debug("%d characters of %s on the ladder", len(account_rows), account)
+        for row in account_rows:
+            entry = LadderEntry.from_row(row)
+            account_entries.append(entry)
+            character = entry.to_new_character_dict()
+
+            if character_key(character) in registry:
+                logging.debug("Character already exists: %s", character['character_name'])
+            elif character in archive:
+                # Saved before, e.g. by a run whose characters.json was lost
+                logging.debug("Character already archived: %s", character['character_name'])
+            else:
+                # Recorded once archived, so a failed save is retried next check
+                new_characters.append(character)
+                continue
+            registry.observe(character)
+    return new_characters, account_entries
+
+def archive_new_characters(archive, registry, new_characters):
+    """Archives and records the new characters. Returns the ones saved, failed ones are left out."""
+    saved_characters = []
+    for character in new_characters:
+        # New character found
+        logging.info("New character found: %s", character['character_name'])
         try:
-            data = json.load(f)
-            logging.info(f"Loaded {len(data)} existing characters.")
-            return data
-        except json.JSONDecodeError:
-            logging.error(f"Error decoding {CHARACTERS_FILE}. Starting with an empty list.")
-            return []
-
-def save_characters(characters):
-    """Save characters to characters.json."""
-    with open(CHARACTERS_FILE, 'w') as f:
-        json.dump(characters, f, indent=4)
-    logging.info(f"Saved {len(characters)} characters to {CHARACTERS_FILE}.")
-
-def save_new_character(character_data):
-    """Save new character data in a structured folder."""
-    timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
-    # Sanitize folder name components to avoid filesystem issues
-    account_name_safe = character_data['account_name'].replace("#", "_")
-    character_name_safe = "".join([c if c.isalnum() or c in (" ", "_") else "_" for c in character_data['character_name']])
-    folder_name = f"new_character_{character_data['rank']}_{account_name_safe}_{character_name_safe}_{character_data['class']}_{character_data['level']}_{character_data['status']}_{timestamp}"
-    folder_path = os.path.join(NEW_CHARACTERS_DIR, folder_name)
-    os.makedirs(folder_path, exist_ok=True)
-    file_path = os.path.join(folder_path, 'character.json')
-    with open(file_path, 'w') as f:
-        json.dump(character_data, f, indent=4)
-    logging.info(f"New character saved: {folder_name}")
-
-def parse_character_row(row):
-    """Parse a table row and extract character data."""
-    try:
-        cells = row.find_elements(By.TAG_NAME, 'td')
-        if len(cells) < 6:
-            logging.warning("Unexpected number of cells in row. Skipping.")
-            return None
-
-        rank = cells[0].text.strip()
-        account_element = cells[1].find_element(By.TAG_NAME, 'a')
-        account_name = account_element.text.strip()
-
-        character_cell = cells[2]
-        # Extract character name and status
-        character_name = character_cell.text.strip()
-        status = 'alive'
-        if '(Dead)' in character_name:
-            status = 'dead'
-            character_name = character_name.replace('(Dead)', '').strip('" ').strip()
-        else:
-            character_name = character_name.strip('" ').strip()
-
-        char_class = cells[3].text.strip()
-        level = cells[4].text.strip()
-        experience = cells[5].text.strip()
-
-        character_data = {
-            'rank': rank,
-            'account_name': account_name,
-            'character_name': character_name,
-            'class': char_class,
-            'level': level,
-            'experience': experience,
-            'status': status
-        }
-        return character_data
-    except Exception as e:
-        logging.error(f"Error parsing row: {e}")
-        return None
-
-def main():
-    # Ensure new_characters directory exists
-    os.makedirs(NEW_CHARACTERS_DIR, exist_ok=True)
+            save_new_character(archive, character)
+        except OSError as e:
+            logging.error("Could not archive %s, retrying next check: %s",
+                          character['character_name'], e)
+            continue
+        registry.observe(character)
+        saved_characters.append(character)
+    return saved_characters
+
+def report_cycle(result):
+    """Count the finished check, log its timings and export the metrics."""
+    REGISTRY.count_cycle(result)
+    logging.info("Check timings: %s", REGISTRY.cycle_summary())
+    if METRICS_FILE:
+        REGISTRY.write(METRICS_FILE)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Save the new characters of the watched accounts on the POE ladder.")
+    parser.add_argument("--once", action="store_true", help="check once and exit, e.g. when run from cron")
+    args = parser.parse_args(argv)
+
+    load_config()
+    log_listener = start_logging()
+
+    # Folders of the new characters, indexed by character in one directory scan
+    archive = NewCharacterArchive(NEW_CHARACTERS_DIR)
+
+    # characters.json is the snapshot, changes in between go to characters.json.journal
+    characters_journal = CharacterJournal(CHARACTERS_FILE, compact_every=COMPACT_EVERY)
 
     # Load existing characters
-    existing_characters = load_existing_characters()
+    existing_characters = load_existing_characters(characters_journal)
+    cold_store = None
+    if MAX_CHARACTERS_IN_MEMORY:
+        # Characters not seen for a while wait on disk until they show up again
+        cold_store = ColdCharacterStore(CHARACTERS_FILE + ".cold")
+        existing_characters.set_cold_store(cold_store)
+        evicted = existing_characters.evict(MAX_CHARACTERS_IN_MEMORY)
+        logging.info("Keeping at most %d characters in memory (%d moved to %s).", MAX_CHARACTERS_IN_MEMORY, evicted, cold_store.path)
 
-    # Initialize WebDriver in headless mode
-    driver = setup_driver(headless=True)  # Set to False if you want to see the browser
+    # Accounts to watch, the file is re-read whenever it changes
+    watchlist = Watchlist.from_env()
+    logging.info("Watching %d accounts: %s", len(watchlist), ', '.join(watchlist.accounts))
 
-    driver.get(POE_LADDER_PAGE)
-    logging.info(f"Navigated to {POE_LADDER_PAGE}")
+    # Unchanged ladders are neither parsed nor checked again
+    change_detector = ChangeDetector() if SKIP_UNCHANGED else None
 
+    if LADDER_CRAWL_PAGES:
+        # Full ladder: every page fetched in parallel over HTTP
+        fetcher = LadderCrawler(
+            POE_LADDER_PAGE,
+            pages=LADDER_CRAWL_PAGES,
+            concurrency=LADDER_CRAWL_CONCURRENCY,
+            change_detector=change_detector
+        )
+        logging.info("Crawling the full ladder from %s", POE_LADDER_PAGE)
+    else:
+        # The WebDriver is only started (headless) if a selenium backend needs it
+        fetcher = make_fetcher(
+            LADDER_BACKEND,
+            POE_LADDER_PAGE,
+            driver_factory=lambda: setup_driver(headless=True),  # Set to False if you want to see the browser
+            wait_timeout=LADDER_WAIT_TIMEOUT,  # Wait until the table rows are loaded and stable
+            change_detector=change_detector,
+            driver_max_uses=DRIVER_MAX_USES,  # Restart Chrome now and then so leaks can't pile up
+            driver_max_rss_mb=DRIVER_MAX_RSS_MB
+        )
+        logging.info("Using the %s backend for %s", LADDER_BACKEND, POE_LADDER_PAGE)
+
+    # Checks faster while the ladder churns, slower while it is quiet or failing
+    scheduler = PollScheduler(CHECK_INTERVAL, MIN_CHECK_INTERVAL, MAX_CHECK_INTERVAL)
+    previous_rows = None
+    # Changes of the account's characters, sent to the LADDER_EVENTS sinks
+    events = EventPipeline.from_env()
+    # Sightings and new characters are also stored in SQLite, if configured
+    database = LadderDatabase(LADDER_DATABASE) if LADDER_DATABASE else None
+    if METRICS_PORT:
+        REGISTRY.serve(METRICS_PORT)
+    # Memory samples and trends, for long runs
+    memory = MemoryMonitor.from_env()
+
+    def end_cycle(result):
+        memory.cycle(driver_pool_of(fetcher), characters_in_memory=existing_characters.resident,
+                     archived_characters=len(archive))
+        report_cycle(result)
+
+    result = None
     try:
         while True:
+            scheduler.start_cycle()
+            REGISTRY.start_cycle()
+            if watchlist.reload_if_changed() and change_detector is not None:
+                # The new accounts must be checked even if the ladder did not change
+                change_detector.reset()
             logging.info("Refreshing the ladder page...")
-            driver.refresh()
-            time.sleep(5)  # Wait for the page to load
 
-            # Locate the leaderboard table
+            # Fetch and extract the leaderboard table
             try:
-                table = driver.find_element(By.CSS_SELECTOR, 'table.league-ladder__entries')
-                tbody = table.find_element(By.TAG_NAME, 'tbody')
-                rows = tbody.find_elements(By.CSS_SELECTOR, 'tr.league-ladder__entry')
-                logging.info(f"Found {len(rows)} rows in the leaderboard.")
+                rows = fetcher.fetch_rows()
+                transfer = getattr(fetcher, "last_transfer", None)
+                if transfer:
+                    logging.info("Leaderboard ready in %.2f seconds (%.0f KB in %d requests).",
+                                 fetcher.last_load_seconds, transfer['bytes'] / 1024, transfer['requests'])
+                else:
+                    logging.info("Leaderboard ready in %.2f seconds.", fetcher.last_load_seconds)
+                for url, seconds, count in getattr(fetcher, "last_page_latencies", []):
+                    logging.debug("Crawled %s: %d rows in %.2fs", url, count, seconds)
             except Exception as e:
-                logging.error(f"Error locating leaderboard table: {e}")
-                time.sleep(CHECK_INTERVAL)
+                logging.error("Error locating leaderboard table: %s", e)
+                scheduler.record_error()
+                result = "error"
+                end_cycle(result)
+                if args.once:
+                    break
+                logging.info("Retrying in %.0f seconds.", scheduler.remaining())
+                scheduler.sleep()
                 continue
 
-            for row in rows:
-                character = parse_character_row(row)
-                if character is None:
-                    continue
-
-                # Check if the account matches
-                if character['account_name'] != ACCOUNT:
-                    continue
-
-                # Check if character is already recorded
-                is_existing = any(
-                    c['account_name'] == character['account_name'] and
-                    c['character_name'] == character['character_name']
-                    for c in existing_characters
-                )
-
-                if not is_existing:
-                    # New character found
-                    logging.info(f"New character found: {character['character_name']}")
-                    save_new_character(character)
-                    existing_characters.append(character)
-                else:
-                    logging.debug(f"Character already exists: {character['character_name']}")
+            if rows is None:
+                scheduler.record_unchanged()
+                logging.info("Leaderboard unchanged, skipping this check (%d skipped so far).", change_detector.skipped_cycles)
+                result = "unchanged"
+                end_cycle(result)
+                if args.once:
+                    break
+                scheduler.sleep()
+                continue
+            logging.info("Found %d rows in the leaderboard.", len(rows))
+
+            try:
+                with REGISTRY.span("diff"):
+                    scheduler.record_change(ladder_churn(previous_rows, rows))
+                    previous_rows = rows
+                    new_characters, account_entries = find_new_characters(rows, watchlist, existing_characters, archive)
+                    events.publish(account_entries)
 
-            # Save updated characters list
-            save_characters(existing_characters)
+                with REGISTRY.span("persist"):
+                    saved_characters = archive_new_characters(archive, existing_characters, new_characters)
+
+                    # Persist new and changed characters
+                    save_characters(characters_journal, existing_characters)
+                    if MAX_CHARACTERS_IN_MEMORY:
+                        evicted = existing_characters.evict(MAX_CHARACTERS_IN_MEMORY)
+                        if evicted:
+                            logging.debug("Moved %d inactive characters to %s", evicted, cold_store.path)
+                    if database is not None and account_entries:
+                        database.write_cycle(account_entries, source="account", new_characters=saved_characters)
+                if len(saved_characters) == len(new_characters):
+                    result = "changed"
+                else:
+                    scheduler.record_error()
+                    result = "error"
+            except Exception as e:
+                # One bad check must not stop the monitor
+                scheduler.record_error()
+                logging.exception("Unexpected error during this check: %s", e)
+                result = "error"
+            if result == "error" and change_detector is not None:
+                # Unarchived characters are retried on the next check, even if the ladder is unchanged
+                change_detector.reset()
+            end_cycle(result)
+            if args.once:
+                break
 
-            logging.info(f"Waiting for {CHECK_INTERVAL} seconds before next check.")
-            time.sleep(CHECK_INTERVAL)
+            logging.info("Waiting for %.0f seconds before next check.", scheduler.remaining())
+            scheduler.sleep()
     except KeyboardInterrupt:
         logging.info("Script interrupted by user.")
-    except Exception as e:
-        logging.error(f"Unexpected error: {e}")
     finally:
-        driver.quit()
-        logging.info("WebDriver closed.")
+        characters_journal.close(existing_characters)
+        logging.info("Saved %d characters to %s.", len(existing_characters), CHARACTERS_FILE)
+        if cold_store is not None:
+            cold_store.close()
+        fetcher.close()
+        events.close()
+        if database is not None:
+            database.close()
+        logging.info("Ladder fetcher closed.")
+        log_listener.stop()
+    # --once: a failed check exits with status 1, e.g. for cron to report it
+    return 1 if args.once and result == "error" else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
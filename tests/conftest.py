@@ -0,0 +1,14 @@
+import os
+
+import pytest
+
+from poe_ladder.standin import LadderStandInServer
+
+FIXTURES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures")
+
+
+@pytest.fixture
+def standin():
+    """The stand-in ladder server, serving benchmarks/fixtures."""
+    with LadderStandInServer(directory=FIXTURES) as server:
+        yield server
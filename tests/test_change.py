@@ -0,0 +1,23 @@
+from poe_ladder.change import ladder_table_html
+from poe_ladder.extract import TABLE_CLASS
+
+TABLE = '<table class="table %s"><tr><td>1</td></tr></table>' % TABLE_CLASS
+
+
+def test_finds_the_table_tag_with_the_class():
+    page = "<html><body><div>ladder</div>%s</body></html>" % TABLE
+    assert ladder_table_html(page) == TABLE
+
+
+def test_skips_the_class_name_in_css_and_scripts():
+    page = ("<html><head><style>.%s td { color: red; }</style>"
+            "<script>document.querySelector('.%s')</script></head>"
+            "<body><table class=\"other\"><tr><td>x</td></tr></table>%s</body></html>"
+            % (TABLE_CLASS, TABLE_CLASS, TABLE))
+    assert ladder_table_html(page) == TABLE
+
+
+def test_page_without_the_table_tag():
+    page = "<html><style>.%s {}</style><div class=\"%s\"></div></html>" % (TABLE_CLASS, TABLE_CLASS)
+    assert ladder_table_html(page) is None
+    assert ladder_table_html('<table class="%s-wide"></table>' % TABLE_CLASS) is None
@@ -0,0 +1,73 @@
+import json
+import os
+
+from poe_ladder.columnar import COMMIT_LOG, ColumnarLadderStore
+
+
+def ladder(experience=1000, count=5):
+    return [{"rank": str(rank), "account_name": f"Exile#{rank}", "character_name": f"Char_{rank}",
+             "class": "Witch", "level": "90", "experience": str(experience + rank), "is_dead": False}
+            for rank in range(1, count + 1)]
+
+
+def write_history(directory, snapshots=3):
+    os.makedirs(directory, exist_ok=True)
+    for index in range(snapshots):
+        path = os.path.join(directory, f"ladder_data_20250119_12000{index}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(ladder(1000 * (index + 1)), f)
+
+
+def column_rows(store_dir, partition="20250119"):
+    directory = os.path.join(store_dir, partition)
+    sizes = {"timestamp": 8, "rank": 4, "level": 2, "experience": 8, "dead": 1,
+             "account": 4, "character": 4, "class": 4}
+    return {name: os.path.getsize(os.path.join(directory, name)) // size for name, size in sizes.items()}
+
+
+def test_ingest_and_query(tmp_path):
+    write_history(tmp_path / "ladder_data")
+    store = ColumnarLadderStore(str(tmp_path / "store"))
+    assert store.ingest_directory(str(tmp_path / "ladder_data")) == 3
+    history = store.character_history("Char_2")
+    assert [row["experience"] for row in history] == [1002, 2002, 3002]
+    # Re-running only ingests new files
+    assert ColumnarLadderStore(str(tmp_path / "store")).ingest_directory(str(tmp_path / "ladder_data")) == 0
+
+
+def test_uncommitted_append_is_truncated_on_open(tmp_path):
+    write_history(tmp_path / "ladder_data")
+    store_dir = str(tmp_path / "store")
+    ColumnarLadderStore(store_dir).ingest_directory(str(tmp_path / "ladder_data"))
+
+    # A crash in the middle of an append: some columns written, no commit line
+    partition = os.path.join(store_dir, "20250119")
+    for name, size in (("timestamp", 8), ("rank", 4)):
+        with open(os.path.join(partition, name), "ab") as f:
+            f.write(b"\0" * size * 5)
+    with open(os.path.join(store_dir, COMMIT_LOG), "a", encoding="utf-8") as f:
+        f.write('{"partition": "2025')
+    os.makedirs(os.path.join(store_dir, "20250120"))
+    with open(os.path.join(store_dir, "20250120", "timestamp"), "wb") as f:
+        f.write(b"\0" * 8)
+
+    store = ColumnarLadderStore(store_dir)
+    assert set(column_rows(store_dir).values()) == {15}
+    assert os.path.getsize(os.path.join(store_dir, "20250120", "timestamp")) == 0
+    with open(os.path.join(store_dir, COMMIT_LOG), "rb") as f:
+        assert f.read().endswith(b"}\n")
+    assert len(store.character_history("Char_1")) == 3
+    assert store.ingest_directory(str(tmp_path / "ladder_data")) == 0
+
+
+def test_store_without_commit_log_is_cut_to_its_shortest_column(tmp_path):
+    write_history(tmp_path / "ladder_data")
+    store_dir = str(tmp_path / "store")
+    ColumnarLadderStore(store_dir).ingest_directory(str(tmp_path / "ladder_data"))
+    os.remove(os.path.join(store_dir, COMMIT_LOG))
+    with open(os.path.join(store_dir, "20250119", "rank"), "ab") as f:
+        f.write(b"\0" * 4)
+
+    store = ColumnarLadderStore(store_dir)
+    assert set(column_rows(store_dir).values()) == {15}
+    assert len(store.character_history("Char_1")) == 3
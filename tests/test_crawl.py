@@ -0,0 +1,81 @@
+import pytest
+
+from benchmarks.ladder_fixtures import make_ladder_rows, render_ladder_html
+from poe_ladder.change import ChangeDetector
+from poe_ladder.crawl import LadderCrawler
+from poe_ladder.fetch import FetchError
+from poe_ladder.models import clean_character_name
+from poe_ladder.standin import LadderStandInServer
+
+
+def serve_pages(standin, pages):
+    """Serves ``pages`` (lists of dict rows) as ladder.html, ladder.html?page=2, ..."""
+    for number, rows in enumerate(pages, start=1):
+        path = "ladder.html" if number == 1 else f"ladder.html?page={number}"
+        standin.set_page(path, render_ladder_html(rows))
+
+
+def test_crawl_merges_pages_in_rank_order(standin):
+    pages = [make_ladder_rows(20, seed=page, start_rank=1 + 20 * page) for page in range(3)]
+    serve_pages(standin, pages)
+    crawler = LadderCrawler(standin.url_for("ladder.html"), pages=3, concurrency=2)
+    try:
+        rows = crawler.fetch_rows()
+    finally:
+        crawler.close()
+    assert [int(row.rank) for row in rows] == list(range(1, 61))
+    assert len(crawler.last_page_latencies) == 3
+
+
+def test_character_moving_between_pages_is_kept_once_at_its_best_rank(standin):
+    first = make_ladder_rows(20, seed=1)
+    second = make_ladder_rows(20, seed=2, start_rank=21)
+    # The last character of page 1 dropped to page 2 while it was fetched
+    second[5] = dict(first[-1], rank=26)
+    serve_pages(standin, [first, second])
+    crawler = LadderCrawler(standin.url_for("ladder.html"), pages=2)
+    try:
+        rows = crawler.fetch_rows()
+    finally:
+        crawler.close()
+    keys = [(row.account, row.character) for row in rows]
+    assert len(rows) == 39
+    assert len(set(keys)) == 39
+    moved = [row for row in rows if clean_character_name(row.character) == first[-1]["character"]]
+    assert [row.rank for row in moved] == ["20"]
+
+
+class BrokenPageServer(LadderStandInServer):
+    """Answers 404 for the ladder pages in ``broken``, whatever their query string."""
+
+    broken = ()
+
+    def lookup(self, path):
+        if path in self.broken:
+            return None
+        return super().lookup(path)
+
+
+def test_failed_page_fails_the_whole_crawl():
+    with BrokenPageServer() as server:
+        server.broken = ("/ladder.html?page=2",)
+        serve_pages(server, [make_ladder_rows(20, seed=1), make_ladder_rows(20, seed=2, start_rank=21)])
+        crawler = LadderCrawler(server.url_for("ladder.html"), pages=2, retries=1)
+        try:
+            with pytest.raises(FetchError, match="1 of 2 crawl pages failed after 2 attempts"):
+                crawler.fetch_rows()
+        finally:
+            crawler.close()
+
+
+def test_unchanged_crawl_returns_none(standin):
+    serve_pages(standin, [make_ladder_rows(20, seed=page, start_rank=1 + 20 * page) for page in range(2)])
+    detector = ChangeDetector()
+    crawler = LadderCrawler(standin.url_for("ladder.html"), pages=2, change_detector=detector)
+    try:
+        assert len(crawler.fetch_rows()) == 40
+        assert crawler.fetch_rows() is None
+        serve_pages(standin, [make_ladder_rows(20, seed=5), make_ladder_rows(20, seed=6, start_rank=21)])
+        assert len(crawler.fetch_rows()) == 40
+    finally:
+        crawler.close()
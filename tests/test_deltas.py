@@ -0,0 +1,70 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from poe_ladder.deltas import LadderDeltaStore
+
+START = datetime(2025, 1, 19, 12, 0, 0)
+
+
+def ladders(count, rows=50):
+    """``count`` snapshots of a ladder where a few characters move every time."""
+    ladder = [{"rank": str(rank), "account_name": f"Exile#{rank}", "character_name": f"Char_{rank}",
+               "class": "Witch", "level": "90", "experience": str(10 ** 9 - rank), "is_dead": False}
+              for rank in range(1, rows + 1)]
+    snapshots = []
+    for index in range(count):
+        ladder = [dict(entry) for entry in ladder]
+        ladder[index % rows]["experience"] = str(int(ladder[index % rows]["experience"]) + 1)
+        if index % 4 == 3:
+            ladder[-1] = dict(ladder[-1], character_name=f"New_{index}")
+        snapshots.append(ladder)
+    return snapshots
+
+
+def test_load_at_rebuilds_every_snapshot(tmp_path):
+    store = LadderDeltaStore(str(tmp_path), keyframe_every=4)
+    snapshots = ladders(10)
+    kinds = [store.save(ladder, now=START + timedelta(minutes=index)) for index, ladder in enumerate(snapshots)]
+    assert "delta" in kinds
+
+    reader = LadderDeltaStore(str(tmp_path))
+    for index, ladder in enumerate(snapshots):
+        assert reader.load_at(START + timedelta(minutes=index)) == ladder
+        # Between two scrapes: the earlier one
+        assert reader.load_at(START + timedelta(minutes=index, seconds=30)) == ladder
+    assert reader.load_at(START - timedelta(seconds=1)) is None
+    assert [ladder for _, ladder in reader.snapshots()] == snapshots
+
+
+def test_torn_delta_line_is_skipped(tmp_path):
+    store = LadderDeltaStore(str(tmp_path), keyframe_every=10)
+    snapshots = ladders(3)
+    for index, ladder in enumerate(snapshots):
+        store.save(ladder, now=START + timedelta(minutes=index))
+    deltas = [name for name in os.listdir(tmp_path) if name.startswith("deltas_")]
+    with open(os.path.join(tmp_path, deltas[0]), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"timestamp": "20250119_120500"})[:10])
+
+    assert LadderDeltaStore(str(tmp_path)).load_at("20250119_130000") == snapshots[-1]
+
+
+def test_keyframe_every_n_snapshots(tmp_path):
+    store = LadderDeltaStore(str(tmp_path), keyframe_every=4)
+    kinds = [store.save(ladder, now=START + timedelta(minutes=index)) for index, ladder in enumerate(ladders(9))]
+    assert [index for index, kind in enumerate(kinds) if kind == "keyframe"] == [0, 4, 8]
+
+
+def test_snapshot_in_the_same_second_is_rejected(tmp_path):
+    snapshots = ladders(3)
+    store = LadderDeltaStore(str(tmp_path))
+    store.save(snapshots[0], now=START)
+    with pytest.raises(ValueError):
+        store.save(snapshots[1], now=START.replace(microsecond=500000))
+
+    # A restart within the same second must not overwrite the keyframe
+    with pytest.raises(ValueError):
+        LadderDeltaStore(str(tmp_path)).save(snapshots[2], now=START)
+    assert LadderDeltaStore(str(tmp_path)).load_at(START) == snapshots[0]
@@ -0,0 +1,51 @@
+import time
+
+from poe_ladder.drivers import DriverPool
+
+
+class FakeDriver:
+    """Answers the health check until ``dead`` is set; quitting takes a while."""
+
+    def __init__(self, events):
+        self.events = events
+        self.number = sum(1 for event in events if event[0] == "start") + 1
+        self.dead = False
+        events.append(("start", self.number))
+
+    def execute_script(self, script):
+        if self.dead:
+            raise RuntimeError("browser gone")
+        return 1
+
+    def quit(self):
+        time.sleep(0.05)
+        self.events.append(("quit", self.number))
+
+
+def test_dead_driver_is_quit_before_its_replacement_starts():
+    events = []
+    pool = DriverPool(lambda: FakeDriver(events), size=1)
+    try:
+        with pool.lease() as driver:
+            pass
+        driver.dead = True
+        with pool.lease() as replacement:
+            assert replacement is not driver
+        assert events == [("start", 1), ("quit", 1), ("start", 2)]
+        assert pool.restarts == 1
+    finally:
+        pool.close()
+
+
+def test_recycled_driver_is_quit_before_its_replacement_starts():
+    events = []
+    pool = DriverPool(lambda: FakeDriver(events), size=1, max_uses=1)
+    try:
+        with pool.lease():
+            pass
+        with pool.lease():
+            pass
+        assert events[:3] == [("start", 1), ("quit", 1), ("start", 2)]
+        assert pool.recycled == 2
+    finally:
+        pool.close()
@@ -0,0 +1,59 @@
+import pytest
+
+from benchmarks.ladder_fixtures import make_ladder_rows, render_ladder_html, render_ladder_json
+from poe_ladder.change import ChangeDetector
+from poe_ladder.fetch import FetchError, HttpLadderFetcher
+from poe_ladder.models import clean_character_name
+
+
+def test_fetches_the_fixture_page(standin):
+    fetcher = HttpLadderFetcher(standin.url_for("ladder_page.html"))
+    try:
+        rows = fetcher.fetch_rows()
+    finally:
+        fetcher.close()
+    assert len(rows) == 200
+    assert rows[0].rank == "1"
+    assert rows[0].account == "Exile78678#9916"
+
+
+def test_fetches_the_json_endpoint(standin):
+    ladder = make_ladder_rows(30, seed=1)
+    standin.set_page("ladder.json", render_ladder_json(ladder))
+    fetcher = HttpLadderFetcher(standin.url_for("ladder.json"))
+    try:
+        rows = fetcher.fetch_rows()
+    finally:
+        fetcher.close()
+    assert [clean_character_name(row.character) for row in rows] == [row["character"] for row in ladder]
+    assert fetcher.last_total == 30
+
+
+def test_unchanged_ladder_is_skipped_until_it_changes(standin):
+    standin.set_page("ladder.html", render_ladder_html(make_ladder_rows(50, seed=1)))
+    detector = ChangeDetector()
+    fetcher = HttpLadderFetcher(standin.url_for("ladder.html"), change_detector=detector)
+    try:
+        assert len(fetcher.fetch_rows()) == 50
+        # Same page: a conditional request answered with 304
+        assert fetcher.fetch_rows() is None
+        assert standin.not_modified_count == 1
+
+        standin.set_page("ladder.html", render_ladder_html(make_ladder_rows(60, seed=2)))
+        assert len(fetcher.fetch_rows()) == 60
+
+        # A cycle that failed after the fetch resets the detector: parsed again
+        detector.reset()
+        assert len(fetcher.fetch_rows()) == 60
+    finally:
+        fetcher.close()
+    assert detector.skipped_cycles == 1
+
+
+def test_missing_page_raises_fetch_error(standin):
+    fetcher = HttpLadderFetcher(standin.url_for("missing.html"))
+    try:
+        with pytest.raises(FetchError):
+            fetcher.fetch_rows()
+    finally:
+        fetcher.close()
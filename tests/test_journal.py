@@ -0,0 +1,75 @@
+from poe_ladder.journal import CharacterJournal
+from poe_ladder.registry import CharacterRegistry
+
+
+def character(name, level=90, account="Exile#1234"):
+    return {"rank": "1", "account_name": account, "character_name": name, "class": "Witch",
+            "level": str(level), "experience": "1,000", "status": "alive"}
+
+
+def test_journal_round_trip(tmp_path):
+    journal = CharacterJournal(str(tmp_path / "characters.json"))
+    registry = CharacterRegistry()
+    registry.observe(character("A"), seen_at="2025-01-19T12:00:00")
+    registry.observe(character("B"), seen_at="2025-01-19T12:00:00")
+    assert journal.persist(registry) == 2
+    registry.observe(character("A", level=91), seen_at="2025-01-19T12:10:00")
+    assert journal.persist(registry) == 1
+    journal.close()
+
+    loaded = CharacterJournal(str(tmp_path / "characters.json")).load()
+    assert len(loaded) == 2
+    assert loaded.get("Exile#1234", "A")["level"] == "91"
+    assert loaded.get("Exile#1234", "A")["first_seen"] == "2025-01-19T12:00:00"
+    # Nothing is reported as changed right after loading
+    assert loaded.pop_changes() == []
+
+
+def test_torn_last_line_is_dropped(tmp_path):
+    journal = CharacterJournal(str(tmp_path / "characters.json"))
+    registry = CharacterRegistry()
+    registry.observe(character("A"))
+    journal.persist(registry)
+    journal.close()
+    with open(journal.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"account_name": "Exile#1234", "character_na')
+
+    reopened = CharacterJournal(str(tmp_path / "characters.json"))
+    loaded = reopened.load()
+    assert [record["character_name"] for record in loaded] == ["A"]
+    assert reopened.journal_records == 1
+    with open(journal.journal_path, "rb") as f:
+        assert f.read().endswith(b"}\n")
+
+    # The next append starts on a fresh line
+    loaded.observe(character("B"))
+    reopened.persist(loaded)
+    reopened.close()
+    assert len(CharacterJournal(str(tmp_path / "characters.json")).load()) == 2
+
+
+def test_compaction_folds_the_journal_into_the_snapshot(tmp_path):
+    journal = CharacterJournal(str(tmp_path / "characters.json"), compact_every=3)
+    registry = CharacterRegistry()
+    for name in "ABC":
+        registry.observe(character(name))
+        journal.persist(registry)
+    assert not (tmp_path / "characters.json.journal").exists()
+    assert journal.journal_records == 0
+    assert len(CharacterRegistry.load(str(tmp_path / "characters.json"))) == 3
+
+
+def test_last_seen_is_journaled_once_an_hour(tmp_path):
+    journal = CharacterJournal(str(tmp_path / "characters.json"))
+    registry = CharacterRegistry()
+    registry.observe(character("A"), seen_at="2025-01-19T12:00:00")
+    journal.persist(registry)
+    registry.observe(character("A"), seen_at="2025-01-19T12:30:00")
+    assert journal.persist(registry) == 0
+    registry.observe(character("A"), seen_at="2025-01-19T13:05:00")
+    assert journal.persist(registry) == 1
+    journal.close()
+
+    # A crash before compaction: the replayed last_seen is the hourly one
+    loaded = CharacterJournal(str(tmp_path / "characters.json")).load()
+    assert loaded.get("Exile#1234", "A")["last_seen"] == "2025-01-19T13:05:00"
@@ -0,0 +1,22 @@
+import pytest
+
+import save_ladder_data
+
+
+@pytest.fixture
+def http_env(monkeypatch):
+    monkeypatch.setenv("POE_LADDER_PAGE", "http://127.0.0.1:1/ladder")
+    monkeypatch.setenv("LADDER_BACKEND", "http")
+
+
+@pytest.mark.parametrize("storage", save_ladder_data.STORAGES)
+def test_known_storages_are_accepted(http_env, monkeypatch, storage):
+    monkeypatch.setenv("LADDER_STORAGE", storage)
+    save_ladder_data.load_config()
+    assert save_ladder_data.LADDER_STORAGE == storage
+
+
+def test_unknown_storage_is_rejected(http_env, monkeypatch):
+    monkeypatch.setenv("LADDER_STORAGE", "sqllite")
+    with pytest.raises(ValueError, match="sqllite"):
+        save_ladder_data.load_config()
@@ -0,0 +1,47 @@
+import os
+
+import save_new_characters
+from poe_ladder.archive import NewCharacterArchive
+from poe_ladder.schedule import PollScheduler
+
+ACCOUNT = "Exile78678#9916"  # first row of benchmarks/fixtures/ladder_page.html
+
+
+def run_checks(monkeypatch, checks):
+    """Runs the monitor loop for ``checks`` checks, without waiting in between."""
+    done = []
+
+    class Scheduler(PollScheduler):
+        def sleep(self):
+            done.append(self.consecutive_errors)
+            if len(done) >= checks - 1:
+                raise KeyboardInterrupt
+
+    monkeypatch.setattr(save_new_characters, "PollScheduler", Scheduler)
+    assert save_new_characters.main([]) == 0
+    return done
+
+
+def test_failed_archive_write_is_retried_on_an_unchanged_ladder(standin, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("POE_LADDER_PAGE", standin.url_for("ladder_page.html"))
+    monkeypatch.setenv("LADDER_BACKEND", "http")
+    monkeypatch.setenv("ACCOUNT", ACCOUNT)
+    monkeypatch.delenv("WATCHLIST_FILE", raising=False)
+
+    save = NewCharacterArchive.save
+    failures = [OSError("disk full")]
+
+    def failing_save(archive, character):
+        if failures:
+            raise failures.pop()
+        return save(archive, character)
+
+    monkeypatch.setattr(NewCharacterArchive, "save", failing_save)
+    errors = run_checks(monkeypatch, 3)
+
+    # The failed check backed off, the next one (same ladder) archived the character
+    assert errors[0] == 1
+    assert errors[1] == 0
+    folders = os.listdir(tmp_path / "new_characters")
+    assert len(folders) == 1 and "Exile78678_9916" in folders[0]
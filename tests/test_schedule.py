@@ -0,0 +1,96 @@
+import pytest
+
+from poe_ladder.schedule import PollScheduler, ladder_churn
+
+
+class FakeClock:
+    """A clock that only moves when the scheduler sleeps or the test says so."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_scheduler(clock, interval=60, min_interval=15, max_interval=300):
+    return PollScheduler(interval, min_interval, max_interval, clock=clock, sleep=clock.sleep)
+
+
+def test_delay_is_counted_from_the_start_of_the_cycle(clock):
+    scheduler = make_scheduler(clock)
+    scheduler.start_cycle()
+    clock.now += 15  # a slow scrape
+    scheduler.record_change()
+    assert scheduler.sleep() == 45
+    assert clock.slept == [45]
+
+
+def test_overdue_cycle_does_not_sleep(clock):
+    scheduler = make_scheduler(clock)
+    scheduler.start_cycle()
+    clock.now += 90
+    scheduler.record_change()
+    assert scheduler.remaining() == 0
+    assert scheduler.sleep() == 0
+    assert clock.slept == []
+
+
+def test_unchanged_ladder_stretches_up_to_max_interval(clock):
+    scheduler = make_scheduler(clock)
+    delays = [scheduler.record_unchanged() for _ in range(10)]
+    assert delays == sorted(delays)
+    assert delays[0] > 60
+    assert delays[-1] == 300
+
+
+def test_high_churn_shrinks_down_to_min_interval(clock):
+    scheduler = make_scheduler(clock)
+    delays = [scheduler.record_change(churn=0.5) for _ in range(10)]
+    assert delays[0] == 30
+    assert delays[-1] == 15
+
+
+def test_ordinary_change_after_a_quiet_spell_resumes_the_interval(clock):
+    scheduler = make_scheduler(clock)
+    for _ in range(5):
+        scheduler.record_unchanged()
+    assert scheduler.record_change(churn=0.01) == 60
+
+
+def test_zero_churn_counts_as_unchanged(clock):
+    scheduler = make_scheduler(clock)
+    assert scheduler.record_change(churn=0) == scheduler.interval > 60
+
+
+def test_errors_back_off_exponentially_up_to_max_interval(clock):
+    scheduler = make_scheduler(clock)
+    assert [scheduler.record_error() for _ in range(5)] == [120, 240, 300, 300, 300]
+    assert scheduler.consecutive_errors == 5
+    assert scheduler.record_change() == 60
+    assert scheduler.consecutive_errors == 0
+
+
+def test_invalid_bounds_are_rejected():
+    with pytest.raises(ValueError):
+        PollScheduler(60, min_interval=90)
+    with pytest.raises(ValueError):
+        PollScheduler(60, max_interval=30)
+    with pytest.raises(ValueError):
+        PollScheduler(60, min_interval=0)
+
+
+def test_ladder_churn():
+    assert ladder_churn(None, [1, 2]) is None
+    assert ladder_churn([1, 2], []) == 0.0
+    assert ladder_churn([1, 2, 3, 4], [1, 2, 3, 5]) == 0.25